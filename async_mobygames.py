@@ -0,0 +1,482 @@
+import os, json, re, time, socket, asyncio, argparse
+from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
+from playwright.async_api import async_playwright
+from mobygames import (
+    MOBYGAMES_COOKIES, COVERS_JS, COVER_IMAGE_JS, SCREENSHOT_LINKS_JS,
+    SPECS_JS, RATINGS_JS, RELEASES_JS, OVERVIEW_JS, DESCRIPTION_READY_JS,
+    MobyGamesScraper, extractor_script, releases_from_js, timed_stage, archived_document, print_run_report,
+)
+from s3_uploader import get_uploader
+from http_fetcher import HttpFetcher
+from html_parsers import parse_figure_image_html
+from page_archive import PageArchive
+from job_queue import JobQueue
+from output_store import OutputStore
+from resource_policy import ResourcePolicy
+from rate_limiter import limiter_for
+from retry import RetryPolicy, CRASH, check_status, parse_retry_after
+from metrics import get_metrics, MetricsReporter
+from scrapeConsoleGame import CONSOLES, enqueue_consoles, game_record, export_console, finish_export_job, game_to_scrape, finish_scrape_job
+
+
+class Slot:
+    """ One slot of the pool: a browser context and its page, with the retry budget of the game it is scraping """
+
+    def __init__(self, context, page, retry):
+        self.context = context
+        self.page = page
+        self.retry = retry
+        self.console = None
+
+    def start_game(self, console):
+        self.console = console
+        self.retry.reset_budget()
+
+
+class AsyncMobyGamesScraper:
+    """
+    Async counterpart of MobyGamesScraper that scrapes several games at the same time.
+
+    Every slot of the pool is a browser context with its own page, and each slot works
+    through the job queue on its own, so throughput grows with pool_size until the
+    browser or the site becomes the bottleneck. max_pool_size caps how many slots can be opened.
+    Navigations are retried, paced, archived and timed like MobyGamesScraper's.
+    """
+
+    def __init__(self, headless=True, pool_size=4, max_pool_size=16, resource_policy=None, navigation_timeout=60000, description_timeout=5000,
+                 rate_limiter=None, archive=None, replay=False, retry=None, detail_fetch_mode='browser', detail_workers=8):
+        """
+        :param resource_policy: ResourcePolicy shared by every slot, False loads everything
+        :param navigation_timeout: Milliseconds a page navigation may take
+        :param description_timeout: Milliseconds to wait for an expandable description without text yet
+        :param rate_limiter: AdaptiveRateLimiter shared by every slot, by default the one of each host (see get_rate_limiter), False for none
+        :param archive: Optional PageArchive the raw HTML of every visited page is saved to
+        :param replay: Serve every page from the archive instead of the network, images are not uploaded again
+        :param retry: Callable returning the RetryPolicy of a slot, by default 8 navigation and 8 fetch retries per game
+        :param detail_fetch_mode: 'browser' visits the cover and screenshot detail pages on the slot's page,
+                                  'http' fetches detail_workers of them at once
+        """
+        if replay and archive is None:
+            raise ValueError("replay=True needs an archive to replay from")
+        if detail_fetch_mode not in ('browser', 'http'):
+            raise ValueError(f"Unknown detail_fetch_mode {detail_fetch_mode!r}, expected 'browser' or 'http'")
+        self.headless = headless
+        self.navigation_timeout = navigation_timeout
+        self.description_timeout = description_timeout
+        self.resource_policy = ResourcePolicy() if resource_policy is None else resource_policy
+        self.rate_limiter = rate_limiter
+        self.archive = archive
+        self.replay = replay
+        self.retry = retry or (lambda: RetryPolicy(budgets={'navigation': 8, 'fetch': 8}))
+        self.pool_size = max(1, min(pool_size, max_pool_size))
+        self.detail_fetcher = None
+        self.detail_executor = None
+        if detail_fetch_mode == 'http':
+            self.detail_fetcher = HttpFetcher(cookies=MOBYGAMES_COOKIES, user_agent=self.get_agent(), pool_size=detail_workers,
+                                              stage='detail_page', rate_limiter=rate_limiter)
+            self.detail_executor = ThreadPoolExecutor(max_workers=detail_workers, thread_name_prefix='detail')
+        self.playwright = None
+        self.browser = None
+        self.slots = []
+
+    async def start(self):
+        """ Launch the browser and open one context and page per pool slot """
+        self.playwright = await async_playwright().start()
+        self.browser = await self.playwright.chromium.launch(headless=self.headless)
+        for _ in range(self.pool_size):
+            context = await self.browser.new_context(
+                viewport={'width': 1280, 'height': 800},
+                user_agent=self.get_agent()
+            )
+            await context.add_cookies(MOBYGAMES_COOKIES)
+            if self.replay:
+                await context.route('**/*', self._serve_from_archive)
+            if self.resource_policy:
+                # registered last so it runs first, allowed requests fall back to the replay route
+                await context.route('**/*', self.resource_policy.handle_async)
+            self.slots.append(Slot(context, await context.new_page(), self.retry()))
+        return self
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    get_agent = MobyGamesScraper.get_agent
+
+    async def _serve_from_archive(self, route):
+        """ MobyGamesScraper._serve_from_archive for the async API """
+        html = archived_document(self.archive, route.request)
+        if html is None:
+            await route.abort()
+        else:
+            await route.fulfill(status=200, content_type='text/html; charset=utf-8', body=html)
+
+    async def _navigate(self, slot, url, **kwargs):
+        """ slot.page.goto paced by the rate limiter, raising HTTPStatusError on a 429 or 5xx """
+        rate_limiter = limiter_for(self.rate_limiter, url)
+        if rate_limiter:
+            await rate_limiter.acquire_async()
+        start = time.perf_counter()
+        try:
+            with get_metrics().timer('navigation', console=slot.console):
+                response = await slot.page.goto(url, **kwargs)
+        except Exception:
+            if rate_limiter:
+                rate_limiter.record(time.perf_counter() - start, failed=True)
+            raise
+        if rate_limiter:
+            rate_limiter.record(time.perf_counter() - start, response.status if response else None,
+                                parse_retry_after(response.headers.get('retry-after')) if response else None)
+        if response:
+            check_status(url, response.status, response.headers)
+        return response
+
+    async def _replace_page(self, slot, error_class):
+        """ A crashed page is replaced before the navigation is retried """
+        if error_class != CRASH:
+            return
+        try:
+            await slot.page.close()
+        except Exception:
+            pass
+        slot.page = await slot.context.new_page()
+
+    async def _goto(self, slot, url, **kwargs):
+        """ Navigate the slot's page with retries, saving the raw HTML to the archive when one is configured """
+        kwargs.setdefault('timeout', self.navigation_timeout)
+        if self.replay:
+            return await slot.page.goto(url, **kwargs)
+        response = await slot.retry.call_async('navigation', self._navigate, slot, url,
+                                               on_retry=lambda error_class, error, attempt: self._replace_page(slot, error_class), **kwargs)
+        if self.archive and response:
+            html = await response.text()
+            self.archive.put(url, html)
+            if response.url != url:
+                self.archive.put(response.url, html)
+        return response
+
+    async def _evaluate(self, slot, js):
+        """ slot.page.evaluate, timed as DOM extraction """
+        with get_metrics().timer('evaluate', console=slot.console):
+            return await slot.page.evaluate(js)
+
+    async def _submit_image(self, image_url, bucket_name, folder):
+        """
+        Queue an image upload on the shared S3Uploader thread pool and return an awaitable of its S3 URL.
+        submit() blocks while the uploader has max_pending uploads queued, so it is called on a
+        worker thread and only this slot waits for room, not the whole event loop.
+        """
+        if self.replay:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(get_uploader().stored_url(image_url, folder, bucket_name))
+            return future
+        return asyncio.wrap_future(await asyncio.to_thread(get_uploader().submit, image_url, folder, bucket_name))
+
+    def _detail_image(self, slot, link):
+        """ Full-size image of a cover or screenshot page fetched over HTTP, runs on the detail executor """
+        if self.replay:
+            html = self.archive.get(link)
+            if html is None:
+                raise KeyError(f'{link} is not in the archive')
+        else:
+            html = slot.retry.call('fetch', self.detail_fetcher.get, link)
+            if self.archive:
+                self.archive.put(link, html)
+        src = parse_figure_image_html(html)
+        return urljoin(link, src) if src else None
+
+    async def resolve_detail_images(self, slot, links, bucket_name, folder):
+        """
+        Read the full-size image of cover or screenshot detail pages and queue its upload.
+
+        :return: Dict of link to the awaitable S3 URL of its image, links without an image are left out.
+        :raises RetryExhausted: When a page could not be fetched, after cancelling the uploads
+                                queued so far and the fetches not started yet.
+        """
+        uploads = {}
+        try:
+            if not self.detail_executor:
+                for link in links:
+                    await self._goto(slot, link, wait_until='domcontentloaded')
+                    src = await self._evaluate(slot, COVER_IMAGE_JS)
+                    if src:
+                        uploads[link] = await self._submit_image(urljoin(link, src), bucket_name, folder)
+                return uploads
+
+            loop = asyncio.get_running_loop()
+            fetches = [loop.run_in_executor(self.detail_executor, self._detail_image, slot, link) for link in links]
+            try:
+                for link, fetch in zip(links, fetches):
+                    full_size_image = await fetch
+                    if full_size_image:
+                        uploads[link] = await self._submit_image(full_size_image, bucket_name, folder)
+            finally:
+                for fetch in fetches:
+                    fetch.cancel()
+            return uploads
+        except Exception:
+            for upload in uploads.values():
+                upload.cancel()
+            raise
+
+    @timed_stage('overview')
+    async def get_overview_details(self, slot, url):
+        """ Scrape overview details """
+        try:
+            await self._goto(slot, url, wait_until='domcontentloaded')
+        except Exception as e:
+            print(e)
+            return None
+
+        data = await self._evaluate(slot, OVERVIEW_JS)
+        if data['mobyid'] is None:
+            raise ValueError(f'No Moby ID on {url}')
+        if data['expandable'] and not data['descriptionReady']:
+            try:
+                await slot.page.wait_for_function(DESCRIPTION_READY_JS, timeout=self.description_timeout)
+                data = await self._evaluate(slot, OVERVIEW_JS)
+            except Exception as e:
+                print(e)
+
+        return {
+            "title": data['title'],
+            "mobyid": data['mobyid'],
+            "rating": data['rating'] if data['rating'] else '',
+            "description": data['description'],
+            **dict(data['details'])
+        }
+
+    @timed_stage('covers')
+    async def get_covers(self, slot, url):
+        """ Scrape game cover screenshots, packaging, and video standard info """
+        try:
+            await self._goto(slot, url, wait_until="domcontentloaded")
+        except Exception as e:
+            print(e)
+            return None
+
+        cover_data = await self._evaluate(slot, COVERS_JS)
+
+        if not cover_data or not isinstance(cover_data, dict):
+            return {}
+
+        # Each distinct cover page is read once and its full-size image queued for upload right away
+        for entries in cover_data.values():
+            for entry in entries:
+                entry["cover_links"] = [urljoin(url, link) for link in entry["cover_links"]]
+        cover_links = list(dict.fromkeys(link for entries in cover_data.values() for entry in entries for link in entry["cover_links"]))
+        try:
+            cover_uploads = await self.resolve_detail_images(slot, cover_links, os.getenv('BUCKET_NAME'), 'covers/')
+        except Exception as e:
+            print(e)
+            return None
+
+        urls = dict(zip(cover_uploads, await asyncio.gather(*cover_uploads.values())))
+        if None in urls.values():
+            return None
+        for console, entries in cover_data.items():
+            for entry in entries:
+                entry["cover_images"] = [urls[cover_link] for cover_link in entry["cover_links"] if cover_link in urls]
+                del entry["cover_links"]
+
+        return cover_data
+
+    @timed_stage('screenshots')
+    async def get_screenshots(self, slot, url):
+        """Scrape full-size screenshots for each console."""
+        try:
+            await self._goto(slot, url, wait_until="domcontentloaded")
+        except Exception as e:
+            print(e)
+            return None
+        screenshot_links = await self._evaluate(slot, SCREENSHOT_LINKS_JS)
+
+        if not screenshot_links or not isinstance(screenshot_links, dict):
+            return {}
+
+        screenshot_links = {console: [urljoin(url, link) for link in links] for console, links in screenshot_links.items()}
+        links = list(dict.fromkeys(link for console_links in screenshot_links.values() for link in console_links))
+        try:
+            screenshot_uploads = await self.resolve_detail_images(slot, links, os.getenv('BUCKET_NAME'), 'screenshots/')
+        except Exception as e:
+            print(e)
+            return None
+
+        urls = dict(zip(screenshot_uploads, await asyncio.gather(*screenshot_uploads.values())))
+        if None in urls.values():
+            return None
+        return {console: [urls[link] for link in links if link in urls] for console, links in screenshot_links.items()}
+
+    @timed_stage('specs')
+    async def get_specs_and_ratings(self, slot, url):
+        """ Specs and ratings from one load of the /specs/{console} page, (None, None) on failure """
+        try:
+            await self._goto(slot, url, wait_until='domcontentloaded')
+        except Exception as e:
+            print(e)
+            return None, None
+        extracted = await self._evaluate(slot, extractor_script([('specs', SPECS_JS), ('ratings', RATINGS_JS)]))
+        return extracted['specs'], extracted['ratings']
+
+    @timed_stage('releases')
+    async def get_releases(self, slot, url):
+        """ Scrape game releases information """
+        try:
+            await self._goto(slot, url, wait_until='domcontentloaded')
+        except Exception as e:
+            print(e)
+            return None
+
+        return releases_from_js(await self._evaluate(slot, RELEASES_JS))
+
+    async def scrape_game(self, slot, game, console_code):
+        """
+        Scrapes every page of one game on the given pool slot.
+
+        :return: What OutputStore.save_game stores for the game, like scrapeConsoleGame.scrape_game,
+                 or None if a page failed.
+        """
+        slot.start_game(console_code)
+        overview_url = game["link"]
+        release_url = f'{game["link"]}/releases/{console_code}'
+        specs_ratings_url = f'{game["link"]}/specs/{console_code}'
+        covers_url = f'{game["link"]}/covers/{console_code}'
+        screenshots_url = f'{game["link"]}/screenshots/{console_code}'
+
+        game_overview = await self.get_overview_details(slot, overview_url)
+        if game_overview is None: return None
+        game_releases = await self.get_releases(slot, release_url)
+        if game_releases is None: return None
+        game_specs, game_ratings = await self.get_specs_and_ratings(slot, specs_ratings_url)
+        if game_specs is None or game_ratings is None: return None
+        game_covers = await self.get_covers(slot, covers_url)
+        if game_covers is None: return None
+
+        if not (game_covers or game_releases):
+            return {}
+
+        game_screenshots = await self.get_screenshots(slot, screenshots_url)
+        if game_screenshots is None: return None
+
+        return game_record(game_overview, game_releases, game_specs, game_ratings, game_covers, game_screenshots)
+
+    async def run_export_job(self, queue, store, job):
+        """
+        scrapeConsoleGame.run_export_job on a worker thread so the other slots keep scraping
+        during the export, with an OutputStore connection of its own: an SQLite connection
+        only works on the thread that opened it.
+        """
+        def export():
+            export_store = OutputStore(store.path)
+            try:
+                export_console(export_store, job['payload']['platform'])
+            finally:
+                export_store.close()
+
+        try:
+            await asyncio.to_thread(export)
+        except Exception as e:
+            finish_export_job(queue, job, e)
+        else:
+            finish_export_job(queue, job)
+
+    async def scrape_queue(self, queue, worker_id, store):
+        """
+        Work through the job queue until no job is left, every pool slot leasing its own
+        jobs the way scrapeConsoleGame.scrapeGamesByConsole does.
+        """
+        imported = set()
+
+        async def worker(slot, slot_id):
+            while True:
+                job = queue.lease(slot_id)
+                if job is None:
+                    return
+
+                if job['stage'] == 'export':
+                    await self.run_export_job(queue, store, job)
+                    continue
+
+                game = game_to_scrape(queue, store, job, imported)
+                if game is None:
+                    continue
+
+                print(f"Scraping {game['game']} for {job['payload']['platform']['platform']} (attempt {job['attempts']})...")
+                try:
+                    scraped_game = await self.scrape_game(slot, game, job['console'])
+                except Exception as e:
+                    # one broken game must not take its slot down with it
+                    print(f"Error scraping {game['link']}: {e}")
+                    scraped_game = None
+                finish_scrape_job(queue, store, job, scraped_game)
+
+        await asyncio.gather(*(worker(slot, f'{worker_id}-{index}') for index, slot in enumerate(self.slots)))
+
+    async def close(self):
+        """ Clean up resources """
+        print_run_report(self.resource_policy, self.rate_limiter)
+        if self.detail_executor:
+            self.detail_executor.shutdown()
+        if self.detail_fetcher:
+            self.detail_fetcher.close()
+        for slot in self.slots:
+            await slot.context.close()
+        if self.browser:
+            await self.browser.close()
+        if self.playwright:
+            await self.playwright.stop()
+
+
+async def scrape_consoles(queue, worker_id, store, pool_size=4, max_pool_size=16, headless=True):
+    """ Scrape the queued games with a pool of browser pages, configured by the env vars of scrapeConsoleGame.create_scraper """
+    archive = PageArchive(os.getenv('ARCHIVE_DIR')) if os.getenv('ARCHIVE_DIR') else None
+    async with AsyncMobyGamesScraper(
+        headless=headless,
+        pool_size=pool_size,
+        max_pool_size=max_pool_size,
+        resource_policy=False if os.getenv('BLOCK_RESOURCES') == '0' else None,
+        navigation_timeout=int(os.getenv('NAVIGATION_TIMEOUT', '60000')),
+        archive=archive,
+        replay=os.getenv('REPLAY') == '1',
+        detail_fetch_mode=os.getenv('DETAIL_FETCH_MODE') or 'browser',
+    ) as scraper:
+        await scraper.scrape_queue(queue, worker_id, store)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Scrape the games of the queued consoles with a pool of browser pages, several workers can share one queue.')
+    parser.add_argument('--consoles', nargs='*', default=CONSOLES, help='console codes to queue')
+    parser.add_argument('--queue', default='data/jobs.sqlite')
+    parser.add_argument('--output', default='data/output.sqlite', help='SQLite store the scraped games are saved to')
+    parser.add_argument('--worker-id', default=f'{socket.gethostname()}-{os.getpid()}')
+    parser.add_argument('--retry-failed', action='store_true', help='give failed jobs another set of attempts')
+    parser.add_argument('--allow-partial', action='store_true', help='export consoles even when some of their games failed')
+    parser.add_argument('--pool-size', type=int, default=4)
+    parser.add_argument('--max-pool-size', type=int, default=16)
+    parser.add_argument('--metrics-dir', default='metrics', help='directory the Prometheus textfile and JSON summary are written to')
+    parser.add_argument('--metrics-interval', type=int, default=60, help='seconds between two metrics writes')
+    args = parser.parse_args()
+
+    with open('mobygames_platforms.json', 'r', encoding='utf-8') as file:
+        platforms = json.load(file)
+
+    queue = JobQueue(args.queue, allow_partial=args.allow_partial)
+    if args.retry_failed:
+        queue.retry_failed()
+    enqueue_consoles(queue, platforms, args.consoles)
+
+    get_metrics().const_labels['worker'] = args.worker_id
+    reporter = MetricsReporter(get_metrics(), args.metrics_dir, re.sub(r'[^\w.-]', '_', args.worker_id), args.metrics_interval).start()
+
+    store = OutputStore(args.output)
+    try:
+        asyncio.run(scrape_consoles(queue, args.worker_id, store, args.pool_size, args.max_pool_size))
+    finally:
+        reporter.stop()
+    print(f"Jobs: {queue.counts()}")
+    store.close()
+    queue.close()
@@ -0,0 +1,179 @@
+import os, sys, json, time, argparse, resource, tempfile, threading
+
+# End-to-end throughput of scrapeGamesByConsole without touching mobygames.com or the real bucket:
+# the scraper is pointed at fixture_server.py serving a synthetic catalog and at an S3 stand-in
+# (moto in-process, or S3_ENDPOINT_URL for MinIO). The scrape runs in a scratch directory with
+# its own job queue, output store and exports. Reports games/sec, pages/sec and the peak RSS of
+# the process and its children (Chromium included).
+
+
+def _children(pid):
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as file:
+            return [int(child) for child in file.read().split()]
+    except OSError:
+        return []
+
+
+def _rss(pid):
+    try:
+        with open(f'/proc/{pid}/status') as file:
+            for line in file:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def process_tree_rss(pid):
+    """ Resident bytes of a process and all its descendants """
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        total += _rss(current)
+        pending.extend(_children(current))
+    return total
+
+
+class PeakRSSSampler:
+    """ Samples the RSS of this process tree every interval seconds and keeps the highest """
+
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self.peak = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+
+    def _run(self):
+        while True:
+            self.peak = max(self.peak, process_tree_rss(os.getpid()))
+            if self.stopped.wait(self.interval):
+                break
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        if not self.peak:
+            # no /proc, fall back to the high-water marks of this process and its waited-for children
+            own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+            scale = 1 if sys.platform == 'darwin' else 1024
+            self.peak = (own + children) * scale
+        return self.peak
+
+
+def enqueue_catalog(queue, catalog, base_url):
+    """ A scrape job per game and an export job per console of the catalog, as enqueue_consoles queues them """
+    for platform in catalog.platforms():
+        games_list = catalog.games_list(base_url, platform['console_code'])
+        jobs = [(platform['console_code'], game['link'], 'scrape', {'game': game, 'platform': platform}) for game in games_list]
+        jobs.append((platform['console_code'], '', 'export', {'platform': platform}))
+        queue.enqueue_many(jobs)
+
+
+def run(args):
+    import boto3
+    from bench_s3_upload import start_s3_stand_in
+    from fixture_server import FixtureCatalog, FixtureServer
+
+    catalog = FixtureCatalog(consoles=args.consoles, games_per_console=args.games, releases=args.releases,
+                             covers=args.covers, images_per_cover=args.images_per_cover, screenshots=args.screenshots)
+    fixtures = FixtureServer(catalog, latency=args.latency / 1000, image_size=args.image_size, throttle=args.throttle).start()
+    endpoint_url, s3_server = start_s3_stand_in()
+    try:
+        boto3.client('s3', endpoint_url=endpoint_url).create_bucket(Bucket=args.bucket)
+    except Exception as e:
+        print(f'create_bucket: {e}')
+
+    # read by create_scraper() and get_uploader(), so set before either is first used
+    os.environ['S3_ENDPOINT_URL'] = endpoint_url
+    os.environ['BUCKET_NAME'] = args.bucket
+    os.environ['IMAGE_MANIFEST'] = ''
+    os.environ['FETCH_MODE'] = args.fetch_mode
+
+    from job_queue import JobQueue
+    from output_store import OutputStore
+    from metrics import get_metrics
+    from s3_uploader import get_uploader
+    from scrapeConsoleGame import scrapeGamesByConsole
+
+    workdir = tempfile.mkdtemp(prefix='bench-e2e-')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    queue = JobQueue('data/jobs.sqlite')
+    store = OutputStore('data/output.sqlite')
+    enqueue_catalog(queue, catalog, fixtures.base_url)
+
+    sampler = PeakRSSSampler().start()
+    start = time.perf_counter()
+    try:
+        scrapeGamesByConsole(queue, 'bench', store)
+        get_uploader().shutdown()
+    finally:
+        elapsed = time.perf_counter() - start
+        peak_rss = sampler.stop()
+        store.close()
+        queue.close()
+        os.chdir(cwd)
+        fixtures.stop()
+        if s3_server:
+            s3_server.stop()
+
+    summary = get_metrics().summary()
+    games = summary['games'].get('scraped', 0)
+    result = {
+        'games': games,
+        'failed': summary['games'].get('failed', 0),
+        'seconds': elapsed,
+        'games_per_sec': games / elapsed,
+        'pages_per_sec': fixtures.pages_served() / elapsed,
+        'images_per_sec': fixtures.requests['image'] / elapsed,
+        'peak_rss_mb': peak_rss / 1024 / 1024,
+        'throttled': fixtures.requests['throttled'],
+        'requests': dict(fixtures.requests),
+        'stages': {stage: {'p50': values['p50'], 'p95': values['p95']} for stage, values in summary['stages'].items()},
+        'workdir': workdir,
+    }
+    return result
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Measure games/sec, pages/sec and peak RSS of scrapeGamesByConsole against local stand-ins.')
+    parser.add_argument('--consoles', type=int, default=1)
+    parser.add_argument('--games', type=int, default=20, help='games per console')
+    parser.add_argument('--releases', type=int, default=3, help='release groups per game')
+    parser.add_argument('--covers', type=int, default=3, help='cover groups per game')
+    parser.add_argument('--images-per-cover', type=int, default=2)
+    parser.add_argument('--screenshots', type=int, default=6, help='screenshots per game')
+    parser.add_argument('--image-size', type=int, default=50 * 1024, help='bytes per image')
+    parser.add_argument('--latency', type=float, default=0, help='milliseconds the fixture server waits before each response')
+    parser.add_argument('--throttle', type=float, help='requests per second the fixture server answers before replying 429')
+    parser.add_argument('--fetch-mode', choices=['browser', 'http'], default='browser')
+    parser.add_argument('--bucket', default='bench-mobygames')
+    parser.add_argument('--json', help='also write the results to this file')
+    parser.add_argument('--min-games-per-sec', type=float, help='exit with status 1 below this throughput')
+    args = parser.parse_args()
+
+    result = run(args)
+    print(f"games       : {result['games']} scraped, {result['failed']} failed in {result['seconds']:.1f}s")
+    print(f"games/sec   : {result['games_per_sec']:8.2f}")
+    print(f"pages/sec   : {result['pages_per_sec']:8.2f}")
+    print(f"images/sec  : {result['images_per_sec']:8.2f}")
+    print(f"peak RSS    : {result['peak_rss_mb']:8.1f} MB")
+    print(f"throttled   : {result['throttled']:8d} requests")
+    for stage, values in result['stages'].items():
+        print(f"  {stage:<14} p50 {values['p50']:.3f}s  p95 {values['p95']:.3f}s")
+    print(f"output in {result['workdir']}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(result, file, indent=4)
+    if args.min_games_per_sec is not None and result['games_per_sec'] < args.min_games_per_sec:
+        print(f"Throughput below {args.min_games_per_sec} games/sec")
+        sys.exit(1)
@@ -0,0 +1,107 @@
+import io, copy, time, random, argparse, contextlib
+from mobygames import merge_covers_releases_data, normalize_text, unordered_match
+
+# Benchmarks merge_covers_releases_data on synthetic games with hundreds of covers and
+# releases, comparing it with the scan based version it replaced.
+
+COUNTRIES = ['United States', 'Canada', 'United Kingdom', 'Germany', 'France', 'Italy', 'Spain', 'Japan',
+             'Australia', 'Brazil', 'Sweden', 'Netherlands']
+COMMENTS = ['', 'Budget re-release', 'Re-release, Budget', 'Limited Edition', 'Collector\'s Edition',
+            'Player\'s Choice', 'Choice Player\'s', 'Platinum', 'Classics', 'Big Box']
+
+
+def previous_merge_covers_releases_data(covers, releases):
+    """ The merge merge_covers_releases_data replaced: a scan of the releases per cover """
+    merged_data = {}
+    considered_release = []
+    for console, cover_entries in covers.items():
+        if console not in merged_data:
+            merged_data[console] = []
+        release_entries = releases.get(console, [])
+        for cover_entry in cover_entries:
+            country = cover_entry['country']
+            comments = cover_entry.get('comments', '')
+            matching_release_entries = [
+                entry for entry in release_entries
+                if entry.get('country') == country and (normalize_text(entry.get('comments', '')) == normalize_text(comments) or unordered_match(normalize_text(entry.get('comments', '')), normalize_text(comments)))
+            ]
+            if matching_release_entries:
+                for matching_release_entry in matching_release_entries:
+                    merged_entry = {**cover_entry, **matching_release_entry}
+                    merged_entry['console'] = console
+                    merged_data[console].append(merged_entry)
+                considered_release.extend(matching_release_entries)
+            else:
+                cover_entry['console'] = console
+                merged_data[console].append(cover_entry)
+
+    release_entries = []
+    for key, value in releases.items():
+        for entry in value:
+            entry['console'] = key
+        release_entries.extend(value)
+
+    for release_entry in release_entries:
+        if release_entry not in considered_release:
+            if release_entry['console'] not in merged_data:
+                merged_data[release_entry['console']] = [release_entry]
+            else:
+                merged_data[release_entry['console']].append(release_entry)
+
+    return merged_data
+
+
+def synthetic_game(consoles, covers_per_console, releases_per_console, rng):
+    """ covers and releases dicts shaped like get_covers() and get_releases() return """
+    covers, releases = {}, {}
+    for index in range(consoles):
+        console = f'Console {index}'
+        covers[console] = [{
+            'packaging': rng.choice(['Box', 'Jewel Case', 'Keep Case']),
+            'comments': rng.choice(COMMENTS),
+            'video_standard': rng.choice(['NTSC', 'PAL']),
+            'country': rng.choice(COUNTRIES),
+            'cover_images': [f'https://bucket.s3.amazonaws.com/covers/{rng.getrandbits(48):x}.jpg'],
+        } for _ in range(covers_per_console)]
+        releases[console] = [{
+            'release_date': f'{rng.randint(1985, 2020)}',
+            'publisher': rng.choice(['Sega', 'Nintendo', 'Ubisoft', 'EA']),
+            'comments': rng.choice(COMMENTS),
+            'country': rng.choice(COUNTRIES),
+        } for _ in range(releases_per_console)]
+    return covers, releases
+
+
+def bench(func, games, repeat):
+    elapsed = 0
+    for _ in range(repeat):
+        inputs = copy.deepcopy(games)
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            for covers, releases in inputs:
+                func(covers, releases)
+            elapsed += time.perf_counter() - start
+    return elapsed / repeat
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark the cover/release merge.')
+    parser.add_argument('--games', type=int, default=5)
+    parser.add_argument('--consoles', type=int, default=2)
+    parser.add_argument('--sizes', type=int, nargs='*', default=[20, 100, 300])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    for size in args.sizes:
+        games = [synthetic_game(args.consoles, size, size, rng) for _ in range(args.games)]
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = [previous_merge_covers_releases_data(*game) for game in copy.deepcopy(games)]
+            assert expected == [merge_covers_releases_data(*game) for game in copy.deepcopy(games)], 'outputs differ'
+
+        previous = bench(previous_merge_covers_releases_data, games, args.repeat)
+        current = bench(merge_covers_releases_data, games, args.repeat)
+        print(f"{size:>4} covers and releases per console: previous {previous * 1000:8.1f} ms, "
+              f"now {current * 1000:8.1f} ms ({previous / current:.1f}x)")
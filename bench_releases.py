@@ -0,0 +1,101 @@
+import time, random, argparse
+from html_parsers import build_release_groups, release_row_key
+
+# Benchmarks release table grouping on synthetic tables with many countries,
+# comparing build_release_groups with the list based version it replaced.
+
+COUNTRIES = ['United States', 'Canada', 'United Kingdom', 'Germany', 'France', 'Italy', 'Spain', 'Netherlands',
+             'Belgium', 'Sweden', 'Norway', 'Denmark', 'Finland', 'Poland', 'Portugal', 'Austria', 'Switzerland',
+             'Japan', 'South Korea', 'Taiwan', 'Hong Kong', 'China', 'Australia', 'New Zealand', 'Brazil',
+             'Argentina', 'Mexico', 'Chile', 'South Africa', 'Russia', 'Greece', 'Turkey', 'Israel', 'India',
+             'Ireland', 'Czech Republic', 'Hungary', 'Slovakia', 'Romania', 'Bulgaria']
+
+
+def previous_build_release_groups(rows):
+    """ The grouping build_release_groups replaced, quadratic in the number of country groups """
+    common_info = {}
+    country_groups = []
+    current_country_group = []
+    in_country_section = False
+
+    if rows and rows[0]:
+        common_info['release_date'] = rows[0][0].strip().replace(" Release", "")
+
+    for cells in rows[1:]:
+        if len(cells) == 2:
+            key, value_text = release_row_key(cells[0]), cells[1].strip()
+            if key == 'countries':
+                in_country_section = True
+                countries = [c.strip() for c in cells[1].split(',')]
+                new_country_groups = []
+                for country in countries:
+                    new_group = common_info.copy()
+                    new_group['country'] = country
+                    new_country_groups.append(new_group)
+                country_groups.extend(new_country_groups)
+                current_country_group = new_country_groups
+            elif in_country_section and current_country_group:
+                new_country_group = []
+                for group in current_country_group:
+                    if key in group:
+                        new_group1 = group.copy()
+                        new_group2 = group.copy()
+                        new_group2[key] = value_text
+                        new_country_group.extend([new_group1, new_group2])
+                    else:
+                        group[key] = value_text
+                        new_country_group.append(group)
+                country_groups = [g for g in country_groups if g not in current_country_group] + new_country_group
+                current_country_group = new_country_group
+            else:
+                common_info[key] = value_text
+        else:
+            in_country_section = False
+            current_country_group = []
+
+    return country_groups
+
+
+def synthetic_table(countries, sections, fields, splits, rng):
+    """ Rows of one release table: common fields, then `sections` country lists each followed by fields and a few repeated labels """
+    rows = [['Jan 1, 1995 Release']]
+    rows += [[f'Label {i}:', f'value {i}'] for i in range(fields)]
+    for section in range(sections):
+        rows.append(['Countries:', ', '.join(rng.sample(COUNTRIES, countries))])
+        rows += [[f'Field {i}:', f'section {section} value {i}'] for i in range(fields)]
+        # repeated labels split every group of the section in two
+        rows += [['Product Code:', f'{section}-{i}'] for i in range(splits)]
+    return rows
+
+
+def bench(func, tables, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for rows in tables:
+            func([list(row) for row in rows])
+    return (time.perf_counter() - start) / repeat
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark release table grouping.')
+    parser.add_argument('--tables', type=int, default=50)
+    parser.add_argument('--countries', type=int, nargs='*', default=[5, 20, 40])
+    parser.add_argument('--sections', type=int, default=3)
+    parser.add_argument('--fields', type=int, default=6)
+    parser.add_argument('--splits', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    for countries in args.countries:
+        tables = [synthetic_table(countries, args.sections, args.fields, args.splits, rng) for _ in range(args.tables)]
+
+        expected = [previous_build_release_groups([list(row) for row in rows]) for rows in tables]
+        assert expected == [build_release_groups([list(row) for row in rows]) for rows in tables], 'outputs differ'
+
+        groups = sum(len(groups) for groups in expected)
+        previous = bench(previous_build_release_groups, tables, args.repeat)
+        current = bench(build_release_groups, tables, args.repeat)
+        print(f"{countries:>3} countries, {groups // args.tables:>4} groups per table: "
+              f"previous {previous * 1000:8.1f} ms, now {current * 1000:8.1f} ms ({previous / current:.1f}x)")
@@ -0,0 +1,103 @@
+import os, time, argparse, logging, threading
+from io import BytesIO
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Benchmarks image upload throughput against a local S3 stand-in.
+# By default a moto server is started in-process (pip install "moto[server]");
+# set S3_ENDPOINT_URL to point at MinIO or another S3 compatible server instead.
+
+
+class FakeImageHandler(BaseHTTPRequestHandler):
+    """ Serves /<name>.jpg as image_size random-ish bytes """
+    image_size = 200 * 1024
+
+    def do_GET(self):
+        body = os.urandom(1024) * (self.image_size // 1024)
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_image_server(image_size):
+    FakeImageHandler.image_size = image_size
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeImageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def start_s3_stand_in():
+    """ Return the S3 endpoint to use, starting moto when S3_ENDPOINT_URL is not set """
+    if os.getenv('S3_ENDPOINT_URL'):
+        return os.getenv('S3_ENDPOINT_URL'), None
+
+    from moto.server import ThreadedMotoServer
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    server = ThreadedMotoServer(ip_address='127.0.0.1', port=0)
+    server.start()
+    host, port = server.get_host_and_port()
+    return f'http://{host}:{port}', server
+
+
+def upload_one_by_one(image_urls, bucket_name, endpoint_url):
+    """ The previous upload_image_to_s3: new client per image, whole body in memory, serial """
+    import boto3, requests
+    from s3_uploader import image_s3_key
+    for image_url in image_urls:
+        response = requests.get(image_url, stream=True)
+        response.raise_for_status()
+        s3_client = boto3.client("s3", endpoint_url=endpoint_url)
+        s3_client.upload_fileobj(BytesIO(response.content), bucket_name, image_s3_key(image_url, 'serial/'))
+
+
+def upload_with_pool(image_urls, bucket_name, endpoint_url, workers):
+    from s3_uploader import S3Uploader
+    # unpaced, this measures the upload pipeline and not the rate limiter
+    uploader = S3Uploader(bucket_name=bucket_name, max_workers=workers, endpoint_url=endpoint_url, rate_limiter=False)
+    futures = [uploader.submit(image_url, f'pool-{workers}/') for image_url in image_urls]
+    results = [future.result() for future in futures]
+    uploader.shutdown()
+    if None in results:
+        raise RuntimeError('Some uploads failed')
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Measure images/sec of the S3 upload pipeline.')
+    parser.add_argument('--images', type=int, default=200)
+    parser.add_argument('--image-size', type=int, default=200 * 1024, help='bytes per image')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8, 16])
+    parser.add_argument('--bucket', default='bench-mobygames')
+    args = parser.parse_args()
+
+    import boto3
+    image_server, image_base = start_image_server(args.image_size)
+    endpoint_url, s3_server = start_s3_stand_in()
+    try:
+        boto3.client('s3', endpoint_url=endpoint_url).create_bucket(Bucket=args.bucket)
+    except Exception as e:
+        print(f'create_bucket: {e}')
+
+    image_urls = [f'{image_base}/image-{i}.jpg' for i in range(args.images)]
+
+    start = time.perf_counter()
+    upload_one_by_one(image_urls, args.bucket, endpoint_url)
+    elapsed = time.perf_counter() - start
+    print(f'serial, client per image : {args.images / elapsed:8.1f} images/sec')
+
+    for workers in args.workers:
+        start = time.perf_counter()
+        upload_with_pool(image_urls, args.bucket, endpoint_url, workers)
+        elapsed = time.perf_counter() - start
+        print(f'S3Uploader, {workers:2d} workers  : {args.images / elapsed:8.1f} images/sec')
+
+    image_server.shutdown()
+    if s3_server:
+        s3_server.stop()
@@ -0,0 +1,17 @@
+import os, json
+
+
+def write_entries_json(entries, output_path):
+    """ Stream entries into a JSON list formatted like json.dump(..., indent=4), replacing output_path atomically """
+    if os.path.dirname(output_path):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    tmp_path = f'{output_path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        first = True
+        for entry in entries:
+            file.write('[\n' if first else ',\n')
+            file.write('\n'.join('    ' + line for line in json.dumps(entry, indent=4).split('\n')))
+            first = False
+        file.write('[]' if first else '\n]')
+    os.replace(tmp_path, output_path)
+
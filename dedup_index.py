@@ -0,0 +1,60 @@
+import os, re, json
+
+MOBY_ID_PATTERN = re.compile(r'/game/(\d+)/')
+
+
+def moby_game_id(link):
+    """ Moby game ID from a game link such as https://www.mobygames.com/game/1159/super-street-fighter-ii-turbo/ """
+    match = MOBY_ID_PATTERN.search(link)
+    return match.group(1) if match else link
+
+
+class DedupIndex:
+    """
+    Set of the Moby game IDs already listed for a console.
+
+    Membership is a set lookup, and new IDs are appended to {directory}/{console}.ids by
+    commit() so the index survives between runs. Call commit() right after saving
+    games_list/{console}.json, so the index never gets ahead of the saved list. The first
+    time a console is indexed it is seeded from games_list/{console}.json; after that the
+    games list is never re-read for dedup.
+    """
+
+    def __init__(self, console, directory='dedup', games_list_dir='games_list'):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f'{console}.ids')
+        self.ids = set()
+        self.pending = []
+
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as file:
+                self.ids.update(line.strip() for line in file if line.strip())
+        else:
+            games_list_path = os.path.join(games_list_dir, f'{console}.json')
+            if os.path.exists(games_list_path):
+                with open(games_list_path, 'r', encoding='utf-8') as file:
+                    self.ids.update(moby_game_id(game['link']) for game in json.load(file))
+            with open(self.path, 'w', encoding='utf-8') as file:
+                file.writelines(f'{game_id}\n' for game_id in self.ids)
+
+    def __contains__(self, link):
+        return moby_game_id(link) in self.ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, link):
+        """ Record a game link, returns False if the game was already indexed """
+        game_id = moby_game_id(link)
+        if game_id in self.ids:
+            return False
+        self.ids.add(game_id)
+        self.pending.append(game_id)
+        return True
+
+    def commit(self):
+        """ Persist the IDs added since the last commit """
+        if self.pending:
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.writelines(f'{game_id}\n' for game_id in self.pending)
+            self.pending = []
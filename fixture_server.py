@@ -0,0 +1,283 @@
+import re, time, random, threading
+from collections import deque
+from html import escape
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Local stand-in for www.mobygames.com serving a synthetic catalog, used by bench_e2e.py.
+# The pages only carry the markup the extractors in mobygames.py and the parsers in
+# html_parsers.py read, laid out like the real site.
+
+COUNTRIES = ['United States', 'Canada', 'United Kingdom', 'Germany', 'France', 'Japan', 'Australia', 'Brazil']
+PUBLISHERS = ['Sega', 'Nintendo', 'Ubisoft', 'Electronic Arts', 'Konami', 'Capcom']
+GENRES = ['Action', 'Adventure', 'Puzzle', 'Racing / Driving', 'Role-Playing (RPG)', 'Sports', 'Strategy']
+COMMENTS = ['', 'Budget re-release', 'Limited Edition', "Player's Choice"]
+
+PER_PAGE = 50
+
+
+def _page(title, body):
+    return f'<!DOCTYPE html><html><head><title>{escape(title)}</title></head><body>{body}</body></html>'
+
+
+def _comma_list(values, link=True):
+    items = ''.join(f'<li><a href="#">{escape(value)}</a></li>' if link else f'<li>{escape(value)}</li>' for value in values)
+    return f'<ul class="commaList">{items}</ul>'
+
+
+class FixtureCatalog:
+    """
+    Deterministic synthetic catalog: `consoles` platforms of `games_per_console` games, each
+    with `releases` release groups, `covers` cover groups of `images_per_cover` images and
+    `screenshots` screenshots on its platform.
+    """
+
+    def __init__(self, consoles=2, games_per_console=50, releases=3, covers=3, images_per_cover=2, screenshots=6, seed=0):
+        self.consoles = [(f'Console {index}', f'console-{index}') for index in range(consoles)]
+        self.games_per_console = games_per_console
+        self.releases = releases
+        self.covers = covers
+        self.images_per_cover = images_per_cover
+        self.screenshots = screenshots
+        self.seed = seed
+
+    def game_ids(self, console_code):
+        index = [code for name, code in self.consoles].index(console_code)
+        first = index * self.games_per_console + 1
+        return range(first, first + self.games_per_console)
+
+    def console_of(self, game_id):
+        return self.consoles[(game_id - 1) // self.games_per_console]
+
+    def _rng(self, game_id):
+        return random.Random(self.seed * 1_000_003 + game_id)
+
+    def _release_groups(self, game_id):
+        """ (country list, comments, publisher) per release, shared by the releases and covers pages so they merge """
+        rng = self._rng(game_id)
+        return [(rng.sample(COUNTRIES, rng.randint(1, 3)), rng.choice(COMMENTS), rng.choice(PUBLISHERS)) for _ in range(self.releases)]
+
+    def overview(self, base_url, game_id, slug):
+        rng = self._rng(game_id)
+        genres = ''.join(f'<dt>{label}</dt><dd>{_comma_list(rng.sample(GENRES, 2) if label == "Genre" else [rng.choice(GENRES)])}</dd>'
+                         for label in ('Genre', 'Perspective', 'Gameplay'))
+        rating = f'{rng.uniform(1, 5):.1f}'
+        body = f'''
+            <h1>Game {game_id}</h1>
+            <div class="text-sm text-muted">Moby ID: {game_id} Added on 2020-01-01</div>
+            <div id="infoBlock">
+                <div class="info-score"><dl><dt>Moby Score</dt><dd>7.0</dd><dt>Players</dt>
+                    <dd><span data-tooltip="{rating} out of 5">{rating}</span></dd></dl></div>
+                <div class="info-genres"><dl class="metadata">{genres}</dl></div>
+            </div>
+            <details id="gameOfficialDescription"><summary>Official description</summary>
+                <div id="description-text"><p>Synthetic game {game_id}.</p><p>{"Lorem ipsum dolor sit amet. " * 20}</p></div>
+            </details>'''
+        return _page(f'Game {game_id}', body)
+
+    def releases_page(self, base_url, game_id, slug):
+        console_name, console_code = self.console_of(game_id)
+        tables = []
+        for index, (countries, comments, publisher) in enumerate(self._release_groups(game_id)):
+            flags = ', '.join(f'<img src="/images/flags/{index}.png" alt=""> {escape(country)}' for country in countries)
+            rows = [f'<tr><td colspan="2">Jan {index + 1}, 199{game_id % 10} Release</td></tr>',
+                    f'<tr><td>Published by:</td><td>{escape(publisher)}</td></tr>',
+                    f'<tr><td>Countries:</td><td>{flags}</td></tr>']
+            if comments:
+                rows.append(f'<tr><td>Comments:</td><td>{escape(comments)}</td></tr>')
+            rows.append(f'<tr><td>Product Code:</td><td>PC-{game_id}-{index}</td></tr>')
+            tables.append(f'<table class="releaseTable"><tbody>{"".join(rows)}</tbody></table>')
+        return _page('Releases', f'<div id="main"><h4>{escape(console_name)}</h4>{"".join(tables)}</div>')
+
+    def specs_page(self, base_url, game_id, slug):
+        console_name, console_code = self.console_of(game_id)
+        specs = (f'<table class="table-nowrap"><tbody><tr><td colspan="2"><h4>{escape(console_name)} +</h4></td></tr>'
+                 f'<tr><td>Business Model:</td><td>{_comma_list(["Commercial"])}</td></tr>'
+                 f'<tr><td>Media Type:</td><td>{_comma_list(["Cartridge"])}</td></tr>'
+                 f'<tr><td>Number of Players:</td><td>1-2</td></tr></tbody></table>')
+        ratings = (f'<table class="table-nowrap"><tbody><tr><th colspan="2"><h4>{escape(console_name)} +</h4></th></tr>'
+                   f'<tr><td>ESRB Rating:</td><td>{_comma_list(["Everyone"])}</td></tr>'
+                   f'<tr><td>PEGI Rating:</td><td>{_comma_list(["3", "7"])}</td></tr></tbody></table>')
+        return _page('Specs', specs + ratings)
+
+    def covers_page(self, base_url, game_id, slug):
+        console_name, console_code = self.console_of(game_id)
+        sections = []
+        groups = self._release_groups(game_id)
+        for index in range(self.covers):
+            countries, comments, publisher = groups[index % len(groups)]
+            variant = f' <small>({escape(comments)})</small>' if comments else ''
+            country_items = ''.join(f'<li>{escape(country)} <img src="/images/flags/{n}.png" alt=""></li>' for n, country in enumerate(countries))
+            figures = ''.join(
+                f'<figure><a href="{base_url}/game/{game_id}/{slug}/covers/gameCoverId,{index * self.images_per_cover + image}/">'
+                f'<img src="/images/thumbs/covers/{game_id}-{index}-{image}.jpg" alt=""></a></figure>'
+                for image in range(self.images_per_cover))
+            sections.append(
+                f'<section><h2><a href="#">{escape(console_name)}</a>{variant}</h2><table><tbody>'
+                f'<tr><td class="text-nowrap">Packaging:</td><td>{_comma_list(["Box"], link=False)}</td></tr>'
+                f'<tr><td class="text-nowrap">Video Standard:</td><td>{_comma_list(["NTSC"], link=False)}</td></tr>'
+                f'<tr><td class="text-nowrap">Country:</td><td><ul class="commaList">{country_items}</ul></td></tr>'
+                f'</tbody></table><div class="img-holder">{figures}</div></section>')
+        return _page('Covers', ''.join(sections))
+
+    def screenshots_page(self, base_url, game_id, slug):
+        console_name, console_code = self.console_of(game_id)
+        figures = ''.join(
+            f'<figure><a href="{base_url}/game/{game_id}/{slug}/screenshots/gameShotId,{index}/">'
+            f'<img src="/images/thumbs/screenshots/{game_id}-{index}.jpg" alt=""></a></figure>'
+            for index in range(self.screenshots))
+        return _page('Screenshots', f'<div id="screenshots-platform-{console_code}"><h2>{escape(console_name)} screenshots</h2>'
+                                    f'<div class="img-holder">{figures}</div></div>')
+
+    def image_page(self, base_url, kind, game_id, index):
+        return _page(kind, f'<figure><img src="{base_url}/images/{kind}/{game_id}-{index}.jpg" alt=""></figure>')
+
+    def listing_page(self, base_url, console_code, page):
+        game_ids = list(self.game_ids(console_code))
+        rows = ''.join(f'<tr><td><a href="{base_url}/game/{game_id}/game-{game_id}/">Game {game_id}</a></td><td>199{game_id % 10}</td></tr>'
+                       for game_id in game_ids[page * PER_PAGE:(page + 1) * PER_PAGE])
+        start = min(len(game_ids), page * PER_PAGE + 1)
+        counter = f'<p class="no-select text-muted">Showing {start}-{min(len(game_ids), (page + 1) * PER_PAGE)} of {len(game_ids):,} results</p>'
+        next_link = f'<a href="{base_url}/platform/{console_code}/page:{page + 1}/">Next</a>' if (page + 1) * PER_PAGE < len(game_ids) else ''
+        return _page('Games', f'{counter}<table><tbody>{rows}</tbody></table>{next_link}')
+
+    def games_list(self, base_url, console_code):
+        """ Entries of games_list/{console}.json for a console of the catalog """
+        return [{'game': f'Game {game_id}', 'link': f'{base_url}/game/{game_id}/game-{game_id}/', 'game_code': f'game-{game_id}'}
+                for game_id in self.game_ids(console_code)]
+
+    def platforms(self):
+        """ Entries of mobygames_platforms.json for the catalog """
+        return [{'platform': name, 'link': f'/platform/{code}/', 'games': f'{self.games_per_console} games', 'console_code': code}
+                for name, code in self.consoles]
+
+
+GAME_PAGE = re.compile(r'^/game/(\d+)/([^/]+)/(?:(releases|specs|covers|screenshots)/(?:(gameCoverId|gameShotId),(\d+)/|[^/]+/?)?)?$')
+LISTING_PAGE = re.compile(r'^/(?:platform/([^/]+)|game/platform:([^/]+)(?:/[^/]+)*?)/page:(\d+)/?$')
+
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        path = re.sub(r'/+', '/', self.path.split('?')[0])
+        if not path.endswith('/') and '.' not in path.rsplit('/', 1)[-1]:
+            path += '/'
+        if server.fixture.over_limit():
+            server.fixture.count('throttled')
+            body = b'slow down'
+            self.send_response(server.fixture.throttle_status)
+            self.send_header('Retry-After', str(server.fixture.retry_after))
+            self.send_header('Content-Type', 'text/plain')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        page_type, body, content_type = server.fixture.render(path)
+        if server.fixture.latency:
+            time.sleep(server.fixture.latency)
+        server.fixture.count(page_type)
+
+        if body is None:
+            self.send_response(404)
+            body, content_type = b'not found', 'text/plain'
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer:
+    """
+    Serves a FixtureCatalog over HTTP on 127.0.0.1.
+
+    requests counts the requests served per page type, e.g. requests['overview'].
+    latency adds a fixed delay in seconds to every response, to model the real site.
+    throttle simulates a rate-limited site: above that many requests over the last second,
+    requests are answered with throttle_status and a Retry-After of retry_after seconds,
+    counted as requests['throttled'].
+    """
+
+    def __init__(self, catalog, port=0, latency=0.0, image_size=50 * 1024, throttle=None, throttle_status=429, retry_after=1):
+        self.catalog = catalog
+        self.latency = latency
+        self.throttle = throttle
+        self.throttle_status = throttle_status
+        self.retry_after = retry_after
+        self.recent = deque()
+        self.image_body = (bytes(range(256)) * (image_size // 256 + 1))[:image_size]
+        self.requests = Counter()
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), _FixtureHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.fixture = self
+        self.base_url = f'http://127.0.0.1:{self.httpd.server_port}'
+
+    def count(self, page_type):
+        with self.lock:
+            self.requests[page_type] += 1
+
+    def over_limit(self):
+        """ Whether a request arriving now exceeds the throttle, only accepted requests count towards it """
+        if not self.throttle:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            while self.recent and self.recent[0] <= now - 1:
+                self.recent.popleft()
+            if len(self.recent) >= self.throttle:
+                return True
+            self.recent.append(now)
+            return False
+
+    def pages_served(self):
+        """ Requests served for anything but images, unknown URLs and throttled requests """
+        with self.lock:
+            return sum(count for page_type, count in self.requests.items() if page_type not in ('image', 'not_found', 'throttled'))
+
+    def render(self, path):
+        """ (page type, body bytes or None, content type) of a path """
+        if path.startswith('/images/'):
+            return 'image', self.image_body, 'image/jpeg'
+
+        html = 'text/html; charset=utf-8'
+        match = LISTING_PAGE.match(path)
+        if match:
+            console_code = match.group(1) or match.group(2)
+            if console_code in [code for name, code in self.catalog.consoles]:
+                return 'listing', self.catalog.listing_page(self.base_url, console_code, int(match.group(3))).encode(), html
+
+        match = GAME_PAGE.match(path)
+        if match:
+            game_id, slug, section, detail, index = match.groups()
+            game_id = int(game_id)
+            if not 1 <= game_id <= len(self.catalog.consoles) * self.catalog.games_per_console:
+                return 'not_found', None, html
+            if detail:
+                kind = 'covers' if detail == 'gameCoverId' else 'screenshots'
+                return f'{kind}_detail', self.catalog.image_page(self.base_url, kind, game_id, int(index)).encode(), html
+            render = {
+                None: self.catalog.overview,
+                'releases': self.catalog.releases_page,
+                'specs': self.catalog.specs_page,
+                'covers': self.catalog.covers_page,
+                'screenshots': self.catalog.screenshots_page,
+            }[section]
+            return section or 'overview', render(self.base_url, game_id, slug).encode(), html
+
+        return 'not_found', None, html
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, name='fixture-server', daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
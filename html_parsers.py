@@ -0,0 +1,445 @@
+import re
+import lxml.html
+
+# Elements that start a new line in the rendered text, used to approximate innerText
+BLOCK_TAGS = {'p', 'div', 'li', 'ul', 'ol', 'dl', 'dt', 'dd', 'tr', 'table', 'section',
+              'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'pre', 'details', 'summary'}
+
+
+def has_class(name):
+    """ XPath predicate matching elements whose class attribute contains the given class """
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def inner_text(element):
+    """ Approximates the browser's innerText: collapsed whitespace, line breaks at <br> and block elements """
+    parts = []
+
+    def walk(el):
+        if el.tag == 'br':
+            parts.append('\n')
+        elif el.tag in BLOCK_TAGS:
+            parts.append('\n')
+        if el.text and el.tag not in ('script', 'style'):
+            parts.append(el.text)
+        for child in el:
+            if isinstance(child.tag, str):
+                walk(child)
+            if child.tail:
+                parts.append(child.tail)
+        if el.tag in BLOCK_TAGS:
+            parts.append('\n')
+
+    walk(element)
+    lines = [re.sub(r'[ \t\r\f\v]+', ' ', line).strip() for line in ''.join(parts).split('\n')]
+    text = '\n'.join(lines)
+    return re.sub(r'\n{3,}', '\n\n', text).strip()
+
+
+def inner_html(element):
+    """ Serialized children of an element, like the browser's innerHTML """
+    html = element.text or ''
+    for child in element:
+        html += lxml.html.tostring(child, encoding='unicode', with_tail=True)
+    return html
+
+
+def release_row_key(text):
+    """ Turn a release table label such as "Release Date:" into a dict key """
+    return text.strip().replace(':', '').lower().replace(' ', '_')
+
+def strip_flag_images(html):
+    """ Remove the flag <img> tags from a "Countries" cell, leaving the comma separated names """
+    return re.sub(r'<img[^>]*>', '', html).strip()
+
+def release_row_texts(texts, second_cell_html):
+    """ Cell texts of a release table row, the value of a "Countries" row is taken from its HTML without the flag images """
+    if len(texts) == 2 and release_row_key(texts[0]) == 'countries':
+        texts = [texts[0], strip_flag_images(second_cell_html)]
+    return texts
+
+def _items_digest(items):
+    """ Order independent hash of dict items, updated in place as fields change """
+    digest = 0
+    for item in items:
+        digest ^= hash(item)
+    return digest
+
+
+class _ReleaseGroup:
+    """
+    One country's release while a table is being read.
+
+    base is the common table info at the time the "Countries" row was read, shared by every
+    country of that row and never modified; own holds the country and the fields added after
+    it. digest is the _items_digest of the merged fields, kept up to date on every change.
+    """
+    __slots__ = ('base', 'own', 'digest')
+
+    def __init__(self, base, own, digest):
+        self.base = base
+        self.own = own
+        self.digest = digest
+
+    def get(self, key):
+        return self.own[key] if key in self.own else self.base[key]
+
+    def as_dict(self):
+        # keys of own that override base keep the base position, like dict.copy() + assignment did
+        release = dict(self.base)
+        release.update(self.own)
+        return release
+
+
+def build_release_groups(rows):
+    """
+    Expands the rows of one release table into one dict per country.
+
+    A "Countries" row opens one group per country. Every label/value row after it is added to
+    those groups, and a label a group already has splits it into a copy keeping the old value
+    and a copy with the new one. Groups share the common fields and are tracked by identity in
+    an insertion ordered dict, so the cost is linear in rows x countries.
+
+    The previous implementation also dropped every earlier group equal by value to one of the
+    groups being updated (a list `not in` test). Groups no longer being updated never change,
+    so they are indexed by a digest of their fields and only matching digests are compared.
+
+    :param rows: List of rows, each a list of cell texts. The first row holds the release date,
+                 the others are label/value pairs. The value of a "Countries" row must already
+                 be passed through strip_flag_images.
+    :return: List of release dicts.
+    """
+    common_info = {}
+    groups = {}      # every live group, in output order
+    settled = {}     # digest -> groups no longer being updated
+    current = []     # groups the rows being read apply to
+
+    def settle(finished):
+        for group in finished:
+            settled.setdefault(group.digest, []).append(group)
+
+    if rows and rows[0]:
+        common_info['release_date'] = rows[0][0].strip().replace(" Release", "")
+
+    for cells in rows[1:]:
+        if len(cells) != 2:
+            # Reset the section when not a key-value row
+            settle(current)
+            current = []
+            continue
+
+        key, value_text = release_row_key(cells[0]), cells[1].strip()
+
+        if key == 'countries':
+            base = dict(common_info)
+            base_digest = _items_digest(base.items())
+            if 'country' in base:
+                base_digest ^= hash(('country', base['country']))
+            settle(current)
+            current = []
+            for country in cells[1].split(','):
+                country = country.strip()
+                group = _ReleaseGroup(base, {'country': country}, base_digest ^ hash(('country', country)))
+                groups[group] = True
+                current.append(group)
+
+        elif current:
+            added = hash((key, value_text))
+            updated = []
+            for group in current:
+                if key in group.own or key in group.base:
+                    # Split entry
+                    updated.append(_ReleaseGroup(group.base, group.own.copy(), group.digest))
+                    split = _ReleaseGroup(group.base, group.own.copy(), group.digest ^ hash((key, group.get(key))) ^ added)
+                    split.own[key] = value_text
+                    updated.append(split)
+                else:
+                    group.own[key] = value_text
+                    group.digest ^= added
+                    updated.append(group)
+
+            if settled:
+                for group in current:
+                    candidates = settled.get(group.digest)
+                    if candidates:
+                        release = group.as_dict()
+                        for duplicate in [candidate for candidate in candidates if candidate.as_dict() == release]:
+                            candidates.remove(duplicate)
+                            del groups[duplicate]
+            for group in current:
+                del groups[group]
+            for group in updated:
+                groups[group] = True
+            current = updated
+
+        else:
+            # Gather common information
+            common_info[key] = value_text
+
+    return [group.as_dict() for group in groups]
+
+
+def build_releases(tables_by_header):
+    """
+    Release groups per console.
+
+    :param tables_by_header: [(console name, [table rows, ...]), ...] in page order, each table
+                             a list of rows as returned by release_row_texts.
+    :return: Dict of console name to its list of release dicts.
+    """
+    releases = {}
+    for console_name, tables in tables_by_header:
+        # a repeated console header reuses the tables of its first occurrence
+        if console_name in releases:
+            continue
+        releases[console_name] = []
+        for rows in tables:
+            releases[console_name].extend(build_release_groups(rows))
+    return releases
+
+
+def parse_overview_html(html):
+    """ Same dict as MobyGamesScraper.get_overview_details, read from the overview page HTML """
+    doc = lxml.html.fromstring(html)
+
+    title = inner_text(doc.xpath('//h1')[0])
+    mobyid = [text.text_content().split('Moby ID: ')[1].split(' ')[0].strip()
+              for text in doc.xpath(f"//*[{has_class('text-sm')} and {has_class('text-muted')}]")
+              if 'Moby ID' in text.text_content()][0]
+
+    info_block = doc.xpath("//*[@id='infoBlock']")[0]
+
+    rating = info_block.xpath(f".//*[{has_class('info-score')}]//dl/dt[contains(., 'Players')]"
+                              "/following-sibling::*[1][self::dd]//span")
+    rating = rating[0].get('data-tooltip', '').split(' ')[0] if rating else None
+
+    game_details = info_block.xpath(f".//*[{has_class('info-genres')}]//dl[{has_class('metadata')}]/dt")
+    game_details_values = info_block.xpath(f".//*[{has_class('info-genres')}]//dl[{has_class('metadata')}]/dd")
+
+    overview = {}
+    for index, key in enumerate(game_details):
+        key = key.text_content().strip()
+        values = ','.join([inner_text(a_tag) for a_tag in game_details_values[index].xpath('.//a')])
+        overview[key] = values
+
+    # #description-text is served inside the closed <details>; the browser path opens it and
+    # waits for it to have text in case the page's scripts fill it in (see resource_policy)
+    description = doc.xpath("//*[@id='description-text']")
+    if description: description = inner_text(description[0])
+    elif doc.xpath("//*[@id='gameOfficialDescription']"):
+        description = inner_text(doc.xpath("//*[@id='gameOfficialDescription']")[0])
+    else:
+        description = None
+
+    return {
+        "title": title,
+        "mobyid": mobyid,
+        "rating": rating if rating else '',
+        "description": description,
+        **overview
+    }
+
+
+def _spec_tables(doc):
+    return doc.xpath(f"//table[{has_class('table-nowrap')}]")
+
+
+def _comma_list_links(row):
+    return [a.text_content().strip() for a in row.xpath(f"./*[2][self::td]//ul[{has_class('commaList')}]/li//a")]
+
+
+def _table_label(row):
+    # JS String.replace with a string pattern only replaces the first ':'
+    return row.xpath('.//td')[0].text_content().replace(':', '', 1).replace(' ', '_').lower().strip()
+
+
+def parse_specs_html(html):
+    """ Same dict as MobyGamesScraper.get_specs, read from the specs page HTML """
+    result = {}
+    tables = _spec_tables(lxml.html.fromstring(html))
+    if not tables:
+        return result
+
+    current_console = None
+    for row in tables[0].xpath('.//tbody/tr'):
+        header = row.xpath('.//td//h4')
+        if header:
+            current_console = re.sub(r'\s*\+\s*$', '', header[0].text_content().strip()).strip()
+            result.setdefault(current_console, {})
+        elif current_console and len(row.xpath('.//td')) >= 2:
+            spec_type = _table_label(row)
+            spec_values = _comma_list_links(row)
+            if not spec_values:
+                value_cell = row.xpath('./*[2][self::td]')
+                if value_cell:
+                    spec_values.append(value_cell[0].text_content().strip())
+
+            if len(spec_values) == 1:
+                result[current_console][spec_type] = spec_values[0]
+            elif len(spec_values) > 1:
+                result[current_console][spec_type] = ','.join(spec_values)
+
+    return result
+
+
+def parse_ratings_html(html):
+    """ Same dict as MobyGamesScraper.get_ratings, read from the specs page HTML """
+    result = {}
+    tables = _spec_tables(lxml.html.fromstring(html))
+    if not tables:
+        return result
+
+    current_console = None
+    for row in tables[-1].xpath('.//tbody/tr'):
+        header = row.xpath('.//th//h4')
+        if header:
+            current_console = re.sub(r'\s*\+\s*$', '', header[0].text_content().strip()).strip()
+            result.setdefault(current_console, {})
+        elif current_console and len(row.xpath('.//td')) >= 2:
+            rating_type = _table_label(row)
+            rating_values = _comma_list_links(row)
+
+            if len(rating_values) == 1:
+                result[current_console][rating_type] = rating_values[0]
+            elif len(rating_values) > 1:
+                result[current_console][rating_type] = rating_values
+
+    return result
+
+
+def _release_table_rows(table):
+    rows = []
+    for row in table.xpath('.//tbody/tr'):
+        cells = row.xpath('.//td')
+        rows.append(release_row_texts([inner_text(cell) for cell in cells], inner_html(cells[1]) if len(cells) == 2 else None))
+    return rows
+
+
+def parse_releases_html(html):
+    """ Same dict as MobyGamesScraper.get_releases, read from the releases page HTML """
+    doc = lxml.html.fromstring(html)
+    main = doc.xpath("//*[@id='main']")
+    console_headers = set(main[0].iter('h4')) if main else set()
+
+    # Walk the document once, assigning each release table to the console header before it
+    tables_by_header = []
+    for element in doc.iter():
+        if element in console_headers:
+            tables_by_header.append((inner_text(element), []))
+        elif element.tag == 'table' and tables_by_header and 'releaseTable' in element.get('class', '').split():
+            tables_by_header[-1][1].append(element)
+
+    return build_releases([(console_name, [_release_table_rows(table) for table in tables])
+                           for console_name, tables in tables_by_header])
+
+
+def _labelled_items(section, label):
+    """ ul.commaList items next to the first `td.text-nowrap` label cell of section containing label """
+    for cell in section.xpath(f'.//tr//td[{has_class("text-nowrap")}]'):
+        if label in cell.text_content():
+            value_cell = cell.getnext()
+            return value_cell.xpath(f'.//ul[{has_class("commaList")}]//li') if value_cell is not None else []
+    return []
+
+
+def _first_figure_links(container):
+    """ href of the first link of every `div.img-holder figure` in container, in page order """
+    links = []
+    for figure in container.xpath(f'.//div[{has_class("img-holder")}]//figure'):
+        anchors = figure.xpath('.//a')
+        if anchors and anchors[0].get('href'):
+            links.append(anchors[0].get('href'))
+    return links
+
+
+def parse_covers_html(html):
+    """ HTML counterpart of COVERS_JS: per console, one entry per country of each cover group with its cover page links """
+    result = {}
+    for section in lxml.html.fromstring(html).xpath('//section'):
+        console_header = section.xpath('.//h2//a')
+        if not console_header:
+            continue
+        console_name = console_header[0].text_content().strip()
+        variant = section.xpath('.//h2//small')
+        variant_name = re.sub(r'^\(|\)$', '', variant[0].text_content().strip()).strip() if variant else ''
+        entries = result.setdefault(console_name, [])
+
+        packaging = ', '.join(item.text_content().strip() for item in _labelled_items(section, 'Packaging:'))
+        if 'Electronic' in packaging:
+            continue
+        video_standard = ', '.join(item.text_content().strip() for item in _labelled_items(section, 'Video Standard:'))
+
+        cover_links = _first_figure_links(section)
+        for item in _labelled_items(section, 'Country:'):
+            # the text before the flag image, like childNodes[0] in the browser
+            if item.text is not None:
+                country_name = item.text.strip()
+            else:
+                country_name = item[0].text_content().strip() if len(item) else ''
+            entries.append({
+                'packaging': packaging,
+                'comments': variant_name,
+                'video_standard': video_standard,
+                'country': country_name,
+                'cover_links': list(cover_links),
+            })
+    return result
+
+
+def parse_screenshot_links_html(html):
+    """ HTML counterpart of SCREENSHOT_LINKS_JS: per console, the screenshot page links as written in the page """
+    result = {}
+    for section in lxml.html.fromstring(html).xpath('//div[starts-with(@id, "screenshots-platform-")]'):
+        console_header = section.xpath('.//h2')
+        if not console_header:
+            continue
+        console_name = re.sub(r'\s+screenshots$', '', console_header[0].text_content().strip())
+        result[console_name] = _first_figure_links(section)
+    return result
+
+
+def parse_figure_image_html(html):
+    """ HTML counterpart of COVER_IMAGE_JS: src of the first `figure img` of a cover or screenshot page """
+    images = lxml.html.fromstring(html).xpath('//figure//img')
+    return images[0].get('src') if images else None
+
+
+def parse_result_count(text):
+    """ Number of games from the listing counter, e.g. 'Showing 1-50 of 1,234 results' -> 1234 """
+    return int(text.split('results')[0].strip().replace(',', '').split()[-1])
+
+
+def parse_listing_html(html):
+    """
+    Games on one page of a game listing such as /game/platform:wii/sort:title/page:0/
+
+    :return: {'count': total results from the counter, or None when the page has none,
+              'games': [{'game', 'link', 'game_code'}, ...], 'has_next': whether a "Next" link exists}
+    """
+    doc = lxml.html.fromstring(html)
+
+    counter = doc.xpath(f"//p[{has_class('no-select')} and {has_class('text-muted')}]")
+    count = parse_result_count(inner_text(counter[0])) if counter else None
+
+    games = []
+    for row in doc.xpath('//tbody/tr'):
+        links = row.xpath('.//td//a')
+        if not links:
+            continue
+        game_link = links[0].get('href')
+        games.append({
+            'game': inner_text(links[0]),
+            'link': game_link,
+            'game_code': game_link.strip('/').split('/')[-1]
+        })
+
+    return {
+        'count': count,
+        'games': games,
+        'has_next': bool(doc.xpath("//a[contains(., 'Next')]")),
+    }
+
+
+def parse_year_links(html):
+    """ Years linked from a platform page, e.g. /game/platform:wii/year:2008/ -> '2008' """
+    return [href.split("year:")[-1].split("/")[0] for href in lxml.html.fromstring(html).xpath("//a[contains(@href, 'year')]/@href")]
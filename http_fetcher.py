@@ -0,0 +1,57 @@
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from metrics import get_metrics
+from retry import parse_retry_after
+from rate_limiter import limiter_for
+
+
+class HttpFetcher:
+    """
+    Fetches server-rendered MobyGames pages without a browser.
+
+    One requests.Session is shared by every fetch so connections to www.mobygames.com are
+    kept alive and reused; pool_size bounds how many connections can be open at once and
+    should match the number of threads fetching through this instance. Every request is
+    recorded in the metrics under `stage`, with the bytes received.
+
+    Requests are paced by `rate_limiter`, by default the process wide limiter of the
+    requested host (see get_rate_limiter), False sends them unpaced.
+    """
+
+    def __init__(self, cookies=None, user_agent=None, pool_size=10, timeout=60, stage='fetch', rate_limiter=None):
+        self.timeout = timeout
+        self.stage = stage
+        self.rate_limiter = rate_limiter
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        if user_agent:
+            self.session.headers['User-Agent'] = user_agent
+        for cookie in cookies or []:
+            self.session.cookies.set(cookie['name'], cookie['value'], domain=cookie['domain'], path=cookie['path'])
+
+    def get(self, url):
+        """ Return the HTML of a page, raising requests.HTTPError on a non 2xx status """
+        rate_limiter = limiter_for(self.rate_limiter, url)
+        if rate_limiter:
+            rate_limiter.acquire()
+        start = time.perf_counter()
+        response = None
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            return response.text
+        finally:
+            seconds = time.perf_counter() - start
+            if rate_limiter:
+                if response is None:
+                    rate_limiter.record(seconds, failed=True)
+                else:
+                    rate_limiter.record(seconds, response.status_code, parse_retry_after(response.headers.get('Retry-After')))
+            get_metrics().record_stage(self.stage, seconds, ok=response is not None and response.ok,
+                                       nbytes=len(response.content) if response is not None else None)
+
+    def close(self):
+        self.session.close()
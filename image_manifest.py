@@ -0,0 +1,95 @@
+import os, sqlite3, threading, argparse
+
+
+class ImageManifest:
+    """
+    Local record of every image already copied to S3.
+
+    images maps a MobyGames image URL, copied into a bucket and folder, and the sha256 of
+    its bytes to the S3 key and ETag it was stored under, so a re-scrape can skip images it
+    has seen before and identical images published under different URLs are stored once
+    per bucket. bucket_keys lists objects that were already in a bucket before the
+    manifest existed (see seed_from_bucket). Copying the same image into another bucket or
+    folder is a separate entry.
+    """
+
+    def __init__(self, path='data/image_manifest.sqlite'):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript('''
+            CREATE TABLE IF NOT EXISTS images (
+                bucket TEXT NOT NULL,
+                folder TEXT NOT NULL,
+                source_url TEXT NOT NULL,
+                content_hash TEXT,
+                s3_key TEXT NOT NULL,
+                etag TEXT,
+                PRIMARY KEY (bucket, folder, source_url)
+            );
+            CREATE INDEX IF NOT EXISTS images_content_hash ON images (bucket, content_hash);
+            CREATE TABLE IF NOT EXISTS bucket_keys (
+                bucket TEXT NOT NULL,
+                s3_key TEXT NOT NULL,
+                etag TEXT,
+                PRIMARY KEY (bucket, s3_key)
+            );
+        ''')
+        self.db.commit()
+
+    def key_for_source(self, bucket, folder, source_url):
+        """ S3 key an image URL was stored under when copied into that bucket and folder, or None """
+        with self.lock:
+            row = self.db.execute('SELECT s3_key FROM images WHERE bucket = ? AND folder = ? AND source_url = ?',
+                                  (bucket, folder, source_url)).fetchone()
+        return row[0] if row else None
+
+    def find_by_hash(self, bucket, content_hash):
+        """ (s3_key, etag) of an image of the bucket with the same content, or None """
+        with self.lock:
+            row = self.db.execute('SELECT s3_key, etag FROM images WHERE bucket = ? AND content_hash = ? LIMIT 1',
+                                  (bucket, content_hash)).fetchone()
+        return row if row else None
+
+    def has_bucket_key(self, bucket, s3_key):
+        with self.lock:
+            return self.db.execute('SELECT 1 FROM bucket_keys WHERE bucket = ? AND s3_key = ?', (bucket, s3_key)).fetchone() is not None
+
+    def record(self, bucket, folder, source_url, content_hash, s3_key, etag):
+        with self.lock:
+            self.db.execute('INSERT OR REPLACE INTO images (bucket, folder, source_url, content_hash, s3_key, etag) VALUES (?, ?, ?, ?, ?, ?)',
+                            (bucket, folder, source_url, content_hash, s3_key, etag))
+            self.db.commit()
+
+    def seed_from_bucket(self, s3_client, bucket_name, prefixes=('covers/', 'screenshots/')):
+        """ Remember the objects already in the bucket, returns how many were added """
+        added = 0
+        paginator = s3_client.get_paginator('list_objects_v2')
+        for prefix in prefixes:
+            for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+                rows = [(bucket_name, obj['Key'], obj['ETag'].strip('"')) for obj in page.get('Contents', [])]
+                with self.lock:
+                    self.db.executemany('INSERT OR IGNORE INTO bucket_keys (bucket, s3_key, etag) VALUES (?, ?, ?)', rows)
+                    self.db.commit()
+                added += len(rows)
+        return added
+
+    def close(self):
+        self.db.close()
+
+
+if __name__ == '__main__':
+
+    import boto3
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description='Record the covers and screenshots already in the bucket in the image manifest.')
+    parser.add_argument('--bucket', default=os.getenv('BUCKET_NAME'))
+    parser.add_argument('--manifest', default=os.getenv('IMAGE_MANIFEST', 'data/image_manifest.sqlite'))
+    args = parser.parse_args()
+
+    manifest = ImageManifest(args.manifest)
+    count = manifest.seed_from_bucket(boto3.client('s3', endpoint_url=os.getenv('S3_ENDPOINT_URL')), args.bucket)
+    print(f"✅ {count} existing objects recorded in {args.manifest}")
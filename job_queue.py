@@ -0,0 +1,140 @@
+import os, json, time, sqlite3
+
+# Stages run in this order for a console: its export job only becomes available
+# once all of its scrape jobs are done (or, with allow_partial, at least given up on).
+STAGES = ('scrape', 'export')
+
+
+class JobQueue:
+    """
+    Durable SQLite work queue shared by every scraper worker.
+
+    There is one job per (console, game_url, stage), moving through
+    pending -> leased -> done, or back to pending when it fails, until it runs out of
+    attempts and becomes failed. A leased job whose worker died becomes available again
+    once its lease expires, so a crash loses at most the jobs that were in flight.
+    Several worker processes can share one queue file.
+
+    A failed job holds back the later stages of its console, so an export never leaves
+    games out without notice: retry_failed() gives them another go, allow_partial=True
+    exports without them.
+    """
+
+    def __init__(self, path='data/jobs.sqlite', lease_seconds=1800, max_attempts=3, allow_partial=False):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.allow_partial = allow_partial
+        # autocommit mode, leasing opens its own IMMEDIATE transaction
+        self.db = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.executescript('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY,
+                console TEXT NOT NULL,
+                game_url TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                stage_order INTEGER NOT NULL,
+                payload TEXT,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                leased_by TEXT,
+                lease_expires REAL,
+                error TEXT,
+                updated_at REAL,
+                UNIQUE (console, game_url, stage)
+            );
+            CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, stage_order, id);
+            CREATE INDEX IF NOT EXISTS jobs_console ON jobs (console, stage_order, state);
+        ''')
+
+    def enqueue(self, console, game_url, stage, payload=None):
+        """ Add a job unless it already exists, returns True if it was added """
+        cursor = self.db.execute(
+            'INSERT OR IGNORE INTO jobs (console, game_url, stage, stage_order, payload, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
+            (console, game_url, stage, STAGES.index(stage), json.dumps(payload), time.time()))
+        return cursor.rowcount == 1
+
+    def enqueue_many(self, jobs):
+        """ Add (console, game_url, stage, payload) tuples in one transaction """
+        now = time.time()
+        self.db.execute('BEGIN IMMEDIATE')
+        try:
+            self.db.executemany(
+                'INSERT OR IGNORE INTO jobs (console, game_url, stage, stage_order, payload, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
+                [(console, game_url, stage, STAGES.index(stage), json.dumps(payload), now) for console, game_url, stage, payload in jobs])
+            self.db.execute('COMMIT')
+        except Exception:
+            self.db.execute('ROLLBACK')
+            raise
+
+    def has_console(self, console):
+        return self.db.execute('SELECT 1 FROM jobs WHERE console = ? LIMIT 1', (console,)).fetchone() is not None
+
+    def lease(self, worker_id, stages=STAGES):
+        """ Claim the next runnable job for worker_id, or return None when there is nothing to do """
+        now = time.time()
+        placeholders = ','.join('?' * len(stages))
+        blocking = "('pending', 'leased')" if self.allow_partial else "('pending', 'leased', 'failed')"
+        self.db.execute('BEGIN IMMEDIATE')
+        try:
+            row = self.db.execute(f'''
+                SELECT * FROM jobs
+                WHERE (state = 'pending' OR (state = 'leased' AND lease_expires < ?))
+                  AND stage IN ({placeholders})
+                  AND NOT EXISTS (
+                      SELECT 1 FROM jobs earlier
+                      WHERE earlier.console = jobs.console
+                        AND earlier.stage_order < jobs.stage_order
+                        AND earlier.state IN {blocking}
+                  )
+                ORDER BY stage_order, id
+                LIMIT 1
+            ''', (now, *stages)).fetchone()
+            if row is None:
+                self.db.execute('COMMIT')
+                return None
+            self.db.execute(
+                "UPDATE jobs SET state = 'leased', leased_by = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (worker_id, now + self.lease_seconds, now, row['id']))
+            self.db.execute('COMMIT')
+        except Exception:
+            self.db.execute('ROLLBACK')
+            raise
+
+        job = dict(row)
+        job['payload'] = json.loads(job['payload']) if job['payload'] else None
+        job['attempts'] += 1
+        return job
+
+    def complete(self, job_id):
+        self.db.execute("UPDATE jobs SET state = 'done', leased_by = NULL, lease_expires = NULL, error = NULL, updated_at = ? WHERE id = ?",
+                        (time.time(), job_id))
+
+    def fail(self, job_id, error):
+        """ Put a job back in the queue, or mark it failed once it used up max_attempts """
+        self.db.execute('''
+            UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                            leased_by = NULL, lease_expires = NULL, error = ?, updated_at = ?
+            WHERE id = ?
+        ''', (self.max_attempts, str(error), time.time(), job_id))
+
+    def retry_failed(self, console=None):
+        """ Give failed jobs a fresh set of attempts """
+        if console:
+            self.db.execute("UPDATE jobs SET state = 'pending', attempts = 0 WHERE state = 'failed' AND console = ?", (console,))
+        else:
+            self.db.execute("UPDATE jobs SET state = 'pending', attempts = 0 WHERE state = 'failed'")
+
+    def counts(self, console=None):
+        """ Number of jobs per state """
+        if console:
+            rows = self.db.execute('SELECT state, COUNT(*) FROM jobs WHERE console = ? GROUP BY state', (console,))
+        else:
+            rows = self.db.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state')
+        return {state: count for state, count in rows}
+
+    def close(self):
+        self.db.close()
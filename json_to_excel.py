@@ -1,50 +1,168 @@
-import json
-import pandas as pd
+import os, json
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
 
-def export_json_to_excel(json_file_or_data, output_filename="output.xlsx", priority_fields=None):
+# rows of an Excel sheet, the header included
+SHEET_ROW_LIMIT = 1048576
+
+# sheets written to one file before rolling over to the next file
+SHEETS_PER_FILE = 4
+
+
+def load_entries(json_file_or_data):
+    """ Entries of a JSON file path, or the entries themselves """
+    if isinstance(json_file_or_data, str):
+        with open(json_file_or_data, "r", encoding="utf-8") as file:
+            json_data = json.load(file)
+
+        if not isinstance(json_data, list):
+            raise ValueError("JSON file must contain a list of objects.")
+        return json_data
+    return json_file_or_data
+
+
+def entries_source(json_file_or_entries):
     """
-    Reads a JSON file, extracts unique fields, and exports data to an Excel file.
-    :param json_file: Path to the input JSON file
-    :param output_filename: Path to the output Excel file
-    :param priority_fields: List of fields to appear first in the Excel file
+    A callable returning a new iterator over the entries on each call.
+
+    Callables are returned as they are, e.g. lambda: store.iter_entries(platform), so the
+    entries can be read more than once without holding them.
     """
-    try:
-        # Load JSON data from file
-        if isinstance(json_file_or_data, str):
-            with open(json_file_or_data, "r", encoding="utf-8") as file:
-                json_data = json.load(file)
+    if callable(json_file_or_entries):
+        return json_file_or_entries
+    entries = load_entries(json_file_or_entries)
+    return lambda: entries
+
+
+def ordered_fields(entries, priority_fields=None):
+    """ Priority fields first, then every other field of the entries sorted by name """
+    all_keys = set()
+    for entry in entries:
+        all_keys.update(entry.keys())
+    return sort_fields(all_keys, priority_fields)
+
+
+def sort_fields(keys, priority_fields=None):
+    """ Priority fields first, then the other keys sorted by name, e.g. for the keys of OutputStore.fields() """
+    # Ensure priority fields appear first
+    priority_fields = priority_fields or []
+    remaining_fields = sorted(set(keys) - set(priority_fields))  # Sort remaining fields
+
+    # Final ordered field list
+    return priority_fields + remaining_fields
+
+
+def format_entry(entry, fields):
+    """ Value of each field of an entry, lists joined with ', ' """
+    return {key: ", ".join(map(str, entry[key])) if isinstance(entry.get(key, None), list) else entry.get(key, None)
+            for key in fields}
 
 
-            if not isinstance(json_data, list):
-                raise ValueError("JSON file must contain a list of objects.")
-        else:
-            json_data = json_file_or_data
+def format_entries(entries, fields):
+    """ Rows of the entries with a value for each field. Placeholder entries are skipped """
+    return [format_entry(entry, fields) for entry in entries if len(list(entry.keys())) > 1]
 
-        all_keys = set()
-        for entry in json_data:
-            all_keys.update(entry.keys())
 
-        # Ensure priority fields appear first
-        priority_fields = priority_fields or []
-        remaining_fields = sorted(all_keys - set(priority_fields))  # Sort remaining fields
+def column_title(field):
+    return field.replace('_', ' ').title()
 
-        # Final ordered field list
-        ordered_fields = priority_fields + remaining_fields
 
-        # Convert JSON data to a consistent format
-        formatted_data = [
-            {key: ", ".join(map(str, entry[key])) if isinstance(entry.get(key, None), list) else entry.get(key, None)
-            for key in ordered_fields}
-            for entry in json_data if len(list(entry.keys())) > 1
-        ]
+def _cell_value(value):
+    return value if value is None or isinstance(value, (str, int, float, bool)) else str(value)
 
-        # Create a DataFrame and export to Excel
-        df = pd.DataFrame(formatted_data)
-        df.columns = [col.replace('_', ' ').title() for col in df.columns]
 
-        df.to_excel(output_filename, index=False)
+def _part_filename(output_filename, part):
+    """ output.xlsx, output_2.xlsx, output_3.xlsx... """
+    if part == 1:
+        return output_filename
+    stem, extension = os.path.splitext(output_filename)
+    return f"{stem}_{part}{extension}"
+
+
+class _ExcelWriter:
+    """ Appends rows to write-only workbooks, starting a new sheet or file when one is full """
+
+    def __init__(self, output_filename, titles, rows_per_sheet, sheets_per_file):
+        self.output_filename = output_filename
+        self.titles = titles
+        self.rows_per_sheet = rows_per_sheet
+        self.sheets_per_file = sheets_per_file
+        self.filenames = []
+        self.workbook = None
+        self.sheet = None
+        self.sheet_rows = 0
+        self._new_file()
+
+    def _new_file(self):
+        self.close()
+        self.workbook = Workbook(write_only=True)
+        self.filenames.append(_part_filename(self.output_filename, len(self.filenames) + 1))
+        self._new_sheet()
+
+    def _new_sheet(self):
+        # same sheet names and header style as DataFrame.to_excel
+        self.sheet = self.workbook.create_sheet(f"Sheet{len(self.workbook.worksheets) + 1}")
+        thin = Side(style='thin')
+        header = []
+        for title in self.titles:
+            cell = WriteOnlyCell(self.sheet, value=title)
+            cell.font = Font(bold=True)
+            cell.border = Border(left=thin, right=thin, top=thin, bottom=thin)
+            cell.alignment = Alignment(horizontal='center', vertical='top')
+            header.append(cell)
+        self.sheet.append(header)
+        self.sheet_rows = 0
+
+    def append(self, values):
+        if self.sheet_rows == self.rows_per_sheet:
+            if len(self.workbook.worksheets) == self.sheets_per_file:
+                self._new_file()
+            else:
+                self._new_sheet()
+        self.sheet.append(values)
+        self.sheet_rows += 1
+
+    def close(self):
+        if self.workbook is not None:
+            self.workbook.save(self.filenames[-1])
+            self.workbook = None
+
+
+def export_json_to_excel(json_file_or_data, output_filename="output.xlsx", priority_fields=None, fields=None,
+                         rows_per_sheet=SHEET_ROW_LIMIT - 1, sheets_per_file=SHEETS_PER_FILE):
+    """
+    Reads a JSON file, extracts unique fields, and exports data to an Excel file.
+
+    Rows are streamed into a write-only workbook as they are formatted, so memory stays flat
+    whatever the number of rows. A sheet holds at most `rows_per_sheet` rows below its header,
+    Sheet2, Sheet3... follow, and after `sheets_per_file` sheets the rows go on in
+    output_2.xlsx, output_3.xlsx...
+
+    :param json_file_or_data: Path to the input JSON file, a list of entries, or a callable
+                              returning a new iterator over the entries on each call
+    :param output_filename: Path to the output Excel file
+    :param priority_fields: List of fields to appear first in the Excel file
+    :param fields: Columns to write, in order, e.g. sort_fields(store.fields(platform), priority_fields).
+                   Found by reading the entries one more time when omitted
+    :return: Paths of the files written
+    """
+    try:
+        # Load JSON data from file
+        iter_entries = entries_source(json_file_or_data)
+        fields = fields or ordered_fields(iter_entries(), priority_fields)
+
+        if os.path.dirname(output_filename):
+            os.makedirs(os.path.dirname(output_filename), exist_ok=True)
+        writer = _ExcelWriter(output_filename, [column_title(field) for field in fields], rows_per_sheet, sheets_per_file)
+        for entry in iter_entries():
+            if len(list(entry.keys())) > 1:
+                row = format_entry(entry, fields)
+                writer.append([_cell_value(row[field]) for field in fields])
+        writer.close()
 
-        print(f"✅ Data exported successfully to {output_filename}")
+        print(f"✅ Data exported successfully to {', '.join(writer.filenames)}")
+        return writer.filenames
 
     except Exception as e:
         print(f"❌ Error: {e}")
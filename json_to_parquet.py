@@ -0,0 +1,53 @@
+import os, itertools
+import pyarrow as pa
+import pyarrow.parquet as pq
+from json_to_excel import entries_source, ordered_fields, format_entries
+
+# games written per record batch, a row group of the Parquet file
+GAMES_PER_BATCH = 500
+
+
+def _column_value(value):
+    return value if value is None or isinstance(value, str) else str(value)
+
+
+def export_json_to_parquet(json_file_or_entries, output_filename="output.parquet", priority_fields=None, games_per_batch=GAMES_PER_BATCH, fields=None):
+    """
+    Exports entries to a Parquet file with the columns export_json_to_excel writes, in the same order.
+
+    Columns keep their field names (published_by, not "Published By") so queries can select
+    them, and are dictionary-encoded strings: most values (console, country, publisher,
+    genre...) repeat across thousands of rows. Rows are written in record batches of
+    `games_per_batch` games, so only one batch is held in memory.
+
+    :param json_file_or_entries: Path to a JSON file, a list of entries, or a callable returning
+                                 a new iterator over the entries on each call, like
+                                 lambda: store.iter_entries(platform).
+    :param output_filename: Path to the output Parquet file, replaced atomically
+    :param priority_fields: List of fields to appear first
+    :param fields: Columns to write, in order. Found by reading the entries one more time when omitted
+    """
+    iter_entries = entries_source(json_file_or_entries)
+    fields = fields or ordered_fields(iter_entries(), priority_fields)
+    column_type = pa.dictionary(pa.int32(), pa.string())
+    schema = pa.schema([(field, column_type) for field in fields])
+
+    if os.path.dirname(output_filename):
+        os.makedirs(os.path.dirname(output_filename), exist_ok=True)
+    tmp_filename = f'{output_filename}.tmp'
+    rows_written = 0
+    with pq.ParquetWriter(tmp_filename, schema, compression='zstd') as writer:
+        games = (list(game_entries) for _, game_entries in itertools.groupby(iter_entries(), key=lambda entry: entry.get('game_url')))
+        while True:
+            batch_games = list(itertools.islice(games, games_per_batch))
+            if not batch_games:
+                break
+            rows = format_entries([entry for game_entries in batch_games for entry in game_entries], fields)
+            if not rows:
+                continue
+            columns = [pa.array([_column_value(row[field]) for row in rows], pa.string()).dictionary_encode() for field in fields]
+            writer.write_batch(pa.RecordBatch.from_arrays(columns, schema=schema))
+            rows_written += len(rows)
+    os.replace(tmp_filename, output_filename)
+
+    print(f"✅ {rows_written} rows exported successfully to {output_filename}")
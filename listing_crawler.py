@@ -0,0 +1,86 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+from http_fetcher import HttpFetcher
+from html_parsers import parse_listing_html
+from retry import RetryPolicy
+from listing_planner import LISTING_LIMIT
+from metrics import get_metrics
+
+# the perPage cookie fixes how many games a listing page shows
+PER_PAGE = 50
+
+LISTING_COOKIES = [
+    {
+        "name": "remember-www",
+        "value": "login-v2-1114323-1100295|ce4be64d911bef101abeedc6ee2b1b0bef83b8c30ea51ceecb325c9bcc3e21a78bd85f68ad2f804e88890f10d2ab2ed18884dbee93139e7dac02af086c673227",
+        "domain": ".mobygames.com",
+        "path": "/",
+    },
+    {"name": "showIcons", "value": "false", "domain": ".mobygames.com", "path": "/"},
+    {"name": "perPage", "value": str(PER_PAGE), "domain": ".mobygames.com", "path": "/"},
+]
+
+
+def page_url(url, index):
+    return f"{url.rstrip('/')}/page:{index}/"
+
+
+class ListingCrawler:
+    """
+    Reads every page of a game listing over HTTP.
+
+    The first page gives the total result count, so the number of pages is known up front
+    and the rest are fetched at once on a bounded thread pool instead of following "Next"
+    one page at a time; rows are merged back in page order. A listing without a counter
+    falls back to following "Next".
+
+    Game listings (/game/...) stop after `limit` results; pass limit=None for the
+    platform pages (/platform/...), which page through every game.
+
+    Page fetches are paced by `rate_limiter`, see HttpFetcher.
+    """
+
+    def __init__(self, max_workers=8, per_page=PER_PAGE, limit=LISTING_LIMIT, user_agent=None, retry=None, rate_limiter=None):
+        self.per_page = per_page
+        self.limit = limit
+        self.fetcher = HttpFetcher(cookies=LISTING_COOKIES, user_agent=user_agent, pool_size=max_workers, stage='listing_page',
+                                   rate_limiter=rate_limiter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='listing')
+        self.retry = retry or RetryPolicy(default_budget=None)
+
+    def _fetch_page(self, url, index):
+        listing_page = parse_listing_html(self.retry.call('fetch', self.fetcher.get, page_url(url, index)))
+        get_metrics().inc('listing_games_total', len(listing_page['games']))
+        return listing_page
+
+    def count(self, url):
+        """ Total results of a listing, None when the page shows no counter """
+        return self._fetch_page(url, 0)['count']
+
+    def crawl(self, url):
+        """ Games of every page of a listing, in listing order """
+        first_page = self._fetch_page(url, 0)
+        if first_page['count'] is None:
+            return self._follow_next(url, first_page, 1, list(first_page['games']))
+
+        # MobyGames only pages through the first `limit` results of a game listing
+        total = first_page['count'] if self.limit is None else min(first_page['count'], self.limit)
+        pages = max(1, math.ceil(total / self.per_page))
+        print(f"{url}: {first_page['count']} results on {pages} pages")
+        games = list(first_page['games'])
+        last_page = first_page
+        for last_page in self.executor.map(lambda index: self._fetch_page(url, index), range(1, pages)):
+            games.extend(last_page['games'])
+        # the counter was off (games added since the first page was read), carry on one page at a time
+        return self._follow_next(url, last_page, pages, games)
+
+    def _follow_next(self, url, listing_page, index, games):
+        while listing_page['has_next'] and listing_page['games'] and (self.limit is None or index * self.per_page <= self.limit):
+            listing_page = self._fetch_page(url, index)
+            games.extend(listing_page['games'])
+            index += 1
+        return games
+
+    def close(self):
+        self.executor.shutdown()
+        self.fetcher.close()
@@ -0,0 +1,134 @@
+import os, json, string
+from urllib.parse import quote
+
+BASE_URL = 'https://www.mobygames.com/game/'
+
+# facets in the order MobyGames writes them in a listing URL
+URL_FACETS = ('from', 'genre', 'platform', 'title', 'until')
+
+# a listing only pages through its first 1000 results
+LISTING_LIMIT = 1000
+
+# what a title can go on with after a prefix: a space, digits, letters and punctuation
+TITLE_CHARACTERS = ' ' + string.digits + string.ascii_lowercase + string.punctuation
+
+
+def listing_url(facets, sort='title'):
+    """
+    Listing URL for a partition, e.g. {'platform': 'wii', 'year': '2008'} ->
+    https://www.mobygames.com/game/from:2008/platform:wii/until:2008/sort:title
+    """
+    values = dict(facets)
+    if 'year' in values:
+        year = values.pop('year')
+        values['from'] = values['until'] = year
+    parts = [f'{facet}:{quote(str(values[facet]), safe="")}' for facet in URL_FACETS if facet in values]
+    parts.append(f'sort:{sort}')
+    return BASE_URL + '/'.join(parts)
+
+
+class ListingPlanner:
+    """
+    Works out the smallest set of listing URLs that together list every game of a platform.
+
+    A partition with at most 1000 results is one listing sorted by title, and one with at
+    most 2000 is read from both ends (sort:title and sort:-title). Anything bigger is split
+    by year, then by title prefix, recursively, so only the partitions that are too big
+    are split further. When a partition is split by title its own sort:title listing is
+    kept as well: the titles equal to the prefix sort first in it, and it catches the
+    characters TITLE_CHARACTERS misses. When the years add up to fewer games than the
+    partition has, the games without a year are only in the partition itself, so its
+    listings from both ends are kept next to the years.
+
+    The plan is saved to {directory}/{console}.json: every result count looked up while
+    planning, so an interrupted plan resumes without counting again, and every listing
+    with a done flag the crawler sets with mark_done().
+    """
+
+    def __init__(self, console, count_results, years=(), directory='plans', limit=LISTING_LIMIT, max_title_depth=3):
+        """
+        :param count_results: Callable returning the result count of a listing URL, or None
+                              when the page shows no counter.
+        :param years: Years the platform has games for.
+        """
+        self.console = console
+        self.count_results = count_results
+        self.years = list(years)
+        self.limit = limit
+        self.max_title_depth = max_title_depth
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f'{console}.json')
+
+        self.state = {'console': console, 'complete': False, 'counts': {}, 'listings': []}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as file:
+                self.state = json.load(file)
+
+    def save(self):
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.state, file, indent=4)
+        os.replace(tmp_path, self.path)
+
+    def _count(self, facets):
+        url = listing_url(facets)
+        counts = self.state['counts']
+        if url not in counts:
+            counts[url] = self.count_results(url)
+            self.save()
+        return counts[url]
+
+    def _add_listing(self, listings, facets, count, sort='title'):
+        listings.append({'url': listing_url(facets, sort), 'count': count, 'done': False})
+
+    def _split(self, facets, listings):
+        count = self._count(facets)
+        if count == 0:
+            return
+        if count is None or count <= self.limit:
+            self._add_listing(listings, facets, count)
+            return
+        if count <= 2 * self.limit:
+            self._add_listing(listings, facets, count)
+            self._add_listing(listings, facets, count, '-title')
+            return
+
+        if 'year' not in facets and self.years:
+            print(f"{listing_url(facets)} has {count} results, splitting by year")
+            year_total = 0
+            for year in self.years:
+                year_total += self._count({**facets, 'year': year}) or 0
+                self._split({**facets, 'year': year}, listings)
+            if year_total < count:
+                print(f"{count - year_total} results of {listing_url(facets)} have no year, listing it from both ends")
+                self._add_listing(listings, facets, count)
+                self._add_listing(listings, facets, count, '-title')
+        elif len(facets.get('title', '')) < self.max_title_depth:
+            print(f"{listing_url(facets)} has {count} results, splitting by title")
+            self._add_listing(listings, facets, count)
+            prefix = facets.get('title', '')
+            for character in TITLE_CHARACTERS:
+                self._split({**facets, 'title': prefix + character}, listings)
+        else:
+            print(f"{listing_url(facets)} has {count} results and can not be split further, only its first and last {self.limit} are listed")
+            self._add_listing(listings, facets, count)
+            self._add_listing(listings, facets, count, '-title')
+
+    def plan(self):
+        """ Listings covering the platform, planned once and then read back from the plan file """
+        if not self.state['complete']:
+            listings = []
+            self._split({'platform': self.console}, listings)
+            self.state['listings'] = listings
+            self.state['complete'] = True
+            self.save()
+        return self.state['listings']
+
+    def pending(self):
+        return [listing for listing in self.plan() if not listing['done']]
+
+    def mark_done(self, url):
+        for listing in self.state['listings']:
+            if listing['url'] == url:
+                listing['done'] = True
+        self.save()
@@ -0,0 +1,235 @@
+import os, json, time, random, threading
+from contextlib import contextmanager
+
+# upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# latencies kept per series for the p50/p95 of the JSON summary
+RESERVOIR_SIZE = 2048
+
+PREFIX = 'mobygames'
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items() if value is not None))
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    escaped = (f'{name}="{_escape(value)}"' for name, value in pairs)
+    return '{' + ','.join(escaped) + '}'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def percentile(ordered, fraction):
+    """ Nearest-rank percentile of a sorted list """
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else None
+
+
+class _Histogram:
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.reservoir = []
+
+    def observe(self, value):
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.buckets[index] += 1
+                break
+        self.count += 1
+        self.sum += value
+        # reservoir sampling keeps a uniform sample of every value seen
+        if len(self.reservoir) < RESERVOIR_SIZE:
+            self.reservoir.append(value)
+        else:
+            index = random.randrange(self.count)
+            if index < RESERVOIR_SIZE:
+                self.reservoir[index] = value
+
+
+class Metrics:
+    """
+    Thread-safe counters and latency histograms, labelled per stage and console.
+
+    What is recorded:
+      stage_seconds / stage_total  time and outcome of every scraper stage, navigation,
+                                   evaluate, HTTP fetch and image copy (download into S3)
+      bytes_total                  bytes transferred per stage
+      games_total                  games scraped, skipped or failed per console
+
+    write_prometheus() writes everything in the Prometheus text format for the node_exporter
+    textfile collector, summary() condenses it into games/hour and p50/p95 per stage.
+    const_labels are added to every series, e.g. the worker id so that several workers can
+    write their own file into the same textfile directory.
+    """
+
+    def __init__(self, const_labels=None):
+        self.const_labels = dict(const_labels or {})
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.counters = {}
+        self.histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _label_key(labels))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = _Histogram()
+            histogram.observe(seconds)
+
+    def record_stage(self, stage, seconds, ok=True, nbytes=None, **labels):
+        """ One call of a stage: its latency, its outcome and optionally the bytes it transferred """
+        self.observe('stage_seconds', seconds, stage=stage, **labels)
+        self.inc('stage_total', stage=stage, outcome='ok' if ok else 'failed', **labels)
+        if nbytes:
+            self.inc('bytes_total', nbytes, stage=stage, **labels)
+
+    @contextmanager
+    def timer(self, stage, **labels):
+        """ Time the block as one call of stage, failed if it raises """
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.record_stage(stage, time.perf_counter() - start, ok=ok, **labels)
+
+    def write_prometheus(self, path):
+        """ Write every series in the Prometheus text format, replacing path atomically """
+        const = tuple(sorted((name, str(value)) for name, value in self.const_labels.items()))
+        lines = []
+        with self.lock:
+            counter_names = sorted({name for name, labels in self.counters})
+            for counter_name in counter_names:
+                metric = f'{PREFIX}_{counter_name}'
+                lines.append(f'# TYPE {metric} counter')
+                for (name, labels), value in sorted(self.counters.items()):
+                    if name == counter_name:
+                        lines.append(f'{metric}{_format_labels(const + labels)} {value}')
+
+            histogram_names = sorted({name for name, labels in self.histograms})
+            for histogram_name in histogram_names:
+                metric = f'{PREFIX}_{histogram_name}'
+                lines.append(f'# TYPE {metric} histogram')
+                for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                    if name != histogram_name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(LATENCY_BUCKETS, histogram.buckets):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{_format_labels(const + labels + (("le", str(bound)),))} {cumulative}')
+                    lines.append(f'{metric}_bucket{_format_labels(const + labels + (("le", "+Inf"),))} {histogram.count}')
+                    lines.append(f'{metric}_sum{_format_labels(const + labels)} {histogram.sum}')
+                    lines.append(f'{metric}_count{_format_labels(const + labels)} {histogram.count}')
+
+        _write_atomic(path, '\n'.join(lines) + '\n')
+
+    def summary(self):
+        """ Games per hour, p50/p95 latency per stage (all consoles together) and bytes per stage """
+        with self.lock:
+            games, bytes_by_stage, failures = {}, {}, {}
+            for (name, labels), value in self.counters.items():
+                labels = dict(labels)
+                if name == 'games_total':
+                    games[labels['outcome']] = games.get(labels['outcome'], 0) + value
+                elif name == 'bytes_total':
+                    bytes_by_stage[labels['stage']] = bytes_by_stage.get(labels['stage'], 0) + value
+                elif name == 'stage_total' and labels['outcome'] == 'failed':
+                    failures[labels['stage']] = failures.get(labels['stage'], 0) + value
+
+            samples, counts, sums = {}, {}, {}
+            for (name, labels), histogram in self.histograms.items():
+                if name != 'stage_seconds':
+                    continue
+                stage = dict(labels)['stage']
+                samples.setdefault(stage, []).extend(histogram.reservoir)
+                counts[stage] = counts.get(stage, 0) + histogram.count
+                sums[stage] = sums.get(stage, 0) + histogram.sum
+
+        elapsed = time.time() - self.started
+        stages = {}
+        for stage, values in sorted(samples.items()):
+            ordered = sorted(values)
+            stages[stage] = {
+                'count': counts[stage],
+                'failed': failures.get(stage, 0),
+                'mean': sums[stage] / counts[stage],
+                'p50': percentile(ordered, 0.5),
+                'p95': percentile(ordered, 0.95),
+                'total': sums[stage],
+            }
+        return {
+            **self.const_labels,
+            'elapsed_seconds': elapsed,
+            'games': games,
+            'games_per_hour': games.get('scraped', 0) * 3600 / elapsed if elapsed else 0,
+            'stages': stages,
+            'bytes': bytes_by_stage,
+        }
+
+    def write_summary(self, path):
+        _write_atomic(path, json.dumps(self.summary(), indent=4))
+
+
+def _write_atomic(path, text):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        file.write(text)
+    os.replace(tmp_path, path)
+
+
+class MetricsReporter:
+    """ Writes {directory}/{name}.prom and {directory}/{name}.json every interval seconds from a background thread """
+
+    def __init__(self, metrics, directory='metrics', name='scrape', interval=60):
+        self.metrics = metrics
+        self.prometheus_path = os.path.join(directory, f'{name}.prom')
+        self.summary_path = os.path.join(directory, f'{name}.json')
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='metrics', daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def write(self):
+        self.metrics.write_prometheus(self.prometheus_path)
+        self.metrics.write_summary(self.summary_path)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.write()
+            except Exception as e:
+                print(f"Could not write metrics: {e}")
+
+    def stop(self):
+        """ Stop the thread and write a last time """
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join()
+        self.write()
+
+
+_metrics = Metrics()
+
+def get_metrics():
+    """ Process wide Metrics every instrumented module records into """
+    return _metrics
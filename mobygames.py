@@ -1,12 +1,36 @@
 import re
 import json
-import requests, boto3, os
-from urllib.parse import urlparse
-from io import BytesIO
+import os
+import time
+import inspect
+from functools import lru_cache, wraps
+from urllib.parse import urljoin
+from concurrent.futures import Future, ThreadPoolExecutor
 from playwright.sync_api import sync_playwright
+from s3_uploader import get_uploader
+from http_fetcher import HttpFetcher
+from retry import RetryPolicy, RetryExhausted, CRASH, check_status, parse_retry_after
+from resource_policy import ResourcePolicy
+from rate_limiter import limiter_for, rate_limiters
+from metrics import get_metrics
+from html_parsers import (
+    build_releases, release_row_texts,
+    parse_overview_html, parse_specs_html, parse_ratings_html, parse_releases_html, parse_figure_image_html,
+    parse_covers_html, parse_screenshot_links_html,
+)
 from dotenv import load_dotenv
 load_dotenv()
 
+MOBYGAMES_COOKIES = [
+    {
+        "name": "remember-www",
+        "value": "login-v2-1114323-1100295|ce4be64d911bef101abeedc6ee2b1b0bef83b8c30ea51ceecb325c9bcc3e21a78bd85f68ad2f804e88890f10d2ab2ed18884dbee93139e7dac02af086c673227",
+        "domain": ".mobygames.com",
+        "path": "/",
+        "max_age": 30 * 24 * 60 * 60
+    }
+]
+
 def normalize_text(text):
     """Remove special characters, convert to lowercase, and replace multiple spaces with a single space."""
     text = re.sub(r'[^a-zA-Z0-9\s]', ' ', text)  # Replace special characters with space
@@ -26,68 +50,539 @@ def upload_image_to_s3(image_url, bucket_name='salient-mobygames-scrap', folder=
     :return: The full S3 path of the uploaded image.
     """
     try:
-        # Get image content
-        response = requests.get(image_url, stream=True)
-        response.raise_for_status()
-
-        # Extract filename from URL
-        parsed_url = urlparse(image_url)
-        filename = os.path.basename(parsed_url.path)
-
-        # Ensure filename is valid
-        if not filename:
-            raise ValueError("Invalid image URL, no filename found")
-
-        # Define S3 key (folder + filename)
-        s3_key = f"{folder}{filename}"
-
-        # print("Response status code:", response.status_code)
-        # print("Filename:", filename)
-        # print("Bucket name:", bucket_name)
-        # print("S3 Key:", s3_key)
-
-        # Upload to S3
-        s3_client = boto3.client("s3")
-        s3_client.upload_fileobj(
-            BytesIO(response.content), 
-            bucket_name, 
-            s3_key, 
-        )
-
-        # Construct and return the S3 URL
-        s3_url = f"https://{bucket_name}.s3.amazonaws.com/{s3_key}"
-        return s3_url
-
+        return get_uploader().upload(image_url, folder, bucket_name)
     except Exception as e:
         print(f"Error uploading image to S3: {e}")
         return None
 
+def resolve_uploads(futures):
+    """ Wait for submitted image uploads, returning their S3 URLs in order or None if any failed """
+    urls = [future.result() for future in futures]
+    return None if None in urls else urls
+
+def cancel_uploads(futures):
+    """ Cancel the submitted image uploads that have not started yet, their game is failing anyway """
+    for future in futures:
+        future.cancel()
+
+
+COVERS_JS = '''() => {
+    const result = {};
+    
+    // Find all console sections
+    const sections = document.querySelectorAll('section');
+    
+    for (const section of sections) {
+        // Get console name from the h2 element
+        const consoleHeader = section.querySelector('h2 a');
+        if (!consoleHeader) continue;
+        
+        const consoleName = consoleHeader.textContent.trim();
+        
+        // Check for variant name (in small tag)
+        let variantName = "";
+        const variantElement = section.querySelector('h2 small');
+        if (variantElement) {
+            variantName = variantElement.textContent.trim();
+            // Remove parentheses if present
+            variantName = variantName.replace(/^\(|\)$/g, '').trim();
+        }
+                    
+        // Create a unique console key combining console name and variant
+        const consoleKey = consoleName;
+        
+        if (!(consoleKey in result)) {
+            result[consoleKey] = [];
+        }
+        
+        // Get packaging info
+        const packagingRow = Array.from(section.querySelectorAll('tr td.text-nowrap')).find(td => td.textContent.includes("Packaging:"));
+
+        let packaging = "";
+        if (packagingRow) {
+            const packagingItems = packagingRow.nextElementSibling.querySelectorAll('ul.commaList li');
+            packaging = Array.from(packagingItems).map(item => item.textContent.trim()).join(", ");
+        }
+        
+        // Skip if packaging includes "Electronic" (as per your original code)
+        if (packaging.includes("Electronic")) continue;
+
+        // Get video standard info
+        const videoRow = Array.from(section.querySelectorAll('tr td.text-nowrap')).find(td => td.textContent.includes("Video Standard:"));
+
+        let videoStandard = "";
+        if (videoRow) {
+            const videoItems = videoRow.nextElementSibling.querySelectorAll('ul.commaList li');
+            videoStandard = Array.from(videoItems).map(item => item.textContent.trim()).join(", ");
+        }
+        
+        // Get countries and create entries for each
+        const countryRow = Array.from(section.querySelectorAll('tr td.text-nowrap')).find(td => td.textContent.includes("Country:"));
+
+        if (countryRow) {
+            const countryItems = countryRow.nextElementSibling.querySelectorAll('ul.commaList li');
+            
+            for (const countryItem of countryItems) {
+                // Extract the country name (text before the flag image)
+                const countryName = countryItem.childNodes[0].textContent.trim();
+                
+                // Get all cover links (instead of images)
+                const coverLinks = [];
+                const imgFigures = section.querySelectorAll('div.img-holder figure');
+
+                for (const figure of imgFigures) {
+                    const link = figure.querySelector('a');
+                    
+                    if (link) {
+                        // Extract the href (URL leading to the full-size image page)
+                        const imagePageUrl = link.getAttribute('href');
+                        if (imagePageUrl) {
+                            coverLinks.push(imagePageUrl);
+                        }
+                    }
+                }
+                
+                // Create an entry for this country
+                result[consoleKey].push({
+                    packaging: packaging,
+                    comments: variantName || "",  // Add variant name as comments
+                    video_standard: videoStandard,
+                    country: countryName,
+                    cover_links: coverLinks  // Store the URLs of cover pages
+                });
+            }
+        }
+    }
+    
+    return result;
+}'''
+
+SCREENSHOT_LINKS_JS = '''() => {
+    const result = {};
+    
+    // Find all screenshot sections by console
+    const sections = document.querySelectorAll('div[id^="screenshots-platform-"]');
+
+    for (const section of sections) {
+        // Get console name from the h2 element
+        const consoleHeader = section.querySelector('h2');
+        if (!consoleHeader) continue;
+        
+        const consoleName = consoleHeader.textContent.trim().replace(/\s+screenshots$/, '');
+        result[consoleName] = [];
+
+        // Extract all screenshot page links
+        const figures = section.querySelectorAll('div.img-holder figure');
+
+        for (const figure of figures) {
+            const link = figure.querySelector('a');
+            if (link && link.href) {
+                result[consoleName].push(link.href);
+            }
+        }
+    }
+    return result;
+}'''
+
+SPECS_JS = '''() => {
+    const result = {};
+                                    
+    const tables = document.querySelectorAll('table.table-nowrap');
+    // If no tables exist, return an empty object
+    if (tables.length === 0) {
+        return result;
+    }
+
+    // for Specs
+    const specsTable = tables[0]; // Get the first table
+    
+    let currentConsole = null;
+    
+    // Process each row
+    for (const row of specsTable.querySelectorAll('tbody tr')) {
+        // Check if this is a console header row
+        const headerElement = row.querySelector('td h4');
+        
+        if (headerElement) {
+            // Extract console name (remove the "+" part)
+            const consoleText = headerElement.textContent.trim();
+            currentConsole = consoleText.replace(/\s*\+\s*$/, '').trim();
+            if (!(currentConsole in result)) {
+                result[currentConsole] = {};
+            }
+        } 
+        // If we have a current console and this is a data row
+        else if (currentConsole && row.querySelectorAll('td').length >= 2) {
+            const specType = row.querySelector('td').textContent.replace(':', '').replaceAll(' ', '_').toLowerCase().trim();
+            const specValues = [];
+            
+            // Extract all spec values
+            let specLinks = row.querySelectorAll('td:nth-child(2) ul.commaList li a');
+            console.log(specLinks)
+            for (const link of specLinks) {
+                specValues.push(link.textContent.trim());
+            }
+            if( specLinks.length == 0){
+                specLinks = row.querySelector('td:nth-child(2)');
+                if (specLinks) {
+                    specValues.push(specLinks.textContent.trim());
+                }
+            }
+            
+            if (specValues.length === 1) {
+                result[currentConsole][specType] = specValues[0];
+            } else if (specValues.length > 1) {
+                result[currentConsole][specType] = specValues.join(',');
+            }
+                                
+        }
+    }
+    
+    return result ? result : {};
+}'''
+
+RATINGS_JS = '''() => {
+    const result = {};
+                                
+    const tables = document.querySelectorAll('table.table-nowrap');
+    // If no tables exist, return an empty object
+    if (tables.length === 0) {
+        return result;
+    }
+
+   
+    // for ratings
+    const ratingsTable = tables[tables.length - 1]; // Get the last table
+    
+    let currentConsole = null;
+    
+    // Process each row
+    for (const row of ratingsTable.querySelectorAll('tbody tr')) {
+        // Check if this is a console header row
+        const headerElement = row.querySelector('th h4');
+        
+        if (headerElement) {
+            // Extract console name (remove the "+" part)
+            const consoleText = headerElement.textContent.trim();
+            currentConsole = consoleText.replace(/\s*\+\s*$/, '').trim();
+            if (!(currentConsole in result)) {
+                result[currentConsole] = {};
+            }
+        } 
+        // If we have a current console and this is a data row
+        else if (currentConsole && row.querySelectorAll('td').length >= 2) {
+            const ratingType = row.querySelector('td').textContent.replace(':', '').replaceAll(' ', '_').toLowerCase().trim();
+            const ratingValues = [];
+            
+            // Extract all rating values
+            const ratingLinks = row.querySelectorAll('td:nth-child(2) ul.commaList li a');
+            for (const link of ratingLinks) {
+                ratingValues.push(link.textContent.trim());
+            }
+            
+            if (ratingValues.length === 1) {
+                result[currentConsole][ratingType] = ratingValues[0];
+            } else if (ratingValues.length > 1) {
+                result[currentConsole][ratingType] = ratingValues;
+            }
+        }
+    }
+    
+    return result;
+}'''
+
+COVER_IMAGE_JS = '''() => {
+    const imgElement = document.querySelector('figure img');
+    return imgElement ? imgElement.getAttribute('src') : null;
+}'''
+
+OVERVIEW_JS = """() => {
+    // Everything get_overview_details returns, read in one go
+    const title = document.querySelector('h1').innerText;
+
+    let mobyid = null;
+    for (const text of document.querySelectorAll('.text-sm.text-muted')) {
+        if (text.textContent.includes('Moby ID')) {
+            mobyid = text.textContent.split('Moby ID: ')[1].split(' ')[0].trim();
+            break;
+        }
+    }
+
+    const infoBlock = document.querySelector('#infoBlock');
+    let rating = null;
+    const playersLabel = Array.from(infoBlock.querySelectorAll('.info-score dl dt')).find(dt => /players/i.test(dt.textContent));
+    const playersValue = playersLabel && playersLabel.nextElementSibling;
+    const ratingSpan = playersValue && playersValue.tagName === 'DD' ? playersValue.querySelector('span') : null;
+    if (ratingSpan) rating = ratingSpan.getAttribute('data-tooltip').split(' ')[0];
+
+    const details = [];
+    const values = infoBlock.querySelectorAll('.info-genres dl.metadata dd');
+    infoBlock.querySelectorAll('.info-genres dl.metadata dt').forEach((dt, index) => {
+        details.push([dt.textContent.trim(), Array.from(values[index].querySelectorAll('a'), a => a.innerText).join(',')]);
+    });
+
+    // innerText leaves out the content of a closed <details>, opening it lays it out right away
+    const official = document.querySelector('#gameOfficialDescription');
+    const summary = document.querySelector('#gameOfficialDescription summary');
+    if (summary && summary.parentElement.tagName === 'DETAILS') summary.parentElement.open = true;
+
+    let description = null;
+    const descriptionText = document.querySelector('#description-text');
+    if (descriptionText) description = descriptionText.innerText;
+    else if (official) description = official.innerText;
+
+    // the summary of #gameOfficialDescription always has text, only #description-text tells the description is in
+    const descriptionReady = !!descriptionText && descriptionText.innerText.trim().length > 0;
+    return { title, mobyid, rating, details, description, expandable: !!summary, descriptionReady };
+}"""
+
+# resolves once #description-text of the overview page has text
+DESCRIPTION_READY_JS = """() => {
+    const description = document.querySelector('#description-text');
+    return !!description && description.innerText.trim().length > 0;
+}"""
+
+RELEASES_JS = """() => {
+    // One pass over the console headers and release tables, in document order:
+    // each table belongs to the last console header before it.
+    const consoles = [];
+    for (const element of document.querySelectorAll('#main h4, table.releaseTable')) {
+        if (element.tagName === 'H4') {
+            consoles.push({ console: element.innerText.trim(), tables: [] });
+            continue;
+        }
+        if (!consoles.length) continue;
+
+        const rows = [];
+        for (const row of element.querySelectorAll('tbody tr')) {
+            const cells = row.querySelectorAll('td');
+            rows.push({
+                texts: Array.from(cells, cell => cell.innerText),
+                // a "Countries" value is read from its HTML, see release_row_texts
+                html: cells.length === 2 ? cells[1].innerHTML : null,
+            });
+        }
+        consoles[consoles.length - 1].tables.push(rows);
+    }
+    return consoles;
+}"""
+
+
+# Extractors that read a whole page in one go: a JS function for the browser and the
+# matching html_parsers function for fetch_mode='http'. Several of them can run against
+# one load of a page with MobyGamesScraper.extract().
+EXTRACTORS = {
+    'specs': (SPECS_JS, parse_specs_html),
+    'ratings': (RATINGS_JS, parse_ratings_html),
+}
+
+def releases_from_js(consoles):
+    """ get_releases result from what RELEASES_JS returned """
+    return build_releases([
+        (console['console'], [[release_row_texts(row['texts'], row['html']) for row in rows] for rows in console['tables']])
+        for console in consoles
+    ])
+
+def extractor_script(extractors):
+    """ One page.evaluate script running several (name, js) extractors, returns {name: result} """
+    return '() => ({' + ', '.join(f'{json.dumps(name)}: ({js})()' for name, js in extractors) + '})'
+
+
+def _record_stage(stage, start, result, console):
+    ok = result is not None and not (isinstance(result, tuple) and None in result)
+    get_metrics().record_stage(stage, time.perf_counter() - start, ok=ok, console=console)
+
+
+def timed_stage(stage):
+    """
+    Record the latency and outcome of each call of a scraper method under `stage` and the
+    console of the current game; a None result (or a tuple holding one) counts as failed.
+    Coroutine methods, the ones of AsyncMobyGamesScraper, take the pool slot scraping the
+    game first and are labelled with its console.
+    """
+    def decorator(method):
+        if inspect.iscoroutinefunction(method):
+            @wraps(method)
+            async def async_wrapper(self, slot, *args, **kwargs):
+                start = time.perf_counter()
+                result = None
+                try:
+                    result = await method(self, slot, *args, **kwargs)
+                    return result
+                finally:
+                    _record_stage(stage, start, result, slot.console)
+            return async_wrapper
+
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            start = time.perf_counter()
+            result = None
+            try:
+                result = method(self, *args, **kwargs)
+                return result
+            finally:
+                _record_stage(stage, start, result, self.console)
+        return wrapper
+    return decorator
+
+
+def archived_document(archive, request):
+    """ HTML the replay route answers a request with: documents come from the archive, None drops the request """
+    return archive.get(request.url) if request.resource_type == 'document' else None
+
+
+def print_run_report(resource_policy, rate_limiter):
+    """ Latency of every stage, blocked resources and request rates, printed when a scraper closes """
+    for stage, latency in get_metrics().summary()['stages'].items():
+        print(f"{stage:<12} {latency['count']:>6} calls, mean {latency['mean']:.2f}s, p50 {latency['p50']:.2f}s, "
+              f"p95 {latency['p95']:.2f}s, total {latency['total']:.0f}s")
+    if resource_policy:
+        print(resource_policy.summary())
+    if rate_limiter:
+        print(rate_limiter.summary())
+    elif rate_limiter is None:
+        for host, limiter in rate_limiters().items():
+            print(f"{host}: {limiter.summary()}")
+
 
 class MobyGamesScraper:
-    def __init__(self, headless=True):
-        self.playwright = sync_playwright().start()
-        self.browser = self.playwright.chromium.launch(headless=headless)
+    def __init__(self, headless=True, fetch_mode='browser', archive=None, replay=False, retry=None, recycle_after=3, resource_policy=None,
+                 detail_workers=8, navigation_timeout=60000, description_timeout=5000, rate_limiter=None, detail_fetch_mode=None):
+        """
+        :param fetch_mode: 'browser' drives every page through Chromium. 'http' fetches the
+                           server-rendered pages with a pooled requests.Session and parses
+                           them with lxml; Chromium is then only launched if something still
+                           needs it (login, a trace or detail_fetch_mode='browser').
+        :param archive: Optional PageArchive the raw HTML of every visited page is saved to.
+        :param replay: Serve every page from the archive instead of the network. Images are
+                       not uploaded again, their existing S3 URL is returned instead.
+        :param retry: RetryPolicy for navigations and HTTP fetches, its budget is reset by
+                      start_game().
+        :param recycle_after: Relaunch the browser after this many navigations in a row
+                              failed even after retrying.
+        :param resource_policy: ResourcePolicy deciding which requests the browser makes,
+                                by default images, fonts, media and third-party requests
+                                are blocked. False loads everything.
+        :param detail_workers: Cover and screenshot detail pages fetched over HTTP at once.
+        :param detail_fetch_mode: How the cover and screenshot detail pages are read, the
+                                  fetch_mode by default. 'http' fetches detail_workers of
+                                  them at once, 'browser' visits them one by one.
+        :param navigation_timeout: Milliseconds a page navigation may take before it is retried.
+        :param description_timeout: Milliseconds to wait for an expandable official description
+                                    that has no text yet once the overview page is loaded.
+        :param rate_limiter: AdaptiveRateLimiter pacing the navigations and HTTP fetches, by
+                             default the process wide limiter of each host (see
+                             get_rate_limiter). False sends requests as fast as they come.
+        """
+        if replay and archive is None:
+            raise ValueError("replay=True needs an archive to replay from")
+        self.archive = archive
+        self.replay = replay
+        self.fetcher = None
+        self.rate_limiter = rate_limiter
+        if fetch_mode == 'http':
+            self.fetcher = HttpFetcher(cookies=MOBYGAMES_COOKIES, user_agent=self.get_agent(), stage='fetch', rate_limiter=rate_limiter)
+        elif fetch_mode != 'browser':
+            raise ValueError(f"Unknown fetch_mode {fetch_mode!r}, expected 'browser' or 'http'")
+        detail_fetch_mode = detail_fetch_mode or fetch_mode
+        self.detail_fetcher = None
+        self.detail_executor = None
+        if detail_fetch_mode == 'http':
+            self.detail_fetcher = self.fetcher or HttpFetcher(cookies=MOBYGAMES_COOKIES, user_agent=self.get_agent(), pool_size=detail_workers,
+                                                              stage='detail_page', rate_limiter=rate_limiter)
+            self.detail_executor = ThreadPoolExecutor(max_workers=detail_workers, thread_name_prefix='detail')
+        elif detail_fetch_mode != 'browser':
+            raise ValueError(f"Unknown detail_fetch_mode {detail_fetch_mode!r}, expected 'browser' or 'http'")
+
+        self.retry = retry or RetryPolicy(budgets={'navigation': 8, 'fetch': 8})
+        self.recycle_after = recycle_after
+        self.consecutive_failures = 0
+        self.resource_policy = ResourcePolicy() if resource_policy is None else resource_policy
+        self.navigation_timeout = navigation_timeout
+        self.description_timeout = description_timeout
+        self.console = None
+
+        # per-game page cache: the URL self.page currently shows and the HTML fetched over HTTP
+        self.extractors = dict(EXTRACTORS)
+        self.loaded_url = None
+        self.html_cache = {}
+
+        self.headless = headless
+        self.playwright = None
+        self.browser = None
+        if fetch_mode == 'browser':
+            self._start_browser()
+
+    def _start_browser(self):
+        """ Launch Chromium on first use """
+        if self.browser is None:
+            self.playwright = self.playwright or sync_playwright().start()
+            self._launch()
+
+    def _launch(self):
+        self.browser = self.playwright.chromium.launch(headless=self.headless)
         self.context = self.browser.new_context(
             viewport={'width': 1280, 'height': 800},
             user_agent=self.get_agent()
         )
-        self.context.add_cookies([
-            {
-                "name": "remember-www",
-                "value": "login-v2-1114323-1100295|ce4be64d911bef101abeedc6ee2b1b0bef83b8c30ea51ceecb325c9bcc3e21a78bd85f68ad2f804e88890f10d2ab2ed18884dbee93139e7dac02af086c673227",
-                "domain": ".mobygames.com",
-                "path": "/",
-                "max_age": 30 * 24 * 60 * 60
-            }
-        ])
+        self.context.add_cookies(MOBYGAMES_COOKIES)
+        if self.replay:
+            self.context.route('**/*', self._serve_from_archive)
+        if self.resource_policy:
+            # registered last so it runs first, allowed requests fall back to the replay route
+            self.context.route('**/*', self.resource_policy.handle)
         self.page = self.context.new_page()
+        self.loaded_url = None
+
+    def recycle(self):
+        """ Replace the browser with a fresh one, keeping the HTTP fetcher, archive and uploads """
+        print('Recycling the browser')
+        try:
+            self.browser.close()
+        except Exception as e:
+            print(e)
+        self._launch()
+        self.consecutive_failures = 0
+
+    def _replace_page(self, error_class, error, attempt):
+        """ on_retry hook: a crashed page is replaced before the navigation is retried """
+        if error_class != CRASH:
+            return
+        try:
+            self.page.close()
+        except Exception:
+            pass
+        self.loaded_url = None
+        try:
+            self.page = self.context.new_page()
+        except Exception:
+            # the whole browser is gone
+            self.recycle()
+
+    def _record_failure(self):
+        """ Count a navigation that failed after its retries, recycling the browser after recycle_after in a row """
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.recycle_after:
+            self.recycle()
     
+    def start_game(self, console=None):
+        """ Reset the per-game page cache and retry budget, call before scraping each game of a console """
+        self.console = console
+        self.retry.reset_budget()
+        self.loaded_url = None
+        self.html_cache = {}
+
+    def register_extractor(self, name, js, parser):
+        """ Add an extractor usable with extract(): a JS function run in the page and an HTML parser for fetch_mode='http' """
+        self.extractors[name] = (js, parser)
+
     def get_agent(self):
         """ Return a valid user-agent string. You can rotate this for better anti-bot evasion. """
         return "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 
     def login(self, username, password):
         """ Logs into MobyGames """
+        self._start_browser()
         self.page.goto('https://www.mobygames.com/user/login/')
         self.page.fill('input[name="login"]', username)
         self.page.fill('input[name="password"]', password)
@@ -95,227 +590,260 @@ class MobyGamesScraper:
         self.page.wait_for_load_state("networkidle")  # Ensure login completes
         print("Logged in successfully!")
 
+    def _serve_from_archive(self, route):
+        """ Route handler used in replay mode: documents come from the archive, everything else is dropped """
+        html = archived_document(self.archive, route.request)
+        if html is None:
+            route.abort()
+        else:
+            route.fulfill(status=200, content_type='text/html; charset=utf-8', body=html)
+
+    def _navigate(self, url, **kwargs):
+        rate_limiter = limiter_for(self.rate_limiter, url)
+        if rate_limiter:
+            rate_limiter.acquire()
+        start = time.perf_counter()
+        response = None
+        try:
+            with get_metrics().timer('navigation', console=self.console):
+                response = self.page.goto(url, **kwargs)
+        except Exception:
+            if rate_limiter:
+                rate_limiter.record(time.perf_counter() - start, failed=True)
+            raise
+        if rate_limiter:
+            rate_limiter.record(time.perf_counter() - start, response.status if response else None,
+                                     parse_retry_after(response.headers.get('retry-after')) if response else None)
+        if response:
+            self._record_document_bytes(response)
+            check_status(url, response.status, response.headers)
+        return response
+
+    def _record_document_bytes(self, response):
+        try:
+            sizes = response.request.sizes()
+            get_metrics().inc('bytes_total', sizes['responseHeadersSize'] + sizes['responseBodySize'], stage='navigation', console=self.console)
+        except Exception:
+            pass
+
+    def _evaluate(self, js):
+        """ self.page.evaluate, timed as DOM extraction """
+        with get_metrics().timer('evaluate', console=self.console):
+            return self.page.evaluate(js)
+
+    def _goto(self, url, **kwargs):
+        """ Navigate self.page with retries, saving the raw HTML to the archive when one is configured """
+        self._start_browser()
+        kwargs.setdefault('timeout', self.navigation_timeout)
+        self.loaded_url = None
+        if self.replay:
+            response = self.page.goto(url, **kwargs)
+            self.loaded_url = url
+            return response
+        try:
+            response = self.retry.call('navigation', self._navigate, url, on_retry=self._replace_page, **kwargs)
+        except RetryExhausted:
+            self._record_failure()
+            raise
+        self.consecutive_failures = 0
+        self.loaded_url = url
+
+        if self.archive and response:
+            html = response.text()
+            self.archive.put(url, html)
+            if response.url != url:
+                self.archive.put(response.url, html)
+        return response
+
+    def _fetch_html(self, url, fetcher=None):
+        """ HTTP counterpart of _goto, returns the page HTML """
+        if self.replay:
+            html = self.archive.get(url)
+            if html is None:
+                raise KeyError(f'{url} is not in the archive')
+            return html
+        html = self.retry.call('fetch', (fetcher or self.fetcher).get, url)
+        if self.archive:
+            self.archive.put(url, html)
+        return html
+
+    def _submit_image(self, image_url, bucket_name, folder):
+        """ Queue an image upload and return a Future of its S3 URL; replay mode resolves to the existing URL """
+        if self.replay:
+            future = Future()
+            future.set_result(get_uploader().stored_url(image_url, folder, bucket_name))
+            return future
+        return get_uploader().submit(image_url, folder, bucket_name)
+
+    def _detail_image(self, link):
+        """ Absolute URL of the full-size image shown on a cover or screenshot page, None if it has none """
+        src = parse_figure_image_html(self._fetch_html(link, self.detail_fetcher))
+        return urljoin(link, src) if src else None
+
+    def _browser_detail_image(self, link):
+        """ _detail_image read through the browser page """
+        self._goto(link, wait_until='domcontentloaded')
+        src = self._evaluate(COVER_IMAGE_JS)
+        return urljoin(link, src) if src else None
+
+    def resolve_detail_images(self, links):
+        """
+        Read the full-size image of cover or screenshot detail pages, concurrently over HTTP
+        or one by one in the browser depending on the detail_fetch_mode.
+
+        :return: Iterator of (link, image URL or None) in the order of links, each yielded as
+                 soon as it and the ones before it are read so their uploads can start
+                 while the rest are still being fetched.
+        :raises RetryExhausted: When a page could not be fetched. The fetches not started
+                                yet are cancelled, as they are when the iterator is closed early.
+        """
+        if not self.detail_executor:
+            for link in links:
+                yield link, self._browser_detail_image(link)
+            return
+
+        futures = [self.detail_executor.submit(self._detail_image, link) for link in links]
+        try:
+            for link, future in zip(links, futures):
+                yield link, future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _gallery(self, url, js, parser):
+        """ Per console links of a covers or screenshots page, from the browser or parsed from its HTML in http mode """
+        if self.fetcher:
+            return parser(self._page_html(url))
+        self._goto(url, wait_until="domcontentloaded")
+        return self._evaluate(js)
+
+    def _load(self, url):
+        """ Make self.page show url, navigating only if it does not already """
+        if self.loaded_url != url:
+            self._goto(url, wait_until='domcontentloaded')
+
+    def _page_html(self, url):
+        """ HTML of url fetched over HTTP, once per game """
+        if url not in self.html_cache:
+            self.html_cache[url] = self._fetch_html(url)
+        return self.html_cache[url]
+
+    def extract(self, url, names):
+        """
+        Run several registered extractors against a single load of url.
+
+        :param names: Extractor names, see EXTRACTORS and register_extractor().
+        :return: Dict of extractor name to its result, or None if the page could not be loaded.
+        """
+        extractors = [(name, self.extractors[name]) for name in names]
+        if self.fetcher:
+            try:
+                html = self._page_html(url)
+                return {name: parser(html) for name, (js, parser) in extractors}
+            except Exception as e:
+                print(e)
+                return None
+
+        try:
+            self._load(url)
+        except Exception as e:
+            print(e)
+            return None
+        # one evaluate round trip for all of them
+        return self._evaluate(extractor_script([(name, js) for name, (js, parser) in extractors]))
+
+    def _fetch_and_parse(self, url, parser):
+        """ Fetch a page over HTTP and run one of the html_parsers on it, None on failure like the browser path """
+        try:
+            return parser(self._page_html(url))
+        except Exception as e:
+            print(e)
+            return None
+
+    @timed_stage('overview')
     def get_overview_details(self, url):
         """ Scrape overview details """
         print('Processing Overview')
+        if self.fetcher:
+            return self._fetch_and_parse(url, parse_overview_html)
         try:
-            self.page.goto(f'{url}', wait_until='domcontentloaded', timeout=2000000)
+            self._goto(url, wait_until='domcontentloaded')
         except Exception as e:
             return None
-        gameInfoBlock = self.page.query_selector('#infoBlock')
-
 
-        title = self.page.query_selector('h1').inner_text()
-        mobyid = [text.text_content().split('Moby ID: ')[1].split(' ')[0].strip() 
-          for text in self.page.query_selector_all('.text-sm.text-muted')  
-          if 'Moby ID' in text.text_content()][0]
-
-        # genres related stuff
-        rating = gameInfoBlock.query_selector('.info-score dl dt:text("Players") + dd span')
-        if rating:
-            rating = rating.get_attribute('data-tooltip').split(' ')[0]
-        else:
-            rating = None
-
-        game_details = gameInfoBlock.query_selector_all('.info-genres dl.metadata dt')
-        game_details_values = gameInfoBlock.query_selector_all('.info-genres dl.metadata dd')
-
-        overview = {}
-        for index, key in enumerate(game_details):
-            key = key.text_content().strip()
-            values = ','.join( [ a_tag.inner_text() for a_tag in game_details_values[index].query_selector_all('a')])
-            overview[key] = values
-
-        if self.page.query_selector('#gameOfficialDescription summary'):
-            self.page.click('#gameOfficialDescription summary')
-            self.page.wait_for_timeout(5000)
-            
-        description = self.page.query_selector('#description-text')
-        if description: description = description.inner_text()
-        elif self.page.query_selector('#gameOfficialDescription'):
-            description = self.page.locator('#gameOfficialDescription').inner_text()
+        data = self._evaluate(OVERVIEW_JS)
+        if data['mobyid'] is None:
+            raise ValueError(f'No Moby ID on {url}')
+        if data['expandable'] and not data['descriptionReady']:
+            # the expanded description is not there yet, wait for its text rather than a fixed delay
+            try:
+                self.page.wait_for_function(DESCRIPTION_READY_JS, timeout=self.description_timeout)
+                data = self._evaluate(OVERVIEW_JS)
+            except Exception as e:
+                print(e)
 
         return {
-            "title": title,
-            "mobyid": mobyid,
-            "rating": rating if rating else '',
-            "description": description,
-            **overview
+            "title": data['title'],
+            "mobyid": data['mobyid'],
+            "rating": data['rating'] if data['rating'] else '',
+            "description": data['description'],
+            **dict(data['details'])
         }
 
+    @timed_stage('covers')
     def get_covers(self, url):
         """ Scrape game cover screenshots, packaging, and video standard info """
         print('Processing Covers')
         try:
-            self.page.goto(url, wait_until="domcontentloaded")
+            cover_data = self._gallery(url, COVERS_JS, parse_covers_html)
         except Exception as e:
             print(e)
             return None
-        
-        cover_data = self.page.evaluate('''() => {
-            const result = {};
-            
-            // Find all console sections
-            const sections = document.querySelectorAll('section');
-            
-            for (const section of sections) {
-                // Get console name from the h2 element
-                const consoleHeader = section.querySelector('h2 a');
-                if (!consoleHeader) continue;
-                
-                const consoleName = consoleHeader.textContent.trim();
-                
-                // Check for variant name (in small tag)
-                let variantName = "";
-                const variantElement = section.querySelector('h2 small');
-                if (variantElement) {
-                    variantName = variantElement.textContent.trim();
-                    // Remove parentheses if present
-                    variantName = variantName.replace(/^\(|\)$/g, '').trim();
-                }
-                            
-                // Create a unique console key combining console name and variant
-                const consoleKey = consoleName;
-                
-                if (!(consoleKey in result)) {
-                    result[consoleKey] = [];
-                }
-                
-                // Get packaging info
-                const packagingRow = Array.from(section.querySelectorAll('tr td.text-nowrap')).find(td => td.textContent.includes("Packaging:"));
-
-                let packaging = "";
-                if (packagingRow) {
-                    const packagingItems = packagingRow.nextElementSibling.querySelectorAll('ul.commaList li');
-                    packaging = Array.from(packagingItems).map(item => item.textContent.trim()).join(", ");
-                }
-                
-                // Skip if packaging includes "Electronic" (as per your original code)
-                if (packaging.includes("Electronic")) continue;
-
-                // Get video standard info
-                const videoRow = Array.from(section.querySelectorAll('tr td.text-nowrap')).find(td => td.textContent.includes("Video Standard:"));
-
-                let videoStandard = "";
-                if (videoRow) {
-                    const videoItems = videoRow.nextElementSibling.querySelectorAll('ul.commaList li');
-                    videoStandard = Array.from(videoItems).map(item => item.textContent.trim()).join(", ");
-                }
-                
-                // Get countries and create entries for each
-                const countryRow = Array.from(section.querySelectorAll('tr td.text-nowrap')).find(td => td.textContent.includes("Country:"));
-
-                if (countryRow) {
-                    const countryItems = countryRow.nextElementSibling.querySelectorAll('ul.commaList li');
-                    
-                    for (const countryItem of countryItems) {
-                        // Extract the country name (text before the flag image)
-                        const countryName = countryItem.childNodes[0].textContent.trim();
-                        
-                        // Get all cover links (instead of images)
-                        const coverLinks = [];
-                        const imgFigures = section.querySelectorAll('div.img-holder figure');
-
-                        for (const figure of imgFigures) {
-                            const link = figure.querySelector('a');
-                            
-                            if (link) {
-                                // Extract the href (URL leading to the full-size image page)
-                                const imagePageUrl = link.getAttribute('href');
-                                if (imagePageUrl) {
-                                    coverLinks.push(imagePageUrl);
-                                }
-                            }
-                        }
-                        
-                        // Create an entry for this country
-                        result[consoleKey].push({
-                            packaging: packaging,
-                            comments: variantName || "",  // Add variant name as comments
-                            video_standard: videoStandard,
-                            country: countryName,
-                            cover_links: coverLinks  // Store the URLs of cover pages
-                        });
-                    }
-                }
-            }
-            
-            return result;
-        }''')
 
         if not cover_data or not isinstance(cover_data, dict):
             print("No Covers found.")
             return {}
 
-        # Visit each cover page and extract the full-size image URL
+        # Each distinct cover page is fetched once, all of them at the same time, and
+        # its full-size image is queued for upload as soon as the page is read
         cover_cache = {}
         bucket_name = os.getenv('BUCKET_NAME')
+        for entries in cover_data.values():
+            for entry in entries:
+                entry["cover_links"] = [urljoin(url, link) for link in entry["cover_links"]]
+        cover_links = list(dict.fromkeys(link for entries in cover_data.values() for entry in entries for link in entry["cover_links"]))
+        try:
+            for cover_link, full_size_image in self.resolve_detail_images(cover_links):
+                if full_size_image:
+                    cover_cache[cover_link] = self._submit_image(full_size_image, bucket_name, 'covers/')
+        except Exception as e:
+            print(e)
+            cancel_uploads(cover_cache.values())
+            return None
 
-        # Visit each cover page only once and extract full-size images
+        # Replace cover_links with the uploads of their full-size images, reused between entries
         for console, entries in cover_data.items():
             for entry in entries:
-                sr_url_list = []
-                for cover_link in entry["cover_links"]:
-                    if cover_link in cover_cache:
-                        # Reuse the stored full-size image URL
-                        sr_url_list.append(cover_cache[cover_link])
-                    else:
-                        # Visit the cover link and extract the full-size image
-                        self.page.goto(cover_link, wait_until="domcontentloaded")
-                        full_size_image = self.page.evaluate('''() => {
-                            const imgElement = document.querySelector('figure img');
-                            return imgElement ? imgElement.getAttribute('src') : null;
-                        }''')
-                        
-                        if full_size_image:
-                            
-                            s3_url = upload_image_to_s3(full_size_image, bucket_name, 'covers/')
-                            if s3_url is None:
-                                return None
-                            sr_url_list.append(s3_url)
-                            cover_cache[cover_link] = s3_url  # Store for reuse
-                
-                # Replace cover_links with full-size images
-                entry["cover_images"] = sr_url_list
+                entry["cover_images"] = [cover_cache[cover_link] for cover_link in entry["cover_links"] if cover_link in cover_cache]
                 del entry["cover_links"]
 
+        for console, entries in cover_data.items():
+            for entry in entries:
+                entry["cover_images"] = resolve_uploads(entry["cover_images"])
+                if entry["cover_images"] is None:
+                    return None
+
         return cover_data
 
+    @timed_stage('screenshots')
     def get_screenshots(self, url):
         """Scrape full-size screenshots for each console."""
         print('Processing Screenshots')
         try:
-            self.page.goto(url, wait_until="domcontentloaded", timeout=60000)
+            screenshot_links = self._gallery(url, SCREENSHOT_LINKS_JS, parse_screenshot_links_html)
         except Exception as e:
             print(e)
             return None
-        # Execute JavaScript to extract screenshot links by console
-        screenshot_links = self.page.evaluate('''() => {
-            const result = {};
-            
-            // Find all screenshot sections by console
-            const sections = document.querySelectorAll('div[id^="screenshots-platform-"]');
-
-            for (const section of sections) {
-                // Get console name from the h2 element
-                const consoleHeader = section.querySelector('h2');
-                if (!consoleHeader) continue;
-                
-                const consoleName = consoleHeader.textContent.trim().replace(/\s+screenshots$/, '');
-                result[consoleName] = [];
-
-                // Extract all screenshot page links
-                const figures = section.querySelectorAll('div.img-holder figure');
-
-                for (const figure of figures) {
-                    const link = figure.querySelector('a');
-                    if (link && link.href) {
-                        result[consoleName].push(link.href);
-                    }
-                }
-            }
-            return result;
-        }''')
 
         if not screenshot_links or not isinstance(screenshot_links, dict):
             print("No screenshots found.")
@@ -324,287 +852,110 @@ class MobyGamesScraper:
         full_screenshots = {}
         bucket_name = os.getenv('BUCKET_NAME')
 
-        # Visit each screenshot page and extract the full-size image
+        # Fetch every screenshot page at the same time, queueing each full-size image for
+        # upload as soon as its page is read
+        screenshot_uploads = {}
+        screenshot_links = {console: [urljoin(url, link) for link in links] for console, links in screenshot_links.items()}
+        links = list(dict.fromkeys(link for console_links in screenshot_links.values() for link in console_links))
+        try:
+            for link, full_size_image in self.resolve_detail_images(links):
+                if full_size_image:
+                    screenshot_uploads[link] = self._submit_image(full_size_image, bucket_name, 'screenshots/')
+        except Exception as e:
+            print(e)
+            cancel_uploads(screenshot_uploads.values())
+            return None
         for console, links in screenshot_links.items():
-            full_screenshots[console] = []
-            for link in links:
-                try:
-                    self.page.goto(link, wait_until="domcontentloaded", timeout=60000)
-                except Exception as e:
-                    return None
-                # Extract the full-size image URL from the visited page
-                full_size_image = self.page.evaluate('''() => {
-                    const img = document.querySelector('figure img'); // Adjust selector if needed
-                    return img ? img.src : null;
-                }''')
+            full_screenshots[console] = [screenshot_uploads[link] for link in links if link in screenshot_uploads]
 
-                if full_size_image:
-                    
-                    s3_url = upload_image_to_s3(full_size_image, bucket_name, 'screenshots/')
-                    if s3_url is None: return  None
-                    full_screenshots[console].append(s3_url)
+        for console, uploads in full_screenshots.items():
+            full_screenshots[console] = resolve_uploads(uploads)
+            if full_screenshots[console] is None: return  None
 
         return full_screenshots
 
     def get_specs(self, url):
         """ Scrape game specifications """
         print('Processing Specs')
-        try:
-            self.page.goto(url, wait_until='domcontentloaded', timeout=60000)
-        except Exception as e:
-            print(e)
-            return None
-
-        specs_data = self.page.evaluate('''() => {
-            const result = {};
-                                            
-            const tables = document.querySelectorAll('table.table-nowrap');
-            // If no tables exist, return an empty object
-            if (tables.length === 0) {
-                return result;
-            }
-        
-            // for Specs
-            const specsTable = tables[0]; // Get the first table
-            
-            let currentConsole = null;
-            
-            // Process each row
-            for (const row of specsTable.querySelectorAll('tbody tr')) {
-                // Check if this is a console header row
-                const headerElement = row.querySelector('td h4');
-                
-                if (headerElement) {
-                    // Extract console name (remove the "+" part)
-                    const consoleText = headerElement.textContent.trim();
-                    currentConsole = consoleText.replace(/\s*\+\s*$/, '').trim();
-                    if (!(currentConsole in result)) {
-                        result[currentConsole] = {};
-                    }
-                } 
-                // If we have a current console and this is a data row
-                else if (currentConsole && row.querySelectorAll('td').length >= 2) {
-                    const specType = row.querySelector('td').textContent.replace(':', '').replaceAll(' ', '_').toLowerCase().trim();
-                    const specValues = [];
-                    
-                    // Extract all spec values
-                    let specLinks = row.querySelectorAll('td:nth-child(2) ul.commaList li a');
-                    console.log(specLinks)
-                    for (const link of specLinks) {
-                        specValues.push(link.textContent.trim());
-                    }
-                    if( specLinks.length == 0){
-                        specLinks = row.querySelector('td:nth-child(2)');
-                        if (specLinks) {
-                            specValues.push(specLinks.textContent.trim());
-                        }
-                    }
-                    
-                    if (specValues.length === 1) {
-                        result[currentConsole][specType] = specValues[0];
-                    } else if (specValues.length > 1) {
-                        result[currentConsole][specType] = specValues.join(',');
-                    }
-                                        
-                }
-            }
-            
-            return result ? result : {};
-        }''')
-        
-        return specs_data
+        extracted = self.extract(url, ['specs'])
+        return None if extracted is None else extracted['specs']
 
     def get_ratings(self, url):
         """ Scrape game ratings """
         print('Processing Ratings')
+        extracted = self.extract(url, ['ratings'])
+        return None if extracted is None else extracted['ratings']
+
+    @timed_stage('specs')
+    def get_specs_and_ratings(self, url):
+        """ Specs and ratings from one load of the /specs/{console} page, (None, None) on failure """
+        print('Processing Specs and Ratings')
+        extracted = self.extract(url, ['specs', 'ratings'])
+        if extracted is None:
+            return None, None
+        return extracted['specs'], extracted['ratings']
+
+    @timed_stage('releases')
+    def get_releases(self, url):
+        """ Scrape game releases information """
+        print('Processing releases')
+        if self.fetcher:
+            return self._fetch_and_parse(url, parse_releases_html)
         try:
-            self.page.goto(url, wait_until='domcontentloaded', timeout=60000)
+            self._goto(url, wait_until='domcontentloaded')
         except Exception as e:
             print(e)
             return None
 
-        # Evaluate the entire table extraction in JavaScript for better control
-        ratings_data = self.page.evaluate('''() => {
-            const result = {};
-                                        
-            const tables = document.querySelectorAll('table.table-nowrap');
-            // If no tables exist, return an empty object
-            if (tables.length === 0) {
-                return result;
-            }
-        
-           
-            // for ratings
-            const ratingsTable = tables[tables.length - 1]; // Get the last table
-            
-            let currentConsole = null;
-            
-            // Process each row
-            for (const row of ratingsTable.querySelectorAll('tbody tr')) {
-                // Check if this is a console header row
-                const headerElement = row.querySelector('th h4');
-                
-                if (headerElement) {
-                    // Extract console name (remove the "+" part)
-                    const consoleText = headerElement.textContent.trim();
-                    currentConsole = consoleText.replace(/\s*\+\s*$/, '').trim();
-                    if (!(currentConsole in result)) {
-                        result[currentConsole] = {};
-                    }
-                } 
-                // If we have a current console and this is a data row
-                else if (currentConsole && row.querySelectorAll('td').length >= 2) {
-                    const ratingType = row.querySelector('td').textContent.replace(':', '').replaceAll(' ', '_').toLowerCase().trim();
-                    const ratingValues = [];
-                    
-                    // Extract all rating values
-                    const ratingLinks = row.querySelectorAll('td:nth-child(2) ul.commaList li a');
-                    for (const link of ratingLinks) {
-                        ratingValues.push(link.textContent.trim());
-                    }
-                    
-                    if (ratingValues.length === 1) {
-                        result[currentConsole][ratingType] = ratingValues[0];
-                    } else if (ratingValues.length > 1) {
-                        result[currentConsole][ratingType] = ratingValues;
-                    }
-                }
-            }
-            
-            return result;
-        }''')
-        
-        return ratings_data
+        return releases_from_js(self._evaluate(RELEASES_JS))
 
-    def get_releases(self, url):
-        """ Scrape game releases information """
-        print('Processing releases')
+    def start_trace(self):
+        """ Record a Playwright trace of the browser context until stop_trace() """
+        self._start_browser()
+        self.context.tracing.start(screenshots=True, snapshots=True, sources=False)
+
+    def stop_trace(self, path=None):
+        """ Stop the trace, saving it to path (open it with `playwright show-trace`) or discarding it without one """
         try:
-            self.page.goto(url, wait_until='domcontentloaded', timeout=60000)
+            self.context.tracing.stop(path=path)
         except Exception as e:
-            print(e)
-            return None
+            # the browser was recycled during the trace, the new context is not tracing
+            print(f"Could not stop the trace: {e}")
 
-        releases = {}
-        consoles = self.page.query_selector_all('#main h4')
-
-        for i, console in enumerate(consoles):
-            console_name = console.inner_text().strip()
-            releases[console_name] = []
-
-            console_indices = self.page.evaluate("""() => {
-                const h4s = Array.from(document.querySelectorAll('#main h4'));
-                return h4s.map(el => ({
-                    text: el.innerText.trim(),
-                    index: Array.from(document.querySelectorAll('*')).indexOf(el)
-                }));
-            }""")
-
-            current_index, next_index = None, None
-            for idx, c in enumerate(console_indices):
-                if c['text'] == console_name:
-                    current_index = c['index']
-                    if idx < len(console_indices) - 1:
-                        next_index = console_indices[idx + 1]['index']
-                    break
-
-            if current_index is None:
-                continue
-
-            table_selectors = self.page.evaluate("""(args) => {
-                const allElements = Array.from(document.querySelectorAll('*'));
-                const { currentIndex, nextIndex } = args;
-                const endIndex = nextIndex || allElements.length;
-                const tablePaths = [];
-
-                for (let i = currentIndex + 1; i < endIndex; i++) {
-                    const element = allElements[i];
-                    if (element.tagName === 'TABLE' && element.classList.contains('releaseTable')) {
-                        let selector = 'table.releaseTable';
-                        const tableIndex = Array.from(document.querySelectorAll(selector)).indexOf(element);
-                        tablePaths.push(`${selector}:nth-of-type(${tableIndex + 1})`);
-                    }
-                }
-                return tablePaths;
-            }""", {'currentIndex': current_index, 'nextIndex': next_index})
-
-            for table_selector in table_selectors:
-                table = self.page.query_selector(table_selector)
-                if not table:
-                    continue
-
-                common_info = {}
-                country_groups = []
-                current_country_group = []
-                in_country_section = False
-
-                rows = table.query_selector_all('tbody tr')
-
-                if rows:
-                    date_cell = rows[0].query_selector('td')
-                    if date_cell:
-                        release_date = date_cell.inner_text().strip().replace(" Release", "")
-                        common_info['release_date'] = release_date
-
-                for row in rows[1:]:
-                    cells = row.query_selector_all('td')
-                    if len(cells) == 2:
-                        key, value_text = cells[0].inner_text().strip().replace(':', ''), cells[1].inner_text().strip()
-                        key = key.lower().replace(' ', '_')
-
-                        if key == 'countries':
-                            in_country_section = True
-                            countries_html = cells[1].inner_html()
-                            clean_html = self.page.evaluate("(html) => html.replace(/<img[^>]*>/g, '').trim();", countries_html)
-                            countries = [c.strip() for c in clean_html.split(',')]
-
-                            # Create a new group for each country
-                            new_country_groups = []
-                            for country in countries:
-                                new_group = common_info.copy()
-                                new_group['country'] = country
-                                new_country_groups.append(new_group)
-                            country_groups.extend(new_country_groups)
-                            current_country_group = new_country_groups  # Update the current group
-
-                        elif in_country_section and current_country_group:
-                            # Handle duplicate keys
-                            new_country_group = []
-                            for group in current_country_group:
-                                if key in group:
-                                    # Split entry
-                                    new_group1 = group.copy()
-                                    new_group2 = group.copy()
-                                    new_group2[key] = value_text
-                                    new_country_group.extend([new_group1, new_group2])
-                                else:
-                                    # Update existing entry
-                                    group[key] = value_text
-                                    new_country_group.append(group)  # Keep track of updated groups
-                            
-                            # Update all country groups
-                            country_groups = [g for g in country_groups if g not in current_country_group] + new_country_group
-                            current_country_group = new_country_group
-
-                        else:
-                            # Gather common information
-                            common_info[key] = value_text
-
-                    else:
-                        # Reset the flags when not a key-value row
-                        in_country_section = False
-                        current_country_group = []
-
-                releases[console_name].extend(country_groups)
-
-        return releases
+    def latency_report(self):
+        """ Seconds spent per stage over every call so far: count, failed, mean, p50, p95 and total """
+        return get_metrics().summary()['stages']
 
     def close(self):
         """ Clean up resources """
-        self.browser.close()
-        self.playwright.stop()
+        print_run_report(self.resource_policy, self.rate_limiter)
+        if self.detail_executor:
+            self.detail_executor.shutdown()
+        if self.detail_fetcher:
+            self.detail_fetcher.close()
+        if self.browser:
+            self.browser.close()
+        if self.playwright:
+            self.playwright.stop()
+
+@lru_cache(maxsize=4096)
+def comment_tokens(comments):
+    """ Canonical form of a cover or release comment: its normalized words, sorted """
+    return tuple(sorted(normalize_text(comments).split()))
+
+def release_signature(entry):
+    """ Hashable stand-in for a release dict, equal exactly when the dicts are equal """
+    return json.dumps(entry, sort_keys=True)
 
 def merge_covers_releases_data(covers, releases):
+    """
+    Joins cover entries to the releases of the same console and country whose comments have
+    the same words once normalized, in any order. Covers without a release are kept as is, and
+    releases equal to none of the matched ones are added after them.
+
+    The releases of a console are indexed by (country, comment_tokens) once, so each cover is
+    one dict lookup instead of a scan of every release.
+    """
     # Initialize merged result
     merged_data = {}
 
@@ -614,18 +965,17 @@ def merge_covers_releases_data(covers, releases):
         if console not in merged_data:
             merged_data[console] = []
 
-        release_entries = releases.get(console, [])
+        release_index = {}
+        for entry in releases.get(console, []):
+            release_index.setdefault((entry.get('country'), comment_tokens(entry.get('comments', ''))), []).append(entry)
 
         # Iterate over cover entries
         for cover_entry in cover_entries:
             country = cover_entry['country']
             comments = cover_entry.get('comments', '')
             
-            # Find matching release entry
-            matching_release_entries = [
-                entry for entry in release_entries
-                if entry.get('country') == country and (normalize_text(entry.get('comments', '')) == normalize_text(comments) or unordered_match(normalize_text(entry.get('comments', '')), normalize_text(comments)))
-            ]
+            # Find matching release entries, in release order
+            matching_release_entries = release_index.get((country, comment_tokens(comments)), [])
 
             if matching_release_entries:
                 # Merge entries
@@ -647,8 +997,10 @@ def merge_covers_releases_data(covers, releases):
             entry['console'] = key
         release_entries.extend(value)
 
+    # a release is left out when it equals any matched release, compared once the console is set
+    considered_signatures = {release_signature(entry) for entry in considered_release}
     for release_entry in release_entries:
-        if release_entry not in considered_release:
+        if release_signature(release_entry) not in considered_signatures:
             if release_entry['console'] not in merged_data:
                 merged_data[release_entry['console']] = [release_entry]
             else:
@@ -686,6 +1038,49 @@ def parse_data(overview, screenshots, ratings, specs, merged_cover_releases):
     return merged_cover_releases
 
 
+
+def is_virtual_release(entry):
+    """ A digital release (virtual, online, download, eShop), preceded by a {'game_url': ...} placeholder in the flat entries """
+    comments = entry.get('comments', '')  # Ensure it's a string
+    return isinstance(comments, str) and any(word in comments.lower() for word in ['virtual release', 'online', 'download', 'eshop'])
+
+
+def flatten_game_entries(game_url, overview, screenshots, ratings, specs, merged_cover_releases):
+    """
+    The flat per-release entries stored in data/*.json, from the merged covers and releases of a game.
+
+    :param game_url: MobyGames overview URL of the game, stored on every entry.
+    :return: List of entries. Virtual releases are preceded by a {'game_url': ...} placeholder.
+    """
+    parse_data_result = parse_data(overview, screenshots, ratings, specs, merged_cover_releases)
+
+    # Collect all unique keys dynamically
+    json_data = []
+    for key, value in parse_data_result.items():
+        json_data.extend(value)
+
+    final_list = []
+    # remove virtual entries
+    for entry in json_data:
+        if is_virtual_release(entry):
+            final_list.append({'game_url': game_url})
+        entry['game_url'] = game_url
+        final_list.append(entry)
+
+    return final_list
+
+
+def build_game_entries(game_url, overview, releases, specs, ratings, covers, screenshots):
+    """
+    Combines the scraped pages of one game into the flat per-release entries stored in data/*.json.
+
+    :param game_url: MobyGames overview URL of the game, stored on every entry.
+    :return: List of entries. Virtual releases are preceded by a {'game_url': ...} placeholder.
+    """
+    merged_cover_releases = merge_covers_releases_data(covers, releases)
+    return flatten_game_entries(game_url, overview, screenshots, ratings, specs, merged_cover_releases)
+
+
 if __name__ == '__main__':
 
     url = 'https://www.mobygames.com/game/193484/atari-mania/'
@@ -0,0 +1,290 @@
+import os, json, time, sqlite3, itertools
+from mobygames import is_virtual_release
+from checkpoint_store import write_entries_json
+
+# overview fields with their own column in games, every other field goes to games.details
+OVERVIEW_COLUMNS = ('title', 'mobyid', 'rating', 'description')
+
+
+class OutputStore:
+    """
+    Normalized SQLite store of everything scraped, one row per fact.
+
+    games holds the overview of a game once, however many releases it has, while the
+    per-console screenshots, specs and ratings and the per-release covers get their own
+    tables instead of being copied into every release. platform_games records which games
+    were scraped for which platform, in scrape order. Saving a game again replaces what was
+    stored for it (upsert), so a re-scrape never duplicates rows.
+
+    The flat_releases view joins every release back with its game's overview, covers,
+    screenshots, ratings and specs, one row per release. iter_entries() streams it into the
+    flat per-release entries data/*.json and the Excel export always had, the same ones
+    flatten_game_entries builds from load_game(), so both outputs stay the same. Games
+    imported from an older data/*.json are kept in that flat form until they are scraped again.
+    """
+
+    def __init__(self, path='data/output.sqlite'):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.db = sqlite3.connect(path, timeout=60)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA foreign_keys=ON')
+        self.db.executescript('''
+            CREATE TABLE IF NOT EXISTS games (
+                game_url TEXT PRIMARY KEY,
+                title TEXT,
+                mobyid TEXT,
+                rating TEXT,
+                description TEXT,
+                details TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS games_mobyid ON games (mobyid);
+
+            CREATE TABLE IF NOT EXISTS platform_games (
+                platform TEXT NOT NULL,
+                game_url TEXT NOT NULL,
+                scraped_at REAL,
+                flat_entries TEXT,
+                PRIMARY KEY (platform, game_url)
+            );
+
+            CREATE TABLE IF NOT EXISTS platform_releases (
+                id INTEGER PRIMARY KEY,
+                platform TEXT NOT NULL,
+                game_url TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                console TEXT NOT NULL,
+                country TEXT,
+                comments TEXT,
+                fields TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS platform_releases_game ON platform_releases (platform, game_url, position);
+            CREATE INDEX IF NOT EXISTS platform_releases_console ON platform_releases (console);
+            CREATE INDEX IF NOT EXISTS platform_releases_country ON platform_releases (country);
+
+            CREATE TABLE IF NOT EXISTS covers (
+                release_id INTEGER NOT NULL REFERENCES platform_releases (id) ON DELETE CASCADE,
+                position INTEGER NOT NULL,
+                url TEXT,
+                PRIMARY KEY (release_id, position)
+            );
+
+            CREATE TABLE IF NOT EXISTS screenshots (
+                platform TEXT NOT NULL,
+                game_url TEXT NOT NULL,
+                console TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                url TEXT,
+                PRIMARY KEY (platform, game_url, console, position)
+            );
+
+            CREATE TABLE IF NOT EXISTS specs (
+                platform TEXT NOT NULL,
+                game_url TEXT NOT NULL,
+                console TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                value TEXT,
+                PRIMARY KEY (platform, game_url, console, position)
+            );
+
+            CREATE TABLE IF NOT EXISTS ratings (
+                platform TEXT NOT NULL,
+                game_url TEXT NOT NULL,
+                console TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                value TEXT,
+                PRIMARY KEY (platform, game_url, console, position)
+            );
+
+            DROP VIEW IF EXISTS flat_releases;
+            CREATE VIEW flat_releases AS
+            SELECT platform_releases.platform, platform_releases.game_url, platform_releases.position, platform_releases.console,
+                   platform_releases.fields, games.title, games.mobyid, games.rating, games.description, games.details,
+                   (SELECT json_group_array(url) FROM (
+                        SELECT url FROM covers WHERE covers.release_id = platform_releases.id ORDER BY position)) AS cover_images,
+                   (SELECT json_group_array(url) FROM (
+                        SELECT url FROM screenshots
+                        WHERE screenshots.platform = platform_releases.platform AND screenshots.game_url = platform_releases.game_url
+                          AND screenshots.console = platform_releases.console
+                        ORDER BY position)) AS screenshots,
+                   (SELECT json_group_object(name, json(value)) FROM (
+                        SELECT name, value FROM ratings
+                        WHERE ratings.platform = platform_releases.platform AND ratings.game_url = platform_releases.game_url
+                          AND ratings.console = platform_releases.console
+                        ORDER BY position)) AS ratings,
+                   (SELECT json_group_object(name, json(value)) FROM (
+                        SELECT name, value FROM specs
+                        WHERE specs.platform = platform_releases.platform AND specs.game_url = platform_releases.game_url
+                          AND specs.console = platform_releases.console
+                        ORDER BY position)) AS specs
+            FROM platform_releases LEFT JOIN games ON games.game_url = platform_releases.game_url;
+        ''')
+        self.db.commit()
+
+    def has_game(self, platform, game_url):
+        return self.db.execute('SELECT 1 FROM platform_games WHERE platform = ? AND game_url = ?', (platform, game_url)).fetchone() is not None
+
+    def count_games(self, platform):
+        return self.db.execute('SELECT COUNT(*) FROM platform_games WHERE platform = ?', (platform,)).fetchone()[0]
+
+    def _delete_game(self, platform, game_url):
+        self.db.execute('DELETE FROM platform_releases WHERE platform = ? AND game_url = ?', (platform, game_url))
+        for table in ('screenshots', 'specs', 'ratings'):
+            self.db.execute(f'DELETE FROM {table} WHERE platform = ? AND game_url = ?', (platform, game_url))
+
+    def _mark_scraped(self, platform, game_url, flat_entries=None):
+        self.db.execute('''
+            INSERT INTO platform_games (platform, game_url, scraped_at, flat_entries) VALUES (?, ?, ?, ?)
+            ON CONFLICT (platform, game_url) DO UPDATE SET scraped_at = excluded.scraped_at, flat_entries = excluded.flat_entries
+        ''', (platform, game_url, time.time(), flat_entries))
+
+    def save_game(self, platform, game_url, overview=None, merged_cover_releases=None, screenshots=None, ratings=None, specs=None):
+        """
+        Store one scraped game, replacing anything stored for it on this platform.
+
+        :param merged_cover_releases: merge_covers_releases_data() result, console -> entries.
+                                      Call with only platform and game_url to record a game
+                                      that has no covers or releases.
+        """
+        with self.db:
+            self._delete_game(platform, game_url)
+            if overview is not None:
+                details = {key: value for key, value in overview.items() if key not in OVERVIEW_COLUMNS}
+                self.db.execute('''
+                    INSERT INTO games (game_url, title, mobyid, rating, description, details) VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (game_url) DO UPDATE SET title = excluded.title, mobyid = excluded.mobyid,
+                        rating = excluded.rating, description = excluded.description, details = excluded.details
+                ''', (game_url, *(overview.get(column) for column in OVERVIEW_COLUMNS), json.dumps(details, ensure_ascii=False)))
+
+            position = 0
+            for console, entries in (merged_cover_releases or {}).items():
+                for entry in entries:
+                    fields = dict(entry)
+                    cover_images = fields.get('cover_images')
+                    if cover_images is not None:
+                        # the key stays in fields to keep its place, the URLs live in covers
+                        fields['cover_images'] = None
+                    cursor = self.db.execute(
+                        'INSERT INTO platform_releases (platform, game_url, position, console, country, comments, fields) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                        (platform, game_url, position, console, entry.get('country'), entry.get('comments'), json.dumps(fields, ensure_ascii=False)))
+                    self.db.executemany('INSERT INTO covers (release_id, position, url) VALUES (?, ?, ?)',
+                                        [(cursor.lastrowid, index, url) for index, url in enumerate(cover_images or [])])
+                    position += 1
+
+            for console, urls in (screenshots or {}).items():
+                self.db.executemany('INSERT INTO screenshots (platform, game_url, console, position, url) VALUES (?, ?, ?, ?, ?)',
+                                    [(platform, game_url, console, index, url) for index, url in enumerate(urls)])
+            for table, values_by_console in (('specs', specs), ('ratings', ratings)):
+                for console, values in (values_by_console or {}).items():
+                    self.db.executemany(f'INSERT INTO {table} (platform, game_url, console, position, name, value) VALUES (?, ?, ?, ?, ?, ?)',
+                                        [(platform, game_url, console, index, name, json.dumps(value, ensure_ascii=False))
+                                         for index, (name, value) in enumerate(values.items())])
+
+            self._mark_scraped(platform, game_url)
+
+    def import_flat_entries(self, platform, entries):
+        """ Keep the games of an existing data/{platform}.json as they are, grouped by game_url """
+        with self.db:
+            for game_url, game_entries in itertools.groupby(entries, key=lambda entry: entry.get('game_url')):
+                if game_url and not self.has_game(platform, game_url):
+                    self._mark_scraped(platform, game_url, json.dumps(list(game_entries), ensure_ascii=False))
+
+    def load_game(self, platform, game_url):
+        """ (overview, merged_cover_releases, screenshots, ratings, specs) as they were saved """
+        row = self.db.execute(f'SELECT {", ".join(OVERVIEW_COLUMNS)}, details FROM games WHERE game_url = ?', (game_url,)).fetchone()
+        overview = {**dict(zip(OVERVIEW_COLUMNS, row[:-1])), **json.loads(row[-1])} if row else {}
+
+        merged_cover_releases = {}
+        releases = self.db.execute('SELECT id, console, fields FROM platform_releases WHERE platform = ? AND game_url = ? ORDER BY position',
+                                   (platform, game_url)).fetchall()
+        covers = {}
+        for release_id, url in self.db.execute('''
+            SELECT covers.release_id, covers.url FROM covers JOIN platform_releases ON platform_releases.id = covers.release_id
+            WHERE platform_releases.platform = ? AND platform_releases.game_url = ? ORDER BY covers.release_id, covers.position
+        ''', (platform, game_url)):
+            covers.setdefault(release_id, []).append(url)
+        for release_id, console, fields in releases:
+            entry = json.loads(fields)
+            if 'cover_images' in entry:
+                entry['cover_images'] = covers.get(release_id, [])
+            merged_cover_releases.setdefault(console, []).append(entry)
+
+        screenshots = {}
+        for console, url in self.db.execute('SELECT console, url FROM screenshots WHERE platform = ? AND game_url = ? ORDER BY console, position',
+                                            (platform, game_url)):
+            screenshots.setdefault(console, []).append(url)
+        ratings, specs = {}, {}
+        for values, table in ((ratings, 'ratings'), (specs, 'specs')):
+            for console, name, value in self.db.execute(f'SELECT console, name, value FROM {table} WHERE platform = ? AND game_url = ? ORDER BY console, position',
+                                                        (platform, game_url)):
+                values.setdefault(console, {})[name] = json.loads(value)
+
+        return overview, merged_cover_releases, screenshots, ratings, specs
+
+    def iter_entries(self, platform):
+        """ Flat per-release entries of every game of a platform in scrape order, streamed from one query over flat_releases """
+        rows = self.db.execute('''
+            SELECT platform_games.game_url, platform_games.flat_entries, flat_releases.fields, flat_releases.title,
+                   flat_releases.mobyid, flat_releases.rating, flat_releases.description, flat_releases.details,
+                   flat_releases.cover_images, flat_releases.screenshots, flat_releases.ratings, flat_releases.specs
+            FROM platform_games LEFT JOIN flat_releases
+                ON flat_releases.platform = platform_games.platform AND flat_releases.game_url = platform_games.game_url
+            WHERE platform_games.platform = ?
+            ORDER BY platform_games.rowid, flat_releases.position
+        ''', (platform,))
+        for game_url, flat_entries, fields, *overview, details, cover_images, screenshots, ratings, specs in rows:
+            if flat_entries is not None:
+                yield from json.loads(flat_entries)
+                continue
+            if fields is None:
+                # scraped without covers or releases
+                continue
+            # the same steps as flatten_game_entries
+            entry = json.loads(fields)
+            if 'cover_images' in entry:
+                entry['cover_images'] = json.loads(cover_images)
+            if details is not None:
+                entry.update(zip(OVERVIEW_COLUMNS, overview))
+                entry.update(json.loads(details))
+            entry['screenshots'] = json.loads(screenshots)
+            entry.update(json.loads(ratings))
+            entry['specs'] = ' | '.join(f"{k}: {v}" for k, v in json.loads(specs).items())
+            if is_virtual_release(entry):
+                yield {'game_url': game_url}
+            entry['game_url'] = game_url
+            yield entry
+
+    def fields(self, platform):
+        """
+        Set of the keys iter_entries(platform) yields, read from the tables without
+        rebuilding a single entry, so an export can know its columns before streaming rows.
+        """
+        keys = {key for (key,) in self.db.execute('''
+            SELECT DISTINCT fields.key FROM platform_releases, json_each(platform_releases.fields) AS fields
+            WHERE platform_releases.platform = ?
+            UNION
+            SELECT DISTINCT details.key FROM games, json_each(games.details) AS details
+            WHERE games.game_url IN (SELECT game_url FROM platform_releases WHERE platform = ?)
+            UNION
+            SELECT DISTINCT ratings.name FROM ratings JOIN platform_releases
+                ON platform_releases.platform = ratings.platform AND platform_releases.game_url = ratings.game_url
+                AND platform_releases.console = ratings.console
+            WHERE ratings.platform = ?
+            UNION
+            SELECT DISTINCT fields.key FROM platform_games, json_each(platform_games.flat_entries) AS entries, json_each(entries.value) AS fields
+            WHERE platform_games.platform = ? AND platform_games.flat_entries IS NOT NULL
+        ''', (platform, platform, platform, platform))}
+        if self.db.execute('SELECT 1 FROM platform_releases WHERE platform = ? LIMIT 1', (platform,)).fetchone():
+            # added to every release by flatten_game_entries
+            keys.update(OVERVIEW_COLUMNS, ('screenshots', 'specs', 'game_url'))
+        return keys
+
+    def compact(self, platform, output_path):
+        """ Write the flat entries of a platform as one JSON list, formatted like json.dump(..., indent=4) """
+        write_entries_json(self.iter_entries(platform), output_path)
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,92 @@
+import os, gzip, sqlite3, hashlib, threading, time
+
+try:
+    import zstandard
+except ImportError:  # gzip is always available, zstd is smaller and faster when installed
+    zstandard = None
+
+
+class PageArchive:
+    """
+    Content-addressed archive of the raw HTML of every page the scraper visits.
+
+    Each distinct page body is compressed once and stored under its sha256 in
+    {root}/objects/ab/abcdef....html.zst (or .html.gz); {root}/index.sqlite maps every
+    URL to the hash of the last body seen for it, so identical pages share one object.
+    """
+
+    def __init__(self, root='archive', compression=None):
+        self.root = root
+        self.compression = compression or ('zstd' if zstandard else 'gzip')
+        if self.compression == 'zstd' and not zstandard:
+            raise ValueError("compression='zstd' needs the zstandard package")
+        if self.compression not in ('zstd', 'gzip'):
+            raise ValueError(f"Unknown compression {self.compression!r}, expected 'zstd' or 'gzip'")
+
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(root, 'index.sqlite'), check_same_thread=False)
+        self.db.execute('''CREATE TABLE IF NOT EXISTS pages (
+            url TEXT PRIMARY KEY,
+            sha256 TEXT NOT NULL,
+            compression TEXT NOT NULL,
+            fetched_at REAL NOT NULL
+        )''')
+        self.db.commit()
+
+    def _object_path(self, sha, compression):
+        extension = 'zst' if compression == 'zstd' else 'gz'
+        return os.path.join(self.root, 'objects', sha[:2], f'{sha}.html.{extension}')
+
+    def put(self, url, html):
+        """ Store the HTML of a URL and return its content hash """
+        body = html.encode('utf-8')
+        sha = hashlib.sha256(body).hexdigest()
+        path = self._object_path(sha, self.compression)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if self.compression == 'zstd':
+                data = zstandard.ZstdCompressor(level=10).compress(body)
+            else:
+                data = gzip.compress(body)
+            # write then rename so a crash never leaves a truncated object behind
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as file:
+                file.write(data)
+            os.replace(tmp_path, path)
+
+        with self.lock:
+            self.db.execute('INSERT OR REPLACE INTO pages (url, sha256, compression, fetched_at) VALUES (?, ?, ?, ?)',
+                            (url, sha, self.compression, time.time()))
+            self.db.commit()
+        return sha
+
+    def get(self, url):
+        """ Return the archived HTML of a URL, or None if it was never stored """
+        with self.lock:
+            row = self.db.execute('SELECT sha256, compression FROM pages WHERE url = ?', (url,)).fetchone()
+        if row is None:
+            return None
+
+        sha, compression = row
+        with open(self._object_path(sha, compression), 'rb') as file:
+            data = file.read()
+        if compression == 'zstd':
+            if not zstandard:
+                raise RuntimeError(f'{url} is archived with zstd but the zstandard package is not installed')
+            data = zstandard.ZstdDecompressor().decompress(data)
+        else:
+            data = gzip.decompress(data)
+        return data.decode('utf-8')
+
+    def __contains__(self, url):
+        with self.lock:
+            return self.db.execute('SELECT 1 FROM pages WHERE url = ?', (url,)).fetchone() is not None
+
+    def __len__(self):
+        with self.lock:
+            return self.db.execute('SELECT COUNT(*) FROM pages').fetchone()[0]
+
+    def close(self):
+        self.db.close()
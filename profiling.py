@@ -0,0 +1,159 @@
+import os, re, json, time, shutil, pstats, cProfile, tracemalloc
+from contextlib import contextmanager
+
+# functions listed per profiled game in summary.json and profile.txt
+HOT_FUNCTIONS = 15
+
+
+def _function_name(key):
+    filename, line, name = key
+    return f'{os.path.basename(filename)}:{line}({name})' if line else name
+
+
+def hot_functions(profile, limit=HOT_FUNCTIONS):
+    """ The functions of a cProfile.Profile taking the most time by themselves, with their cumulative time """
+    stats = pstats.Stats(profile).stats
+    ranked = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+    return [{'function': _function_name(key), 'calls': nc, 'own': round(tt, 4), 'cumulative': round(ct, 4)}
+            for key, (cc, nc, tt, ct, callers) in ranked]
+
+
+def _slug(link):
+    return re.sub(r'[^\w-]+', '-', link.split('://', 1)[-1]).strip('-')[-80:]
+
+
+class GameProfiler:
+    """
+    Opt-in profiling of the games of a scrape, see scrapeConsoleGame.py --profile-*.
+
+    Every `every`-th game, and any game taking longer than `threshold` seconds, is kept with
+    a cProfile of the scraping thread (profile.pstats, readable with snakeviz or pstats, and
+    the hot functions in profile.txt) and, with `trace`, a Playwright trace of the browser
+    (trace.zip, open it with `playwright show-trace`). Whether a game is over the threshold
+    is only known once it is done, so with a threshold every game is profiled and traced
+    and the fast ones are thrown away: expect the scrape to be noticeably slower.
+
+    Every `tracemalloc_every` games the top allocation growth since the previous snapshot
+    is written to tracemalloc-{game}.txt, to find what keeps growing in a long run.
+
+    Artifacts go to {directory}/{game number}-{console}-{link}/. Only the `keep` most recent
+    game directories are kept, plus those of the `slowest` slowest games listed in
+    {directory}/summary.json together with their hot functions.
+
+    cProfile only sees the thread scraping the game: the detail page and upload pools show
+    up as the time spent waiting for their futures.
+    """
+
+    def __init__(self, directory='profiles', every=None, threshold=None, trace=False, tracemalloc_every=None, keep=20, slowest=10):
+        self.directory = directory
+        self.every = every
+        self.threshold = threshold
+        self.trace = trace
+        self.tracemalloc_every = tracemalloc_every
+        self.keep = keep
+        self.slowest_count = slowest
+        self.games = 0
+        self.kept = []
+        self.slowest = []
+        self.previous_snapshot = None
+        os.makedirs(directory, exist_ok=True)
+        if tracemalloc_every and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+
+    def _profiles(self, number):
+        """ Whether the game about to start is profiled """
+        return self.threshold is not None or (self.every and number % self.every == 0)
+
+    @contextmanager
+    def game(self, scraper, console, link):
+        """ Profile the block scraping one game, according to the settings """
+        self.games += 1
+        number = self.games
+        profiling = self._profiles(number)
+        profile = cProfile.Profile() if profiling else None
+        tracing = False
+        if profiling and self.trace:
+            try:
+                scraper.start_trace()
+                tracing = True
+            except Exception as e:
+                print(f"Could not start the trace: {e}")
+
+        start = time.perf_counter()
+        ok = False
+        if profile:
+            profile.enable()
+        try:
+            yield
+            ok = True
+        finally:
+            if profile:
+                profile.disable()
+            seconds = time.perf_counter() - start
+            keep = profiling and ((self.every and number % self.every == 0) or (self.threshold is not None and seconds > self.threshold))
+            game_directory = None
+            if keep:
+                game_directory = os.path.join(self.directory, f'{number:06d}-{console}-{_slug(link)}')
+                os.makedirs(game_directory, exist_ok=True)
+            if tracing:
+                scraper.stop_trace(os.path.join(game_directory, 'trace.zip') if keep else None)
+            if keep:
+                self._save(number, console, link, seconds, ok, profile, game_directory)
+            if self.tracemalloc_every and number % self.tracemalloc_every == 0:
+                self._snapshot(number)
+
+    def _save(self, number, console, link, seconds, ok, profile, game_directory):
+        profile.dump_stats(os.path.join(game_directory, 'profile.pstats'))
+        with open(os.path.join(game_directory, 'profile.txt'), 'w', encoding='utf-8') as file:
+            file.write(f'{link} ({console}): {seconds:.2f}s{"" if ok else ", failed"}\n\n')
+            pstats.Stats(profile, stream=file).sort_stats('cumulative').print_stats(40)
+
+        record = {
+            'game': number,
+            'console': console,
+            'link': link,
+            'seconds': round(seconds, 3),
+            'ok': ok,
+            'directory': game_directory,
+            'hot_functions': hot_functions(profile),
+        }
+        self.kept.append(game_directory)
+        self.slowest = sorted(self.slowest + [record], key=lambda entry: entry['seconds'], reverse=True)[:self.slowest_count]
+        self._rotate()
+        self.write_summary()
+        print(f"Profiled {link} ({seconds:.2f}s) to {game_directory}")
+
+    def _rotate(self):
+        """ Remove the oldest game directories beyond `keep`, sparing those of the slowest games """
+        spared = {entry['directory'] for entry in self.slowest}
+        while len([path for path in self.kept if path not in spared]) > self.keep:
+            oldest = next(path for path in self.kept if path not in spared)
+            self.kept.remove(oldest)
+            shutil.rmtree(oldest, ignore_errors=True)
+        self.kept = [path for path in self.kept if os.path.isdir(path)]
+
+    def _snapshot(self, number):
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ])
+        current, peak = tracemalloc.get_traced_memory()
+        path = os.path.join(self.directory, f'tracemalloc-{number:06d}.txt')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(f'after {number} games: {current / 1024 / 1024:.1f} MB traced, peak {peak / 1024 / 1024:.1f} MB\n\n')
+            if self.previous_snapshot is None:
+                stats = snapshot.statistics('lineno')
+                file.write('largest allocations (first snapshot)\n')
+            else:
+                stats = snapshot.compare_to(self.previous_snapshot, 'lineno')
+                file.write(f'growth since game {number - self.tracemalloc_every}\n')
+            for stat in stats[:30]:
+                file.write(f'{stat}\n')
+        self.previous_snapshot = snapshot
+
+    def write_summary(self):
+        path = os.path.join(self.directory, 'summary.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump({'games': self.games, 'slowest': self.slowest}, file, indent=4)
+        os.replace(tmp_path, path)
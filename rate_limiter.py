@@ -0,0 +1,155 @@
+import os, time, asyncio, threading
+from urllib.parse import urlsplit
+from metrics import get_metrics
+
+# statuses telling the client to slow down
+THROTTLE_STATUSES = (429, 503)
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket pacing the requests made to one host, shared by every thread that fetches.
+
+    acquire() blocks until the request may go out, at most `rate` requests per second with
+    bursts of up to `burst`. record() reports how the request went and adapts the rate
+    AIMD-style: every request answered in time adds `increase` / rate, so the rate grows by
+    about `increase` requests per second every second, up to max_rate. A 429 or 503, a
+    request that got no response at all, or one slower than `latency_target` seconds
+    multiplies the rate by `decrease`, down to min_rate, at most once per `cooldown` seconds
+    so that a burst of concurrent failures counts as one. A Retry-After pauses the bucket
+    for every thread. The rate settles just under what the site tolerates.
+    """
+
+    def __init__(self, rate=2.0, min_rate=0.1, max_rate=10.0, burst=5, increase=0.1, decrease=0.5, latency_target=5.0,
+                 cooldown=2.0, clock=time.monotonic, sleep=time.sleep):
+        """
+        :param rate: Requests per second to start from.
+        :param latency_target: Seconds above which a response counts as a sign of server
+                               pressure, None to only react to statuses and failures.
+        """
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_target = latency_target
+        self.cooldown = cooldown
+        self.clock = clock
+        self.sleep = sleep
+        self.lock = threading.Lock()
+        self.tokens = float(burst)
+        # tokens are counted up to this instant, in the future while a Retry-After pause lasts
+        self.updated = clock()
+        self.adjusted = float('-inf')
+        self.throttled = 0
+        self.slow = 0
+        self.failed = 0
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def _reserve(self):
+        """ Take a token, returning the seconds to wait before it may be used """
+        with self.lock:
+            now = self.clock()
+            self._refill(now)
+            self.tokens -= 1
+            return max(0.0, self.updated + max(0.0, -self.tokens) / self.rate - now)
+
+    def acquire(self):
+        """ Wait until one more request may be sent, returns the seconds waited """
+        wait = self._reserve()
+        if wait:
+            self.sleep(wait)
+        get_metrics().record_stage('rate_limit_wait', wait)
+        return wait
+
+    async def acquire_async(self):
+        """ acquire() for the async API """
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
+        get_metrics().record_stage('rate_limit_wait', wait)
+        return wait
+
+    def record(self, seconds, status=None, retry_after=None, failed=False):
+        """
+        Adapt the rate to the outcome of a request.
+
+        :param seconds: How long the request took.
+        :param status: HTTP status of the response, None when unknown.
+        :param retry_after: Seconds from the Retry-After header, if any.
+        :param failed: The request got no response (timeout, connection error).
+        """
+        throttled = status in THROTTLE_STATUSES
+        slow = self.latency_target is not None and seconds > self.latency_target
+        with self.lock:
+            now = self.clock()
+            self._refill(now)
+            if throttled or failed or slow:
+                if throttled:
+                    self.throttled += 1
+                elif failed:
+                    self.failed += 1
+                else:
+                    self.slow += 1
+                if now >= self.adjusted + self.cooldown:
+                    self.rate = max(self.min_rate, self.rate * self.decrease)
+                    self.adjusted = now
+                if retry_after:
+                    # no token is handed out before the pause is over
+                    self.updated = max(self.updated, now + retry_after)
+                    self.tokens = min(self.tokens, 0.0)
+            elif (status is None or status < 400) and now >= self.adjusted + self.cooldown:
+                self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+        if throttled or failed or slow:
+            get_metrics().inc('rate_limit_backoffs_total', reason='throttled' if throttled else 'failed' if failed else 'slow')
+
+    def report(self):
+        with self.lock:
+            return {'rate': self.rate, 'throttled': self.throttled, 'failed': self.failed, 'slow': self.slow}
+
+    def summary(self):
+        report = self.report()
+        return (f"Request rate {report['rate']:.2f}/s, slowed down after {report['throttled']} throttled, "
+                f"{report['failed']} failed and {report['slow']} slow requests")
+
+
+_rate_limiters = {}
+_rate_limiter_lock = threading.Lock()
+
+def get_rate_limiter(host=None):
+    """
+    Process wide AdaptiveRateLimiter of a host, shared by the browser, the HTTP fetchers and
+    the image downloads, created on first use. Every host gets its own, so the images of the
+    CDN do not spend the request budget of the site and a 429 from one host does not slow
+    down the other. RATE_LIMIT sets the starting requests per second of each host (0 turns
+    the limiters off, then None is returned) and RATE_LIMIT_MAX their ceiling.
+    """
+    with _rate_limiter_lock:
+        if float(os.getenv('RATE_LIMIT', '2')) <= 0:
+            return None
+        limiter = _rate_limiters.get(host)
+        if limiter is None:
+            limiter = _rate_limiters[host] = AdaptiveRateLimiter(rate=float(os.getenv('RATE_LIMIT', '2')),
+                                                                  max_rate=float(os.getenv('RATE_LIMIT_MAX', '10')))
+        return limiter
+
+
+def rate_limiters():
+    """ Host -> AdaptiveRateLimiter of every host requested so far """
+    with _rate_limiter_lock:
+        return dict(_rate_limiters)
+
+
+def limiter_for(rate_limiter, url):
+    """
+    Limiter pacing a request to url: the host's one from get_rate_limiter() when rate_limiter
+    is None, nothing when it is False, rate_limiter itself otherwise.
+    """
+    if rate_limiter is None:
+        return get_rate_limiter(urlsplit(url).hostname)
+    return rate_limiter or None
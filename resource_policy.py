@@ -0,0 +1,136 @@
+import re
+from collections import Counter
+from urllib.parse import urlsplit
+
+# resource types a page is allowed to load from MobyGames, by page type. The extractors
+# only read the DOM, so images, fonts and media are never needed. innerText depends on
+# CSS (hidden elements are left out), so the pages read with innerText keep their
+# stylesheets. The official description of the overview is read from #description-text,
+# which parse_overview_html finds in the raw HTML; get_overview_details still waits for it
+# to have text in case the page's scripts fill it in, so the overview keeps them. The
+# releases page parses fine from the raw HTML in fetch_mode='http', so it needs none.
+# The galleries keep their scripts to stay on the safe side.
+DEFAULT_ALLOW = {
+    'overview': {'document', 'stylesheet', 'script', 'xhr', 'fetch'},
+    'releases': {'document', 'stylesheet'},
+    'specs': {'document'},
+    'covers': {'document', 'script', 'xhr', 'fetch'},
+    'screenshots': {'document', 'script', 'xhr', 'fetch'},
+    'default': {'document', 'stylesheet', 'script', 'xhr', 'fetch'},
+}
+
+# typical transfer size of a blocked resource, used to estimate the bytes saved: blocked
+# requests are never sent, so their real size is unknown
+ESTIMATED_SIZES = {
+    'image': 60_000,
+    'media': 500_000,
+    'font': 40_000,
+    'stylesheet': 30_000,
+    'script': 50_000,
+    'xhr': 5_000,
+    'fetch': 5_000,
+}
+DEFAULT_ESTIMATED_SIZE = 10_000
+
+FIRST_PARTY_HOSTS = ('mobygames.com',)
+
+# /game/{id}/{slug}/ is the overview, /game/{id}/{slug}/{page}/... one of its pages;
+# listings (/game/platform:.../) and the other game pages (credits, trivia...) do not match.
+# Matched once repeated slashes are collapsed: scrape_game appends /releases/... to game
+# links that already end with a slash.
+GAME_PAGE = re.compile(r'^/game/\d+/[^/:]+(?:/(?:(covers|screenshots|releases|specs)(?:/.*)?)?)?$')
+
+
+def page_type_of(url):
+    """ 'overview', 'releases', 'specs', 'covers' or 'screenshots' for a game page URL, 'default' otherwise """
+    match = GAME_PAGE.match(re.sub(r'/{2,}', '/', urlsplit(url).path))
+    if match is None:
+        return 'default'
+    return match.group(1) or 'overview'
+
+
+def _host_matches(host, hosts):
+    return any(host == allowed or host.endswith('.' + allowed) for allowed in hosts)
+
+
+class ResourcePolicy:
+    """
+    Blocks the requests a page does not need, registered on a browser context with context.route.
+
+    Which resource types are loaded depends on the type of the page making the request
+    (see page_type_of), with one allow list per page type in `allow`; page types without a
+    list use allow['default']. Third-party requests (ads, analytics, CDNs) are blocked
+    whatever their type unless their host is in `allowed_hosts`. The main document of a
+    navigation is always loaded.
+
+    Allowed requests are passed on with route.fallback(), so a route registered on the
+    context earlier (the replay handler) still sees them. Blocked requests are counted with
+    an estimate of their size from typical sizes, see report(); being blocked, their real
+    size is never known.
+    """
+
+    def __init__(self, allow=None, allowed_hosts=(), first_party_hosts=FIRST_PARTY_HOSTS, estimated_sizes=None):
+        """
+        :param allow: Page type -> resource types allowed, merged over DEFAULT_ALLOW.
+        :param allowed_hosts: Third-party hosts whose requests go through like first-party ones.
+        :param estimated_sizes: Resource type -> bytes, merged over ESTIMATED_SIZES.
+        """
+        self.allow = {**DEFAULT_ALLOW, **(allow or {})}
+        self.hosts = tuple(first_party_hosts) + tuple(allowed_hosts)
+        self.estimated_sizes = {**ESTIMATED_SIZES, **(estimated_sizes or {})}
+        self.blocked = Counter()
+        self.allowed = Counter()
+
+    def allows(self, request):
+        """ Whether a request goes through, counting it either way """
+        resource_type = request.resource_type
+        if resource_type == 'document' and request.is_navigation_request() and request.frame.parent_frame is None:
+            self.allowed[('navigation', resource_type)] += 1
+            return True
+        try:
+            page_type = page_type_of(request.frame.url)
+        except Exception:
+            # service worker requests have no frame
+            page_type = 'default'
+
+        allowed = (_host_matches(urlsplit(request.url).hostname or '', self.hosts)
+                   and resource_type in self.allow.get(page_type, self.allow['default']))
+        (self.allowed if allowed else self.blocked)[(page_type, resource_type)] += 1
+        return allowed
+
+    def handle(self, route):
+        """ Route handler for the sync API: context.route('**/*', policy.handle) """
+        if self.allows(route.request):
+            route.fallback()
+        else:
+            route.abort('blockedbyclient')
+
+    async def handle_async(self, route):
+        """ Route handler for the async API """
+        if self.allows(route.request):
+            await route.fallback()
+        else:
+            await route.abort('blockedbyclient')
+
+    def estimated_bytes_saved(self):
+        """ Estimated bytes not downloaded thanks to the blocked requests, from estimated_sizes """
+        return sum(count * self.estimated_sizes.get(resource_type, DEFAULT_ESTIMATED_SIZE)
+                   for (page_type, resource_type), count in self.blocked.items())
+
+    def report(self):
+        """ Blocked and allowed request counts by resource type, and the estimated bytes saved """
+        blocked_by_type, allowed_by_type = Counter(), Counter()
+        for (page_type, resource_type), count in self.blocked.items():
+            blocked_by_type[resource_type] += count
+        for (page_type, resource_type), count in self.allowed.items():
+            allowed_by_type[resource_type] += count
+        return {
+            'blocked': dict(blocked_by_type),
+            'allowed': dict(allowed_by_type),
+            'estimated_bytes_saved': self.estimated_bytes_saved(),
+        }
+
+    def summary(self):
+        report = self.report()
+        blocked = ', '.join(f'{count} {resource_type}' for resource_type, count in sorted(report['blocked'].items())) or 'nothing'
+        return f"Blocked {blocked}, an estimated {report['estimated_bytes_saved'] / 1_000_000:.1f} MB saved (typical sizes, not measured)"
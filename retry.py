@@ -0,0 +1,168 @@
+import time, random, asyncio, inspect, threading
+import requests
+from playwright.sync_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+
+# error classes returned by classify_error, everything but FATAL is retried
+TIMEOUT = 'timeout'
+THROTTLED = 'throttled'
+SERVER = 'server'
+NETWORK = 'network'
+CRASH = 'crash'
+FATAL = 'fatal'
+
+# Playwright reports a dead page or browser through plain Error messages
+CRASH_MESSAGES = ('Target closed', 'Target page, context or browser has been closed', 'Page crashed',
+                  'page crashed', 'Browser has been closed', 'browser has been closed')
+
+
+class HTTPStatusError(Exception):
+    """ A page answered with a status worth retrying (429 or 5xx) """
+
+    def __init__(self, url, status, retry_after=None):
+        super().__init__(f'{url} returned HTTP {status}')
+        self.url = url
+        self.status = status
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value):
+    """ Seconds from a Retry-After header, None when it is missing or an HTTP date """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def check_status(url, status, headers=None):
+    """ Raise HTTPStatusError for a retryable status, headers is a dict of lowercase header names """
+    if status == 429 or 500 <= status < 600:
+        raise HTTPStatusError(url, status, parse_retry_after((headers or {}).get('retry-after')))
+
+
+def classify_error(error):
+    """ One of TIMEOUT, THROTTLED, SERVER, NETWORK, CRASH or FATAL """
+    if isinstance(error, HTTPStatusError):
+        return THROTTLED if error.status == 429 else SERVER
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        if status == 429:
+            return THROTTLED
+        return SERVER if 500 <= status < 600 else FATAL
+    if isinstance(error, (requests.Timeout, PlaywrightTimeoutError)):
+        return TIMEOUT
+    if isinstance(error, requests.ConnectionError):
+        return NETWORK
+    if isinstance(error, PlaywrightError):
+        message = str(error)
+        if any(text in message for text in CRASH_MESSAGES):
+            return CRASH
+        if 'net::ERR_' in message or 'NS_ERROR_' in message:
+            return NETWORK
+    return FATAL
+
+
+def retry_after(error):
+    """ Delay asked for by the server, if any """
+    if isinstance(error, HTTPStatusError):
+        return error.retry_after
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return parse_retry_after(error.response.headers.get('Retry-After'))
+    return None
+
+
+class RetryExhausted(Exception):
+    """ Raised by RetryPolicy.call once a stage ran out of attempts or budget, wraps the last error """
+
+    def __init__(self, stage, error_class, error):
+        super().__init__(f'{stage} failed ({error_class}): {error}')
+        self.stage = stage
+        self.error_class = error_class
+        self.error = error
+
+
+class RetryPolicy:
+    """
+    Retries transient failures with exponential backoff and jitter.
+
+    Each call gets up to max_attempts tries. On top of that every stage ('navigation',
+    'fetch', 'image', ...) has a retry budget shared by all its calls until reset_budget(),
+    normally once per game, so one bad game can not spend minutes backing off page after
+    page; a budget of None means unlimited. Fatal errors (4xx, parsing bugs, pages
+    missing from a replay archive) are never retried.
+    """
+
+    def __init__(self, max_attempts=4, base_delay=1.0, max_delay=30.0, budgets=None, default_budget=8, sleep=time.sleep):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budgets = dict(budgets or {})
+        self.default_budget = default_budget
+        self.sleep = sleep
+        self.lock = threading.Lock()
+        self.spent = {}
+
+    def reset_budget(self):
+        with self.lock:
+            self.spent = {}
+
+    def backoff(self, attempt, error=None):
+        """ Delay before retry number attempt (1 based): exponential with equal jitter """
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        server_delay = retry_after(error) if error is not None else None
+        if server_delay:
+            delay = max(delay, min(server_delay, self.max_delay * 4))
+        return delay
+
+    def _take_budget(self, stage):
+        with self.lock:
+            spent = self.spent.get(stage, 0)
+            budget = self.budgets.get(stage, self.default_budget)
+            if budget is not None and spent >= budget:
+                return False
+            self.spent[stage] = spent + 1
+            return True
+
+    def _retry_delay(self, stage, error, attempt):
+        """ (error class, seconds to wait) before retrying error, raises RetryExhausted when it may not be """
+        error_class = classify_error(error)
+        if error_class == FATAL or attempt >= self.max_attempts or not self._take_budget(stage):
+            raise RetryExhausted(stage, error_class, error) from error
+
+        delay = self.backoff(attempt, error)
+        print(f"{stage} {error_class} error, retry {attempt} of {self.max_attempts - 1} in {delay:.1f}s: {error}")
+        return error_class, delay
+
+    def call(self, stage, func, *args, on_retry=None, **kwargs):
+        """
+        Run func(*args, **kwargs), retrying transient errors.
+
+        :param on_retry: Optional callback(error_class, error, attempt) run before each retry,
+                         used to replace a crashed page.
+        :raises RetryExhausted: When the error is fatal or the attempts or budget ran out.
+        """
+        attempt = 1
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                error_class, delay = self._retry_delay(stage, e, attempt)
+                self.sleep(delay)
+                if on_retry:
+                    on_retry(error_class, e, attempt)
+                attempt += 1
+
+    async def call_async(self, stage, func, *args, on_retry=None, **kwargs):
+        """ call() for coroutine functions, on_retry may be a coroutine function too """
+        attempt = 1
+        while True:
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                error_class, delay = self._retry_delay(stage, e, attempt)
+                await asyncio.sleep(delay)
+                if on_retry:
+                    result = on_retry(error_class, e, attempt)
+                    if inspect.isawaitable(result):
+                        await result
+                attempt += 1
@@ -0,0 +1,209 @@
+import os, time, hashlib, tempfile, threading
+import boto3, requests
+from urllib.parse import urlparse
+from botocore.config import Config
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from image_manifest import ImageManifest
+from retry import RetryPolicy, parse_retry_after
+from metrics import get_metrics
+from rate_limiter import limiter_for
+
+
+class _CountingReader:
+    """ File-like wrapper counting the bytes read through it """
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_read = 0
+
+    def read(self, *args):
+        data = self.raw.read(*args)
+        self.bytes_read += len(data)
+        return data
+
+
+def image_s3_key(image_url, folder):
+    """ S3 key (folder + filename) an image URL is stored under """
+    filename = os.path.basename(urlparse(image_url).path)
+    if not filename:
+        raise ValueError("Invalid image URL, no filename found")
+    return f"{folder}{filename}"
+
+def image_s3_url(bucket_name, s3_key):
+    return f"https://{bucket_name}.s3.amazonaws.com/{s3_key}"
+
+def hashed_s3_key(image_url, folder, content_hash):
+    """ Content-addressed S3 key, keeping the extension of the original filename """
+    extension = os.path.splitext(urlparse(image_url).path)[1]
+    return f"{folder}{content_hash}{extension}"
+
+
+class S3Uploader:
+    """
+    Copies images from MobyGames to S3 in the background.
+
+    One boto3 client and one requests.Session are shared by all uploads so their
+    connection pools are reused, each download is streamed straight into upload_fileobj
+    without buffering the whole body, and uploads run on a bounded thread pool.
+    submit() returns a Future right away so the scraper can keep navigating; at most
+    max_pending uploads are queued before submit() blocks.
+
+    With an ImageManifest, images already copied into the same bucket and folder are
+    skipped without being downloaded, and new images are stored under the sha256 of their
+    content so identical images shared between releases and platforms end up as one
+    object. get_uploader() only uses one when IMAGE_MANIFEST is set.
+    """
+
+    def __init__(self, bucket_name=None, max_workers=8, max_pending=64, endpoint_url=None, timeout=60, manifest=None, retry=None,
+                 rate_limiter=None):
+        """
+        :param bucket_name: Default bucket, falls back to the BUCKET_NAME env var.
+        :param endpoint_url: S3 endpoint for a local stand-in such as moto or MinIO,
+                             falls back to the S3_ENDPOINT_URL env var.
+        :param manifest: Optional ImageManifest used to skip re-uploads.
+        :param retry: RetryPolicy for image downloads that time out or get a 429/5xx,
+                      by default 4 attempts per image and no overall budget.
+        :param rate_limiter: Paces the image downloads (not the S3 uploads), by default with
+                             the limiter of the image host (see get_rate_limiter) so the
+                             CDN does not share the budget of the site. False for none.
+        """
+        self.bucket_name = bucket_name or os.getenv('BUCKET_NAME', 'salient-mobygames-scrap')
+        self.timeout = timeout
+        self.manifest = manifest
+        self.retry = retry or RetryPolicy(default_budget=None)
+        self.rate_limiter = rate_limiter
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or os.getenv('S3_ENDPOINT_URL'),
+            config=Config(max_pool_connections=max_workers * 2),
+        )
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='s3-upload')
+        self.pending = threading.BoundedSemaphore(max_pending)
+
+    def stored_url(self, image_url, folder="covers/", bucket_name=None):
+        """ S3 URL an image was uploaded to, without touching the network """
+        bucket_name = bucket_name or self.bucket_name
+        s3_key = self.manifest.key_for_source(bucket_name, folder, image_url) if self.manifest else None
+        return image_s3_url(bucket_name, s3_key or image_s3_key(image_url, folder))
+
+    def _download(self, image_url):
+        """ Start streaming an image, raising requests.HTTPError on a non 2xx status """
+        rate_limiter = limiter_for(self.rate_limiter, image_url)
+        if rate_limiter:
+            rate_limiter.acquire()
+        start = time.perf_counter()
+        try:
+            response = self.session.get(image_url, stream=True, timeout=self.timeout)
+        except Exception:
+            if rate_limiter:
+                rate_limiter.record(time.perf_counter() - start, failed=True)
+            raise
+        if rate_limiter:
+            # the time to the response headers, the body is streamed afterwards
+            rate_limiter.record(time.perf_counter() - start, response.status_code, parse_retry_after(response.headers.get('Retry-After')))
+        if not response.ok:
+            response.close()
+        response.raise_for_status()
+        return response
+
+    def upload(self, image_url, folder="covers/", bucket_name=None):
+        """
+        Copy one image into S3 and return its S3 URL, raising on failure.
+
+        Each call is recorded once in the metrics as the `image` stage, download and upload
+        together since they overlap, with the bytes copied.
+        """
+        bucket_name = bucket_name or self.bucket_name
+        with get_metrics().timer('image'):
+            if self.manifest:
+                s3_url, size = self._upload_deduplicated(image_url, folder, bucket_name)
+            else:
+                s3_url, size = self._upload_streaming(image_url, folder, bucket_name)
+        if size:
+            get_metrics().inc('bytes_total', size, stage='image')
+        return s3_url
+
+    def _upload_streaming(self, image_url, folder, bucket_name):
+        s3_key = image_s3_key(image_url, folder)
+        with self._download(image_url) as response:
+            # let urllib3 undo any Content-Encoding while boto3 reads from the socket
+            response.raw.decode_content = True
+            body = _CountingReader(response.raw)
+            self.client.upload_fileobj(body, bucket_name, s3_key)
+        return image_s3_url(bucket_name, s3_key), body.bytes_read
+
+    def _upload_deduplicated(self, image_url, folder, bucket_name):
+        s3_key = self.manifest.key_for_source(bucket_name, folder, image_url)
+        if s3_key:
+            return image_s3_url(bucket_name, s3_key), 0
+
+        # stored by an earlier run under its filename, before the manifest existed
+        legacy_key = image_s3_key(image_url, folder)
+        if self.manifest.has_bucket_key(bucket_name, legacy_key):
+            self.manifest.record(bucket_name, folder, image_url, None, legacy_key, None)
+            return image_s3_url(bucket_name, legacy_key), 0
+
+        # The key depends on the content hash, so the body is spooled (in memory up to
+        # 8MB, on disk above that) while it streams in and is hashed.
+        digest = hashlib.sha256()
+        with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+            with self._download(image_url) as response:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    digest.update(chunk)
+                    spool.write(chunk)
+            size = spool.tell()
+            content_hash = digest.hexdigest()
+
+            existing = self.manifest.find_by_hash(bucket_name, content_hash)
+            if existing:
+                s3_key, etag = existing
+            else:
+                s3_key = hashed_s3_key(image_url, folder, content_hash)
+                spool.seek(0)
+                self.client.upload_fileobj(spool, bucket_name, s3_key)
+                etag = self.client.head_object(Bucket=bucket_name, Key=s3_key)['ETag'].strip('"')
+
+        self.manifest.record(bucket_name, folder, image_url, content_hash, s3_key, etag)
+        return image_s3_url(bucket_name, s3_key), size
+
+    def _upload_or_none(self, image_url, folder, bucket_name):
+        try:
+            return self.retry.call('image', self.upload, image_url, folder, bucket_name)
+        except Exception as e:
+            print(f"Error uploading image to S3: {e}")
+            return None
+
+    def submit(self, image_url, folder="covers/", bucket_name=None):
+        """ Queue an upload and return a Future of its S3 URL, or of None if it failed; cancel() drops it if not started """
+        self.pending.acquire()
+        try:
+            future = self.executor.submit(self._upload_or_none, image_url, folder, bucket_name)
+        except Exception:
+            self.pending.release()
+            raise
+        # also frees the slot of an upload cancelled before it started
+        future.add_done_callback(lambda _: self.pending.release())
+        return future
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+        self.session.close()
+
+
+_uploader = None
+_uploader_lock = threading.Lock()
+
+def get_uploader():
+    """ Process wide S3Uploader, created on first use """
+    global _uploader
+    with _uploader_lock:
+        if _uploader is None:
+            # opt-in: IMAGE_MANIFEST=data/image_manifest.sqlite skips the images copied by earlier runs
+            manifest_path = os.getenv('IMAGE_MANIFEST')
+            _uploader = S3Uploader(manifest=ImageManifest(manifest_path) if manifest_path else None)
+        return _uploader
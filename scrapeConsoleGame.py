@@ -1,127 +1,255 @@
-import json, re, os, time
-from get_agents import get_agent
-from playwright.sync_api import sync_playwright
-from mobygames import MobyGamesScraper, parse_data, merge_covers_releases_data
-from json_to_excel import export_json_to_excel
-
-
-def scrapeGamesByConsole():
-
-    with open('mobygames_platforms.json', 'r', encoding='utf-8') as file:
-        platforms = json.load(file)
-
-    scrapper = MobyGamesScraper(headless=True)
+import json, re, os, socket, argparse
+from contextlib import nullcontext
+from mobygames import MobyGamesScraper, merge_covers_releases_data
+from json_to_excel import export_json_to_excel, sort_fields
+from json_to_parquet import export_json_to_parquet
+from page_archive import PageArchive
+from output_store import OutputStore
+from job_queue import JobQueue
+from metrics import get_metrics, MetricsReporter
+from profiling import GameProfiler
+
+# consoles queued when --consoles is not given
+CONSOLES = [
+    'amiga',
+    'cpc',
+    'apple-i',
+    'apple2',
+    'apple2gs',
+    'arcade',
+    'atari-8-bit',
+    'atari-st',
+    'bbc-micro',
+    'vic-20',
+]
+
+
+def safe_name(platform_name):
+    return platform_name.replace("/", "").replace("\\", "").replace("?", "").replace("*", "").replace(':','')
+
+
+def create_scraper():
+    # ARCHIVE_DIR keeps the raw HTML of every visited page, REPLAY=1 re-extracts from it offline,
+    # BLOCK_RESOURCES=0 lets the browser load images, fonts and third-party requests again,
+    # NAVIGATION_TIMEOUT is in milliseconds, RATE_LIMIT and RATE_LIMIT_MAX pace the requests to each host (see get_rate_limiter)
+    archive = PageArchive(os.getenv('ARCHIVE_DIR')) if os.getenv('ARCHIVE_DIR') else None
+    return MobyGamesScraper(
+        headless=True,
+        fetch_mode=os.getenv('FETCH_MODE', 'browser'),
+        # DETAIL_FETCH_MODE=http reads the cover and screenshot pages concurrently over HTTP in browser mode too
+        detail_fetch_mode=os.getenv('DETAIL_FETCH_MODE') or None,
+        archive=archive,
+        replay=os.getenv('REPLAY') == '1',
+        resource_policy=False if os.getenv('BLOCK_RESOURCES') == '0' else None,
+        navigation_timeout=int(os.getenv('NAVIGATION_TIMEOUT', '60000')),
+    )
+
+
+def enqueue_consoles(queue, platforms, console_codes):
+    """ Queue a scrape job per game and one export job for each console not queued or exported yet """
     for platform in platforms:
         console_code = platform['console_code']
+        if console_code not in console_codes or queue.has_console(console_code):
+            continue
+        if os.path.exists(f"excels/{safe_name(platform['platform'])}.xlsx"):
+            continue
+
+        with open(f'games_list/{console_code}.json', 'r', encoding='utf-8') as file:
+            games_list = json.load(file)
+
+        jobs = [(console_code, game['link'], 'scrape', {'game': game, 'platform': platform}) for game in games_list]
+        jobs.append((console_code, '', 'export', {'platform': platform}))
+        queue.enqueue_many(jobs)
+        print(f"Queued {len(games_list)} games for {platform['platform']}")
+
+
+def scrape_game(scrapper, console_code, game):
+    """ What OutputStore.save_game stores for one game of a console, None if a page could not be scraped """
+    print(game["link"])
+    scrapper.start_game(console_code)
+    overview_url = game["link"]
+    release_url = f'{game["link"]}/releases/{console_code}'
+    specs_ratings_url = f'{game["link"]}/specs/{console_code}'
+    covers_url = f'{game["link"]}/covers/{console_code}'
+    screenshots_url = f'{game["link"]}/screenshots/{console_code}'
+
+    game_overview = scrapper.get_overview_details(overview_url)
+    if game_overview is None:
+        return None
+    game_releases = scrapper.get_releases(release_url)
+    if game_releases is None:
+        return None
+    game_specs, game_ratings = scrapper.get_specs_and_ratings(specs_ratings_url)
+    if game_specs is None or game_ratings is None:
+        return None
+    game_covers = scrapper.get_covers(covers_url)
+    if game_covers is None:
+        return None
+    if not (game_covers or game_releases):
+        return {}
+
+    game_screenshots = scrapper.get_screenshots(screenshots_url)
+    if game_screenshots is None:
+        return None
+
+    return game_record(game_overview, game_releases, game_specs, game_ratings, game_covers, game_screenshots)
+
+
+def game_record(overview, releases, specs, ratings, covers, screenshots):
+    """ OutputStore.save_game arguments from the scraped pages of a game """
+    return {
+        'overview': overview,
+        'merged_cover_releases': merge_covers_releases_data(covers, releases),
+        'screenshots': screenshots,
+        'ratings': ratings,
+        'specs': specs,
+    }
+
+
+def import_legacy_games(store, platform):
+    """ Games scraped before the output store, from data/{platform}.json """
+    safe_platform_name = safe_name(platform['platform'])
+    if os.path.exists(f'data/{safe_platform_name}.json'):
+        with open(f'data/{safe_platform_name}.json', 'r', encoding='utf-8') as file:
+            store.import_flat_entries(platform['platform'], json.load(file))
+
+
+def export_console(store, platform):
+    safe_platform_name = safe_name(platform['platform'])
+    store.compact(platform['platform'], f'data/{safe_platform_name}.json')
+    console_games = lambda: store.iter_entries(platform['platform'])
+
+    priority_columns = ["console", "title", "comments", "mobyid", "country", "Genre", 'rating', 'description', 'published_by', 'developed_by']
+    # the columns come from the store, so each export streams the entries once
+    fields = sort_fields(store.fields(platform['platform']), priority_columns)
+    export_json_to_excel(console_games, f'excels/{safe_platform_name}.xlsx', priority_columns, fields=fields)
+    export_json_to_parquet(console_games, f'parquet/{safe_platform_name}.parquet', priority_columns, fields=fields)
+    print(f"{platform['platform']} Scrapped Successfully")
+
+
+def run_export_job(queue, store, job):
+    try:
+        export_console(store, job['payload']['platform'])
+    except Exception as e:
+        finish_export_job(queue, job, e)
+    else:
+        finish_export_job(queue, job)
+
+
+def finish_export_job(queue, job, error=None):
+    """ Complete an export job, or send it back to the queue with the error its export raised """
+    if error is None:
+        queue.complete(job['id'])
+        return
+    print(f"Export of {job['payload']['platform']['platform']} failed: {error}")
+    queue.fail(job['id'], error)
+
+
+def game_to_scrape(queue, store, job, imported):
+    """ The game of a scrape job, or None when the output store already has it and the job is done """
+    platform = job['payload']['platform']
+    # scraped games are saved to the output store, data/{platform}.json is written by the export job
+    if platform['platform'] not in imported:
+        if not store.count_games(platform['platform']):
+            import_legacy_games(store, platform)
+        imported.add(platform['platform'])
+
+    game = job['payload']['game']
+    if store.has_game(platform['platform'], game['link']):
+        get_metrics().inc('games_total', console=job['console'], outcome='skipped')
+        queue.complete(job['id'])
+        return None
+    return game
+
+
+def finish_scrape_job(queue, store, job, scraped_game):
+    """ Save what scrape_game returned for the job's game and complete it, or send it back to the queue on None """
+    if scraped_game is None:
+        # transient errors were already retried and the scraper relaunches its browser
+        # by itself after repeated failures, so the job just goes back to the queue
+        get_metrics().inc('games_total', console=job['console'], outcome='failed')
+        queue.fail(job['id'], 'scrape failed')
+        return
+
+    store.save_game(job['payload']['platform']['platform'], job['game_url'], **scraped_game)
+    get_metrics().inc('games_total', console=job['console'], outcome='scraped')
+    queue.complete(job['id'])
+
+
+def scrapeGamesByConsole(queue, worker_id, store, profiler=None):
+    """ Work through the queue until no job is left, one leased job at a time, profiling games with the optional GameProfiler """
+    imported = set()
+    scrapper = None
+
+    while True:
+        job = queue.lease(worker_id)
+        if job is None:
+            break
+
+        if job['stage'] == 'export':
+            run_export_job(queue, store, job)
+            continue
+
+        game = game_to_scrape(queue, store, job, imported)
+        if game is None:
+            continue
+
+        print(f"Scraping {game['game']} for {job['payload']['platform']['platform']} (attempt {job['attempts']})...")
+        if scrapper is None:
+            scrapper = create_scraper()
+        try:
+            with profiler.game(scrapper, job['console'], game['link']) if profiler else nullcontext():
+                scraped_game = scrape_game(scrapper, job['console'], game)
+        except Exception as e:
+            print(f"Error scraping {game['link']}: {e}")
+            scraped_game = None
+
+        finish_scrape_job(queue, store, job, scraped_game)
+
+    if scrapper is not None:
+        scrapper.close()
 
-        console_games = []
-
-        # if console_code in [
-        #     'matsushitapanasonic-jr', 'mattel-aquarius', 'memotech-mtx', 'meritum', 'microbee', 'microtan-65', 'microvision', 'multi8', 'motorola-6800', 'mre', 'msx', 'ngage', 'nascom', 'neo-geo-cd', 'neo-geo-pocket', 'neo-geo-pocket-color', 'neo-geo-x', 'newbrain', 'new-nintendo-3ds', 'n64', 'nintendo-dsi', 'northstar', 'novel-760', 'nuon', 'odyssey', 'odyssey-2', 'ohio-scientific', 'orao', 'oric', 'os2', 'os2', ]:
-        if console_code in [
-            'amiga',
-            'cpc',
-            'apple-i',
-            'apple2',
-            'apple2gs',
-            'arcade',
-            'atari-8-bit',
-            'atari-st',
-            'bbc-micro',
-            'vic-20',
-        ]:
-
-            with open(f'games_list/{console_code}.json', 'r', encoding='utf-8') as file:
-                games_list = json.load(file)
-
-            scrapped_games = []
-            safe_platform_name = platform['platform'].replace("/", "").replace("\\", "").replace("?", "").replace("*", "").replace(':','')
-            if os.path.exists(f'excels/{safe_platform_name}.xlsx'):
-                continue
-            if os.path.exists(f'data/{safe_platform_name}.json'):
-                with open(f'data/{safe_platform_name}.json', 'r', encoding='utf-8') as file:
-                    scrapped_games = json.load(file)
-
-            if scrapped_games:
-                console_games.extend(scrapped_games)
-            
-            scrapped_games = [x['game_url'] for x in scrapped_games]
-            total_games = len(games_list)
-            for index, game in enumerate(games_list):
-                if game['link'] not in scrapped_games:
-                    print(f"Scraping {game['game']}, {index+1} of {total_games} for {platform['platform']}...")
-                    
-                    game_code = game['game_code']
-                    # if game_code == 'galaga':
-                    print(game["link"])
-                    overview_url = game["link"]
-                    release_url = f'{game["link"]}/releases/{console_code}'
-                    specs_ratings_url = f'{game["link"]}/specs/{console_code}'
-                    covers_url = f'{game["link"]}/covers/{console_code}'
-                    screenshots_url = f'{game["link"]}/screenshots/{console_code}'
-
-                    game_overview = scrapper.get_overview_details(overview_url)
-                    if game_overview is None:
-                        scrapper.close()
-                        return 'restart'
-                    game_releases = scrapper.get_releases(release_url)
-                    if game_releases is None: 
-                        scrapper.close()
-                        return 'restart'
-                    game_specs = scrapper.get_specs(specs_ratings_url)
-                    if game_specs is None: 
-                        scrapper.close()
-                        return 'restart'
-                    game_ratings = scrapper.get_ratings(specs_ratings_url)
-                    if game_ratings is None: 
-                        scrapper.close()
-                        return 'restart'
-                    game_covers = scrapper.get_covers(covers_url)
-                    if game_covers is None: 
-                        scrapper.close()
-                        return 'restart'
-                    if game_covers or game_releases:
-                        game_screenshots = scrapper.get_screenshots(screenshots_url)
-                        if game_screenshots is None: 
-                            scrapper.close()
-                            return 'restart'
-
-                        merged_cover_releases = merge_covers_releases_data(game_covers, game_releases)
-                        parse_data_result = parse_data(game_overview, game_screenshots, game_ratings, game_specs, merged_cover_releases)
-
-                        # Collect all unique keys dynamically
-                        json_data = []
-                        for key, value in parse_data_result.items():
-                            json_data.extend(value)
-
-                        final_list = []
-                        # remove virtual entries
-                        for entry in json_data:
-                            comments = entry.get('comments', '')  # Ensure it's a string
-                            if isinstance(comments, str) and any(word in comments.lower() for word in ['virtual release', 'online', 'download', 'eshop']):
-                                final_list.append({'game_url': game['link']})
-                            entry['game_url'] = game['link']
-                            final_list.append(entry)
-
-                        console_games.extend(final_list)
-
-                    with open(f'data/{safe_platform_name}.json', 'w', encoding='utf-8') as f:
-                        json.dump(console_games, f, indent=4)
-
-
-            with open(f'data/{safe_platform_name}.json', 'w', encoding='utf-8') as f:
-                json.dump(console_games, f, indent=4)
-
-            priority_columns = ["console", "title", "comments", "mobyid", "country", "Genre", 'rating', 'description', 'published_by', 'developed_by'] 
-            export_json_to_excel(console_games, f'excels/{safe_platform_name}.xlsx', priority_columns)
-            print(f"{platform['platform']} Scrapped Successfully")
-
-    scrapper.close()
-    return 'exit'
 
 if __name__ == '__main__':
 
-    status = 'start'
-    while status != 'exit':
-        print("Waking up...")
-        status = scrapeGamesByConsole()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Scrape the games of the queued consoles, several workers can share one queue.')
+    parser.add_argument('--consoles', nargs='*', default=CONSOLES, help='console codes to queue')
+    parser.add_argument('--queue', default='data/jobs.sqlite')
+    parser.add_argument('--output', default='data/output.sqlite', help='SQLite store the scraped games are saved to')
+    parser.add_argument('--worker-id', default=f'{socket.gethostname()}-{os.getpid()}')
+    parser.add_argument('--retry-failed', action='store_true', help='give failed jobs another set of attempts')
+    parser.add_argument('--allow-partial', action='store_true', help='export consoles even when some of their games failed')
+    parser.add_argument('--metrics-dir', default='metrics', help='directory the Prometheus textfile and JSON summary are written to')
+    parser.add_argument('--metrics-interval', type=int, default=60, help='seconds between two metrics writes')
+    parser.add_argument('--profile-every', type=int, help='cProfile every Nth game')
+    parser.add_argument('--profile-threshold', type=float, help='keep the profile of any game slower than this many seconds (profiles every game)')
+    parser.add_argument('--profile-trace', action='store_true', help='record a Playwright trace of the profiled games')
+    parser.add_argument('--tracemalloc-every', type=int, help='write the allocation growth every N games')
+    parser.add_argument('--profile-dir', default='profiles', help='directory the profiles, traces and summary.json are written to')
+    args = parser.parse_args()
+
+    with open('mobygames_platforms.json', 'r', encoding='utf-8') as file:
+        platforms = json.load(file)
+
+    queue = JobQueue(args.queue, allow_partial=args.allow_partial)
+    if args.retry_failed:
+        queue.retry_failed()
+    enqueue_consoles(queue, platforms, args.consoles)
+
+    # one file per worker, the node_exporter textfile collector reads every *.prom of the directory
+    get_metrics().const_labels['worker'] = args.worker_id
+    reporter = MetricsReporter(get_metrics(), args.metrics_dir, re.sub(r'[^\w.-]', '_', args.worker_id), args.metrics_interval).start()
+
+    profiler = None
+    if args.profile_every or args.profile_threshold is not None or args.tracemalloc_every:
+        profiler = GameProfiler(args.profile_dir, every=args.profile_every, threshold=args.profile_threshold,
+                                trace=args.profile_trace, tracemalloc_every=args.tracemalloc_every)
+
+    store = OutputStore(args.output)
+    try:
+        scrapeGamesByConsole(queue, args.worker_id, store, profiler)
+    finally:
+        reporter.stop()
+    print(f"Jobs: {queue.counts()}")
+    store.close()
+    queue.close()
@@ -0,0 +1,82 @@
+import random
+from bench_releases import previous_build_release_groups, synthetic_table
+from fixture_server import FixtureCatalog
+from html_parsers import (
+    build_release_groups, parse_overview_html, parse_releases_html, parse_specs_html, parse_ratings_html, parse_figure_image_html,
+    parse_covers_html, parse_screenshot_links_html,
+)
+
+BASE_URL = 'http://fixture'
+CATALOG = FixtureCatalog(games_per_console=5, releases=2, covers=2, images_per_cover=2, screenshots=3)
+GAME_ID = 3
+SLUG = f'game-{GAME_ID}'
+GAME_URL = f'{BASE_URL}/game/{GAME_ID}/{SLUG}'
+
+
+def test_overview():
+    overview = parse_overview_html(CATALOG.overview(BASE_URL, GAME_ID, SLUG))
+    assert (overview['title'], overview['mobyid']) == ('Game 3', '3')
+    assert overview['description'].startswith('Synthetic game 3.\n\nLorem ipsum')
+    assert len(overview['Genre'].split(',')) == 2
+
+
+def test_releases_follow_the_release_groups():
+    releases = parse_releases_html(CATALOG.releases_page(BASE_URL, GAME_ID, SLUG))
+    expected = [(country, publisher) for countries, comments, publisher in CATALOG._release_groups(GAME_ID) for country in countries]
+    assert [(release['country'], release['published_by']) for release in releases['Console 0']] == expected
+
+
+def test_specs_and_ratings():
+    html = CATALOG.specs_page(BASE_URL, GAME_ID, SLUG)
+    assert parse_specs_html(html) == {'Console 0': {'business_model': 'Commercial', 'media_type': 'Cartridge', 'number_of_players': '1-2'}}
+    assert parse_ratings_html(html) == {'Console 0': {'esrb_rating': 'Everyone', 'pegi_rating': ['3', '7']}}
+
+
+def test_covers_one_entry_per_country():
+    covers = parse_covers_html(CATALOG.covers_page(BASE_URL, GAME_ID, SLUG))
+    groups = CATALOG._release_groups(GAME_ID)
+    expected = []
+    for index in range(CATALOG.covers):
+        countries, comments, publisher = groups[index % len(groups)]
+        links = [f'{GAME_URL}/covers/gameCoverId,{index * 2 + image}/' for image in range(2)]
+        expected += [{'packaging': 'Box', 'comments': comments, 'video_standard': 'NTSC', 'country': country, 'cover_links': links}
+                     for country in countries]
+    assert covers == {'Console 0': expected}
+
+
+def test_covers_skip_electronic_packaging():
+    html = ('<section><h2><a href="#">Switch</a> <small>(Digital)</small></h2><table><tbody>'
+            '<tr><td class="text-nowrap">Packaging:</td><td><ul class="commaList"><li>Electronic</li></ul></td></tr>'
+            '<tr><td class="text-nowrap">Country:</td><td><ul class="commaList"><li>Japan</li></ul></td></tr>'
+            '</tbody></table><div class="img-holder"><figure><a href="/covers/1/">x</a></figure></div></section>'
+            '<section><h2>No console link</h2></section>')
+    assert parse_covers_html(html) == {'Switch': []}
+
+
+def test_covers_country_after_its_flag():
+    html = ('<section><h2><a href="#">NES</a></h2><table><tbody>'
+            '<tr><td class="text-nowrap">Country:</td><td><ul class="commaList"><li><span>Japan</span> <img src="jp.png"></li></ul></td></tr>'
+            '</tbody></table><div class="img-holder"><figure><a>no link</a></figure><figure><a href="/covers/2/">x</a></figure></div></section>')
+    assert parse_covers_html(html) == {'NES': [
+        {'packaging': '', 'comments': '', 'video_standard': '', 'country': 'Japan', 'cover_links': ['/covers/2/']}]}
+
+
+def test_screenshot_links():
+    links = parse_screenshot_links_html(CATALOG.screenshots_page(BASE_URL, GAME_ID, SLUG))
+    assert links == {'Console 0': [f'{GAME_URL}/screenshots/gameShotId,{index}/' for index in range(3)]}
+
+
+def test_figure_image():
+    assert parse_figure_image_html(CATALOG.image_page(BASE_URL, 'covers', GAME_ID, 1)) == f'{BASE_URL}/images/covers/3-1.jpg'
+    assert parse_figure_image_html('<html><body><p>No image</p></body></html>') is None
+
+
+def test_build_release_groups_matches_the_list_based_grouping():
+    rng = random.Random(0)
+    tables = [synthetic_table(countries, sections=3, fields=4, splits=2, rng=rng) for countries in (1, 5, 20)]
+    # a table without countries, and a country section cut short by a row that is not a label/value pair
+    tables.append([['Mar 3, 1990 Release'], ['Published by:', 'Sega'], ['Product Code:', 'X-1']])
+    tables.append([['Mar 3, 1990 Release'], ['Countries:', 'Japan, Korea'], ['Comments:', 'Boxed'], ['Note'],
+                   ['Product Code:', 'X-1'], ['Product Code:', 'X-2']])
+    for rows in tables:
+        assert build_release_groups([list(row) for row in rows]) == previous_build_release_groups([list(row) for row in rows])
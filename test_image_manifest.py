@@ -0,0 +1,26 @@
+from image_manifest import ImageManifest
+
+URL = 'https://cdn.mobygames.com/covers/123-river-raid.jpg'
+
+
+def test_lookups_are_scoped_to_bucket_and_folder(tmp_path):
+    manifest = ImageManifest(str(tmp_path / 'manifest.sqlite'))
+    manifest.record('bucket-a', 'covers/', URL, 'abc', 'covers/abc.jpg', 'etag')
+    assert manifest.key_for_source('bucket-a', 'covers/', URL) == 'covers/abc.jpg'
+    assert manifest.key_for_source('bucket-b', 'covers/', URL) is None
+    assert manifest.key_for_source('bucket-a', 'screenshots/', URL) is None
+    assert manifest.find_by_hash('bucket-a', 'abc') == ('covers/abc.jpg', 'etag')
+    assert manifest.find_by_hash('bucket-b', 'abc') is None
+
+
+def test_seeded_keys_belong_to_their_bucket(tmp_path):
+    class Paginator:
+        def paginate(self, Bucket, Prefix):
+            return [{'Contents': [{'Key': f'{Prefix}old.jpg', 'ETag': '"e"'}]}]
+
+    client = type('Client', (), {'get_paginator': lambda self, name: Paginator()})()
+    manifest = ImageManifest(str(tmp_path / 'manifest.sqlite'))
+    assert manifest.seed_from_bucket(client, 'bucket-a') == 2
+    assert manifest.has_bucket_key('bucket-a', 'covers/old.jpg')
+    assert not manifest.has_bucket_key('bucket-b', 'covers/old.jpg')
+
@@ -0,0 +1,73 @@
+import time
+from job_queue import JobQueue
+
+
+def make_queue(tmp_path, **kwargs):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite'), **kwargs)
+    queue.enqueue_many([('wii', 'game/1', 'scrape', {'n': 1}), ('wii', 'game/2', 'scrape', {'n': 2}), ('wii', '', 'export', None)])
+    return queue
+
+
+def test_enqueue_is_idempotent(tmp_path):
+    queue = make_queue(tmp_path)
+    assert not queue.enqueue('wii', 'game/1', 'scrape')
+    assert queue.enqueue('wii', 'game/3', 'scrape')
+    assert queue.counts() == {'pending': 4}
+    assert queue.has_console('wii') and not queue.has_console('ps2')
+
+
+def test_lease_in_order_and_complete(tmp_path):
+    queue = make_queue(tmp_path)
+    first = queue.lease('a')
+    second = queue.lease('b')
+    assert (first['game_url'], first['payload'], first['attempts']) == ('game/1', {'n': 1}, 1)
+    assert second['game_url'] == 'game/2'
+    # the export waits for both scrape jobs
+    assert queue.lease('c') is None
+    queue.complete(first['id'])
+    assert queue.lease('c') is None
+    queue.complete(second['id'])
+    assert queue.lease('c')['stage'] == 'export'
+
+
+def test_expired_lease_is_leased_again(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=0.05)
+    job = queue.lease('dead-worker')
+    queue.lease('other')
+    time.sleep(0.1)
+    again = queue.lease('new-worker')
+    assert again['id'] == job['id']
+    assert again['attempts'] == 2
+
+
+def test_fail_requeues_until_max_attempts(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=2)
+    job = queue.lease('a')
+    queue.fail(job['id'], 'boom')
+    assert queue.lease('a')['id'] == job['id']
+    queue.fail(job['id'], 'boom')
+    assert queue.counts() == {'failed': 1, 'pending': 2}
+
+
+def test_failed_scrape_blocks_the_export(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=1)
+    failed = queue.lease('a')
+    queue.fail(failed['id'], 'boom')
+    queue.complete(queue.lease('a')['id'])
+    assert queue.lease('a') is None
+
+    queue.retry_failed()
+    assert queue.lease('a')['id'] == failed['id']
+
+
+def test_allow_partial_exports_without_the_failed_games(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=1, allow_partial=True)
+    queue.fail(queue.lease('a')['id'], 'boom')
+    queue.complete(queue.lease('a')['id'])
+    assert queue.lease('a')['stage'] == 'export'
+
+
+def test_lease_only_given_stages(tmp_path):
+    queue = make_queue(tmp_path)
+    assert queue.lease('a', stages=('export',)) is None
+    assert queue.lease('a', stages=('scrape',))['stage'] == 'scrape'
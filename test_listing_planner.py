@@ -0,0 +1,77 @@
+import random
+from urllib.parse import unquote
+from listing_planner import ListingPlanner, listing_url, BASE_URL
+
+
+def catalog(size=400, seed=3):
+    """ (title, year) pairs with titles equal to common prefixes and titles going on with a space or punctuation """
+    rng = random.Random(seed)
+    words = ['go', 'goal', 'go!', 'go go', 'ghost', 'g-force', 'gran turismo', 'ace', 'a', "a'bomb", '1942', '"x"', 'zoo']
+    games = [(word, 2000 + index % 3) for index, word in enumerate(words)]
+    for index in range(size):
+        title = rng.choice('aggz1!') + ''.join(rng.choice('ao -.') for _ in range(rng.randint(0, 4)))
+        games.append((f'{title} {index}', rng.choice([2000, 2001, 2002])))
+    return games
+
+
+def facets_of(url):
+    facets = dict(part.split(':', 1) for part in url[len(BASE_URL):].split('/'))
+    return {key: unquote(value) for key, value in facets.items()}
+
+
+def matches(games, url):
+    facets = facets_of(url)
+    return [(title, year) for title, year in games
+            if title.lower().startswith(facets.get('title', ''))
+            and ('from' not in facets or year == int(facets['from']))]
+
+
+def listed(games, listing, limit):
+    """ What crawling a listing returns: its first `limit` results in its sort order """
+    found = sorted(matches(games, listing['url']), key=lambda game: game[0].lower(), reverse=listing['url'].endswith('sort:-title'))
+    return found[:limit]
+
+
+def test_listing_url_orders_facets_and_quotes_titles():
+    assert listing_url({'platform': 'wii', 'year': 2008}) == BASE_URL + 'from:2008/platform:wii/until:2008/sort:title'
+    assert listing_url({'platform': 'wii', 'title': 'go !'}, '-title') == BASE_URL + 'platform:wii/title:go%20%21/sort:-title'
+
+
+def test_small_partitions_are_not_split(tmp_path):
+    planner = ListingPlanner('wii', lambda url: 1500, directory=tmp_path, limit=1000)
+    assert [listing['url'].rsplit('/', 1)[1] for listing in planner.plan()] == ['sort:title', 'sort:-title']
+
+
+def test_plan_lists_every_game(tmp_path):
+    games = catalog()
+    limit = 10
+    planner = ListingPlanner('wii', lambda url: len(matches(games, url)), years=[2000, 2001, 2002],
+                             directory=tmp_path, limit=limit, max_title_depth=3)
+    found = set()
+    for listing in planner.plan():
+        found.update(listed(games, listing, limit))
+    assert found == set(games)
+
+
+def test_games_without_a_year_keep_the_parent_listing(tmp_path):
+    games = [(f'game {index}', None) for index in range(30)] + [(f'old {index}', 1990) for index in range(5)]
+    planner = ListingPlanner('wii', lambda url: len(matches(games, url)), years=[1990], directory=tmp_path, limit=10)
+    urls = [listing['url'] for listing in planner.plan()]
+    assert listing_url({'platform': 'wii'}) in urls
+    assert listing_url({'platform': 'wii'}, '-title') in urls
+
+
+def test_plan_resumes_from_its_counts(tmp_path):
+    calls = []
+    count = lambda url: calls.append(url) or 3000
+    ListingPlanner('wii', count, years=[2000], directory=tmp_path, limit=1000, max_title_depth=1)._count({'platform': 'wii'})
+    planner = ListingPlanner('wii', count, years=[2000], directory=tmp_path, limit=1000, max_title_depth=1)
+    planner._count({'platform': 'wii'})
+    assert calls == [listing_url({'platform': 'wii'})]
+
+
+def test_mark_done(tmp_path):
+    planner = ListingPlanner('wii', lambda url: 10, directory=tmp_path)
+    url = planner.plan()[0]['url']
+    planner.mark_done(url)
+    assert ListingPlanner('wii', lambda url: 10, directory=tmp_path).pending() == []
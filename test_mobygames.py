@@ -0,0 +1,38 @@
+import copy, random, asyncio
+from types import SimpleNamespace
+from bench_merge import previous_merge_covers_releases_data, synthetic_game
+from metrics import get_metrics
+from mobygames import merge_covers_releases_data, timed_stage
+
+
+def test_merge_matches_the_scan_based_merge():
+    rng = random.Random(0)
+    games = [synthetic_game(2, size, size, rng) for size in (0, 1, 10, 60)]
+    for covers, releases in games:
+        expected = previous_merge_covers_releases_data(copy.deepcopy(covers), copy.deepcopy(releases))
+        assert merge_covers_releases_data(copy.deepcopy(covers), copy.deepcopy(releases)) == expected
+
+
+def test_merge_keeps_unmatched_releases_and_covers():
+    covers = {'NES': [{'country': 'Japan', 'comments': 'Budget, Re-release', 'cover_images': ['a.jpg']},
+                      {'country': 'France', 'comments': '', 'cover_images': ['b.jpg']}]}
+    releases = {'NES': [{'country': 'Japan', 'comments': 'Re-release (budget)', 'release_date': '1990'}],
+                'SNES': [{'country': 'Germany', 'release_date': '1993'}]}
+    expected = previous_merge_covers_releases_data(copy.deepcopy(covers), copy.deepcopy(releases))
+    merged = merge_covers_releases_data(covers, releases)
+    assert merged == expected
+    assert [entry.get('release_date') for entry in merged['NES']] == ['1990', None]
+    assert merged['SNES'] == [{'country': 'Germany', 'release_date': '1993', 'console': 'SNES'}]
+
+
+def test_timed_stage_labels_coroutine_methods_with_their_slot():
+    class Scraper:
+        @timed_stage('async_covers')
+        async def get_covers(self, slot, url):
+            return None if url.endswith('missing') else {}
+
+    slot = SimpleNamespace(console='atari-8-bit')
+    asyncio.run(Scraper().get_covers(slot, 'https://www.mobygames.com/game/1/x/covers/atari-8-bit'))
+    asyncio.run(Scraper().get_covers(slot, 'https://www.mobygames.com/game/1/x/covers/missing'))
+    stage = get_metrics().summary()['stages']['async_covers']
+    assert (stage['count'], stage['failed']) == (2, 1)
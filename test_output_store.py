@@ -0,0 +1,85 @@
+import json
+from output_store import OutputStore
+from mobygames import flatten_game_entries
+
+OVERVIEW = {'title': 'River Raid', 'mobyid': '123', 'rating': '7.5', 'description': 'Fly up the river', 'Genre': 'Action', 'Published by': 'Activision'}
+MERGED = {
+    'Atari 2600': [
+        {'packaging': 'Box', 'comments': '', 'video_standard': 'NTSC', 'country': 'United States', 'console': 'Atari 2600',
+         'cover_images': ['https://bucket.s3.amazonaws.com/covers/a.jpg', 'https://bucket.s3.amazonaws.com/covers/b.jpg'],
+         'release_date': '1982', 'publisher': 'Activision'},
+        {'country': 'Germany', 'console': 'Atari 2600', 'comments': 'Virtual release on the eShop', 'release_date': '1983'},
+    ],
+    'Atari 8-bit': [{'country': 'United States', 'console': 'Atari 8-bit', 'release_date': '1983', 'product_code': 'AX-020'}],
+}
+SCREENSHOTS = {'Atari 2600': ['https://bucket.s3.amazonaws.com/screenshots/1.png'], 'Atari 8-bit': []}
+RATINGS = {'Atari 2600': {'Critics': '80%', 'Players': '3.9'}}
+SPECS = {'Atari 2600': {'Media Type': 'Cartridge'}, 'Atari 8-bit': {'Input Devices': 'Joystick'}}
+LEGACY = [{'game_url': 'https://www.mobygames.com/game/9/'},
+          {'game_url': 'https://www.mobygames.com/game/9/', 'title': 'Old', 'legacy_only': 'yes', 'console': 'Atari 2600'}]
+
+
+def expected_entries(game_url):
+    merged = json.loads(json.dumps(MERGED))
+    return flatten_game_entries(game_url, dict(OVERVIEW), SCREENSHOTS, RATINGS, SPECS, merged)
+
+
+def saved_store(tmp_path):
+    store = OutputStore(str(tmp_path / 'output.sqlite'))
+    store.import_flat_entries('Atari 2600', LEGACY)
+    store.save_game('Atari 2600', 'https://www.mobygames.com/game/1/', OVERVIEW, json.loads(json.dumps(MERGED)), SCREENSHOTS, RATINGS, SPECS)
+    store.save_game('Atari 2600', 'https://www.mobygames.com/game/2/')
+    return store
+
+
+def test_save_and_load_round_trip(tmp_path):
+    store = saved_store(tmp_path)
+    overview, merged, screenshots, ratings, specs = store.load_game('Atari 2600', 'https://www.mobygames.com/game/1/')
+    assert (overview, merged, ratings, specs) == (OVERVIEW, MERGED, RATINGS, SPECS)
+    # a console without screenshots has no rows, flatten_game_entries reads it as [] all the same
+    assert screenshots == {'Atari 2600': SCREENSHOTS['Atari 2600']}
+
+
+def test_iter_entries_rebuilds_the_flat_entries(tmp_path):
+    store = saved_store(tmp_path)
+    assert list(store.iter_entries('Atari 2600')) == LEGACY + expected_entries('https://www.mobygames.com/game/1/')
+    assert store.count_games('Atari 2600') == 3
+    assert store.has_game('Atari 2600', 'https://www.mobygames.com/game/2/')
+
+
+def test_flat_releases_view(tmp_path):
+    store = saved_store(tmp_path)
+    rows = store.db.execute('''
+        SELECT console, title, cover_images, screenshots, ratings, specs FROM flat_releases
+        WHERE game_url = ? ORDER BY position
+    ''', ('https://www.mobygames.com/game/1/',)).fetchall()
+    assert [(console, title) for console, title, *_ in rows] == [('Atari 2600', 'River Raid')] * 2 + [('Atari 8-bit', 'River Raid')]
+    console, title, cover_images, screenshots, ratings, specs = rows[0]
+    assert json.loads(cover_images) == MERGED['Atari 2600'][0]['cover_images']
+    assert json.loads(screenshots) == SCREENSHOTS['Atari 2600']
+    assert (json.loads(ratings), json.loads(specs)) == (RATINGS['Atari 2600'], SPECS['Atari 2600'])
+    assert json.loads(rows[2][3]) == [] and json.loads(rows[2][4]) == {}
+
+
+def test_save_again_replaces_the_game(tmp_path):
+    store = saved_store(tmp_path)
+    store.save_game('Atari 2600', 'https://www.mobygames.com/game/1/', OVERVIEW, json.loads(json.dumps(MERGED)), SCREENSHOTS, RATINGS, SPECS)
+    assert store.count_games('Atari 2600') == 3
+    assert store.db.execute('SELECT COUNT(*) FROM platform_releases').fetchone()[0] == 3
+    assert store.db.execute('SELECT COUNT(*) FROM covers').fetchone()[0] == 2
+
+
+def test_fields_match_the_entries(tmp_path):
+    store = saved_store(tmp_path)
+    keys = set()
+    for entry in store.iter_entries('Atari 2600'):
+        keys.update(entry)
+    assert store.fields('Atari 2600') == keys
+    assert store.fields('Amiga') == set()
+
+
+def test_compact_writes_the_entries(tmp_path):
+    store = saved_store(tmp_path)
+    store.compact('Atari 2600', str(tmp_path / 'atari.json'))
+    with open(tmp_path / 'atari.json', encoding='utf-8') as file:
+        assert json.load(file) == list(store.iter_entries('Atari 2600'))
@@ -0,0 +1,83 @@
+import pytest
+import rate_limiter
+from rate_limiter import AdaptiveRateLimiter, get_rate_limiter, limiter_for
+
+
+class FakeClock:
+    """ Clock whose sleep only moves time forward """
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def limiter(clock, **kwargs):
+    return AdaptiveRateLimiter(clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def test_burst_then_paced_at_the_rate():
+    clock = FakeClock()
+    bucket = limiter(clock, rate=2.0, burst=3)
+    waits = [bucket.acquire() for _ in range(5)]
+    assert waits[:3] == [0, 0, 0]
+    assert waits[3:] == pytest.approx([0.5, 0.5])
+
+
+def test_additive_increase_up_to_max_rate():
+    clock = FakeClock()
+    bucket = limiter(clock, rate=1.0, max_rate=1.5, increase=0.1)
+    bucket.record(0.1, 200)
+    assert bucket.rate == pytest.approx(1.1)
+    for _ in range(100):
+        bucket.record(0.1, 200)
+    assert bucket.rate == 1.5
+
+
+def test_multiplicative_decrease_once_per_cooldown():
+    clock = FakeClock()
+    bucket = limiter(clock, rate=8.0, min_rate=1.5, decrease=0.5, cooldown=2.0)
+    bucket.record(0.1, 429)
+    bucket.record(0.1, 503)
+    bucket.record(0.1, failed=True)
+    assert bucket.rate == 4.0
+    assert bucket.report() == {'rate': 4.0, 'throttled': 2, 'failed': 1, 'slow': 0}
+
+    # no increase during the cooldown either
+    bucket.record(0.1, 200)
+    assert bucket.rate == 4.0
+
+    clock.now += 2.0
+    bucket.record(10.0, 200)
+    assert (bucket.rate, bucket.slow) == (2.0, 1)
+    clock.now += 2.0
+    bucket.record(0.1, 429)
+    assert bucket.rate == 1.5
+
+
+def test_retry_after_pauses_the_bucket():
+    clock = FakeClock()
+    bucket = limiter(clock, rate=10.0, burst=5, decrease=0.5)
+    bucket.record(0.1, 429, retry_after=3)
+    # the pause, then one token at the halved rate
+    assert bucket.acquire() == pytest.approx(3.0 + 1 / 5.0)
+
+
+def test_one_limiter_per_host(monkeypatch):
+    monkeypatch.setattr(rate_limiter, '_rate_limiters', {})
+    monkeypatch.setenv('RATE_LIMIT', '3')
+    site = limiter_for(None, 'https://www.mobygames.com/game/1/')
+    cdn = limiter_for(None, 'https://cdn.mobygames.com/covers/1.jpg')
+    assert site is get_rate_limiter('www.mobygames.com') and site is not cdn
+    assert site.rate == 3.0
+    assert limiter_for(False, 'https://www.mobygames.com/') is None
+    assert limiter_for(cdn, 'https://www.mobygames.com/') is cdn
+
+    monkeypatch.setenv('RATE_LIMIT', '0')
+    assert get_rate_limiter('www.mobygames.com') is None
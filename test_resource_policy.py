@@ -0,0 +1,87 @@
+import pytest
+from types import SimpleNamespace
+from resource_policy import ResourcePolicy, page_type_of
+from scrapeConsoleGame import scrape_game
+
+
+@pytest.mark.parametrize('url, page_type', [
+    ('https://www.mobygames.com/game/193484/atari-mania/', 'overview'),
+    ('https://www.mobygames.com/game/193484/atari-mania', 'overview'),
+    ('https://www.mobygames.com/game/193484/atari-mania/releases/atari-8-bit/', 'releases'),
+    ('https://www.mobygames.com/game/193484/atari-mania/specs/atari-8-bit/', 'specs'),
+    ('https://www.mobygames.com/game/193484/atari-mania/covers/atari-8-bit/', 'covers'),
+    ('https://www.mobygames.com/game/193484/atari-mania/covers/gameCoverId,12/', 'covers'),
+    ('https://www.mobygames.com/game/193484/atari-mania/screenshots/gameShotId,3/', 'screenshots'),
+    ('https://www.mobygames.com/game/platform:wii/sort:title/', 'default'),
+    ('https://www.mobygames.com/game/from:2008/platform:wii/until:2008/sort:title', 'default'),
+    ('https://www.mobygames.com/game/193484/atari-mania/credits/atari-8-bit/', 'default'),
+    ('https://www.mobygames.com/platform/wii/', 'default'),
+])
+def test_page_type_of(url, page_type):
+    assert page_type_of(url) == page_type
+
+
+class RecordingScraper:
+    """ Stands in for MobyGamesScraper, keeping the URL each page of a game is read from """
+
+    def __init__(self):
+        self.urls = {}
+
+    def start_game(self, console):
+        pass
+
+    def get_overview_details(self, url):
+        self.urls['overview'] = url
+        return {}
+
+    def get_releases(self, url):
+        self.urls['releases'] = url
+        return {'Atari 8-bit': []}
+
+    def get_specs_and_ratings(self, url):
+        self.urls['specs'] = url
+        return {}, {}
+
+    def get_covers(self, url):
+        self.urls['covers'] = url
+        return {}
+
+    def get_screenshots(self, url):
+        self.urls['screenshots'] = url
+        return {}
+
+
+def test_page_type_of_the_urls_scrape_game_reads():
+    scraper = RecordingScraper()
+    # games_list links end with a slash
+    scrape_game(scraper, 'atari-8-bit', {'game': 'Atari Mania', 'link': 'https://www.mobygames.com/game/193484/atari-mania/'})
+    assert scraper.urls['releases'] == 'https://www.mobygames.com/game/193484/atari-mania//releases/atari-8-bit'
+    assert {page_type: page_type_of(url) for page_type, url in scraper.urls.items()} == {
+        page_type: page_type for page_type in ('overview', 'releases', 'specs', 'covers', 'screenshots')}
+
+
+def request(url, resource_type, page_url, navigation=False):
+    frame = SimpleNamespace(url=page_url, parent_frame=None)
+    return SimpleNamespace(url=url, resource_type=resource_type, frame=frame, is_navigation_request=lambda: navigation)
+
+
+def test_overview_keeps_its_scripts_for_the_description():
+    policy = ResourcePolicy()
+    overview = 'https://www.mobygames.com/game/1/river-raid/'
+    assert policy.allows(request('https://www.mobygames.com/static/js/game.js', 'script', overview))
+    assert not policy.allows(request('https://www.mobygames.com/images/cover.jpg', 'image', overview))
+    assert not policy.allows(request('https://www.googletagmanager.com/gtm.js', 'script', overview))
+
+
+def test_releases_block_scripts_and_navigations_always_load():
+    policy = ResourcePolicy()
+    releases = 'https://www.mobygames.com/game/1/river-raid/releases/atari-2600/'
+    assert not policy.allows(request('https://www.mobygames.com/static/js/game.js', 'script', releases))
+    assert policy.allows(request(releases, 'document', 'about:blank', navigation=True))
+
+
+def test_summary_labels_the_bytes_as_an_estimate():
+    policy = ResourcePolicy(estimated_sizes={'image': 1_000_000})
+    policy.allows(request('https://www.mobygames.com/images/cover.jpg', 'image', 'https://www.mobygames.com/game/1/x/'))
+    assert policy.report()['estimated_bytes_saved'] == 1_000_000
+    assert 'estimated 1.0 MB' in policy.summary()
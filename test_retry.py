@@ -0,0 +1,92 @@
+import pytest
+import requests
+from playwright.sync_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+from retry import (
+    RetryPolicy, RetryExhausted, HTTPStatusError, parse_retry_after, check_status, classify_error, retry_after,
+    TIMEOUT, THROTTLED, SERVER, NETWORK, CRASH, FATAL,
+)
+
+
+def http_error(status, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return requests.HTTPError(response=response)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('120') == 120.0
+    assert parse_retry_after('1.5') == 1.5
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') is None
+
+
+def test_check_status():
+    check_status('https://example.com/', 200)
+    check_status('https://example.com/', 404)
+    with pytest.raises(HTTPStatusError) as raised:
+        check_status('https://example.com/', 429, {'retry-after': '7'})
+    assert (raised.value.status, raised.value.retry_after) == (429, 7.0)
+    with pytest.raises(HTTPStatusError):
+        check_status('https://example.com/', 502)
+
+
+@pytest.mark.parametrize('error, error_class', [
+    (HTTPStatusError('u', 429), THROTTLED),
+    (HTTPStatusError('u', 503), SERVER),
+    (http_error(429), THROTTLED),
+    (http_error(500), SERVER),
+    (http_error(404), FATAL),
+    (requests.Timeout(), TIMEOUT),
+    (PlaywrightTimeoutError('Timeout 60000ms exceeded'), TIMEOUT),
+    (requests.ConnectionError(), NETWORK),
+    (PlaywrightError('net::ERR_CONNECTION_RESET at https://example.com/'), NETWORK),
+    (PlaywrightError('Target page, context or browser has been closed'), CRASH),
+    (PlaywrightError('Page crashed'), CRASH),
+    (PlaywrightError('Cannot read properties of null'), FATAL),
+    (ValueError('No Moby ID'), FATAL),
+])
+def test_classify_error(error, error_class):
+    assert classify_error(error) == error_class
+
+
+def test_retry_after_from_either_error():
+    assert retry_after(HTTPStatusError('u', 429, 3.0)) == 3.0
+    assert retry_after(http_error(429, {'Retry-After': '4'})) == 4.0
+    assert retry_after(requests.Timeout()) is None
+
+
+def test_call_retries_transient_errors_only():
+    slept = []
+    policy = RetryPolicy(max_attempts=3, base_delay=1.0, sleep=slept.append)
+    outcomes = iter([requests.Timeout(), HTTPStatusError('u', 503), 'ok'])
+
+    def flaky():
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert policy.call('fetch', flaky) == 'ok'
+    assert len(slept) == 2
+
+    def broken():
+        raise ValueError('bad page')
+
+    with pytest.raises(RetryExhausted) as raised:
+        policy.call('fetch', broken)
+    assert raised.value.error_class == FATAL
+    assert len(slept) == 2
+
+
+def test_budget_is_shared_until_reset():
+    policy = RetryPolicy(max_attempts=5, base_delay=0, budgets={'fetch': 2}, sleep=lambda seconds: None)
+
+    def timeout():
+        raise requests.Timeout()
+
+    with pytest.raises(RetryExhausted):
+        policy.call('fetch', timeout)
+    assert policy.spent == {'fetch': 2}
+    policy.reset_budget()
+    assert policy.spent == {}